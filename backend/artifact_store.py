@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# artifact_store.py
+"""
+Pre-converted, memory-mappable model artifacts.
+
+Unpickling the sklearn/LightGBM models gives every uvicorn worker its own private
+copy of every tree (sklearn copies node arrays into the Tree object on load), so
+four workers hold four copies. The store instead keeps the array-compiled form of
+each target estimator (see compiled_models.py) as uncompressed joblib files.
+Loaded with mmap_mode="r", the node arrays are read-only views of the same page-cache
+pages in every worker.
+
+Layout of a store directory:
+    manifest.json                 {"model_version": <artifact_hash of Models/>, "targets": [...], ...}
+    {TARGET}_compiled.joblib      {"estimator", "estimator_columns", "nan_fill"}
+    multioutput_rf_compiled.joblib (optional; the GA's multi-output forest)
+
+Build it once per artifact version, before the workers start (no-op when current):
+    python artifact_store.py build --models-dir Models --out artifact_store
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import joblib
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prediction_cache import artifact_hash
+from compiled_models import compile_estimator, describe
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# Bump when the pickled predictor classes change; older stores are rebuilt
+STORE_FORMAT = 2
+MULTIOUTPUT_MODEL = "multioutput_rf_model.pkl"
+MULTIOUTPUT_COMPILED = "multioutput_rf_compiled.joblib"
+
+
+class ArtifactStore:
+    """Read side of a store directory. Everything is loaded with mmap_mode='r'."""
+
+    def __init__(self, store_dir: str, manifest: Dict[str, Any]):
+        self.store_dir = store_dir
+        self.manifest = manifest
+
+    @classmethod
+    def open(cls, store_dir: Optional[str], models_dir: str,
+             model_version: Optional[str] = None) -> Optional["ArtifactStore"]:
+        """
+        Open a store if it exists and was built from the current Models directory.
+        Returns None (caller falls back to the pickles) when missing or stale.
+        """
+        if not store_dir:
+            return None
+        path = os.path.join(store_dir, MANIFEST)
+        if not os.path.exists(path):
+            logger.warning("Artifact store %s has no %s; loading pickles instead.", store_dir, MANIFEST)
+            return None
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != STORE_FORMAT:
+            logger.warning("Artifact store %s has format %s, expected %s; loading pickles instead.",
+                           store_dir, manifest.get("format"), STORE_FORMAT)
+            return None
+        current = model_version or artifact_hash(models_dir)
+        if manifest.get("model_version") != current:
+            logger.warning("Artifact store %s was built for models %s, current is %s; loading pickles instead.",
+                           store_dir, str(manifest.get("model_version"))[:12], current[:12])
+            return None
+        return cls(store_dir, manifest)
+
+    @property
+    def targets(self):
+        return list(self.manifest.get("targets", []))
+
+    def load_target_plan(self, target: str) -> Optional[Dict[str, Any]]:
+        """{"estimator": compiled predictor, "estimator_columns", "nan_fill"} or None."""
+        if target not in self.targets:
+            return None
+        return joblib.load(os.path.join(self.store_dir, f"{target}_compiled.joblib"), mmap_mode="r")
+
+    def load_multioutput(self) -> Optional[Any]:
+        path = os.path.join(self.store_dir, MULTIOUTPUT_COMPILED)
+        if not self.manifest.get("multioutput") or not os.path.exists(path):
+            return None
+        return joblib.load(path, mmap_mode="r")
+
+
+# -------------------------
+# Builder
+# -------------------------
+def build_store(models_dir: str, out_dir: str) -> Dict[str, Any]:
+    """
+    Load the pickled artifacts once, compile every target estimator and write the store.
+    Only predictors that reproduce the sklearn output bit-for-bit are written
+    (the engine's own verification, COMPILED_TARGETS=all).
+    """
+    from inference_engine import CoalBlendInferenceEngine, TARGETS
+    from prediction_cache import PredictionCache
+
+    engine = CoalBlendInferenceEngine(models_dir, compiled_targets=TARGETS, cache=PredictionCache(0),
+                                      artifact_store_dir="")
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest: Dict[str, Any] = {
+        "format": STORE_FORMAT,
+        "model_version": engine.model_version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "targets": [],
+        "describe": {},
+        "multioutput": False,
+    }
+    for target in TARGETS:
+        plan = engine._target_plans.get(target, {})
+        if plan.get("compiled") is None:
+            logger.warning("%s has no verified compiled predictor; it will be loaded from the pickle.", target)
+            continue
+        joblib.dump(
+            {
+                "estimator": plan["compiled"],
+                "estimator_columns": plan["estimator_columns"],
+                "nan_fill": plan["nan_fill"],
+            },
+            os.path.join(out_dir, f"{target}_compiled.joblib"),
+        )
+        manifest["targets"].append(target)
+        manifest["describe"][target] = describe(plan["compiled"])
+
+    mo_path = os.path.join(models_dir, MULTIOUTPUT_MODEL)
+    if os.path.exists(mo_path):
+        compiled = compile_estimator(joblib.load(mo_path))
+        if compiled is not None:
+            joblib.dump(compiled, os.path.join(out_dir, MULTIOUTPUT_COMPILED))
+            manifest["multioutput"] = True
+            manifest["describe"]["multioutput_rf"] = describe(compiled)
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mappable artifact store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="compile Models/ into a store directory")
+    p_build.add_argument("--models-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Models"))
+    p_build.add_argument("--out", default=os.getenv("ARTIFACT_STORE_DIR", "artifact_store"))
+    p_build.add_argument("--force", action="store_true", help="rebuild even if the store is current")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = None if args.force else ArtifactStore.open(args.out, args.models_dir)
+    if store is not None:
+        print(f"Artifact store {args.out} is current ({store.manifest['model_version'][:12]}); nothing to do.")
+        return
+    manifest = build_store(args.models_dir, args.out)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Coal Blend Inference Engine.
+
+Usage:
+    python benchmark.py tree [--rows 1000] [--repeat 20]
+    python benchmark.py memory [--workers 4] [--store artifact_store]
+    python benchmark.py targets [--threads 4] [--rows 1,100,1000] [--repeat 20]
+    python benchmark.py ga [--coals 26] [--seed 0]
+    python benchmark.py ga-ops [--coals 26] [--pop 100,1000,10000]
+    python benchmark.py islands [--coals 26] [--islands 2,4] [--generations 60]
+    python benchmark.py store [--coals 26] [--runs 3]
+    python benchmark.py recs [--rows 1000,10000] [--url sqlite:///...]
+
+    tree   - sklearn vs array-compiled predictors (compiled_models.py), per target:
+             bit-exactness on a probe batch, single-row and batch latency.
+    memory - per-worker RSS / USS / PSS of N concurrently running engine processes,
+             loading the pickles vs memory-mapping the artifact store (artifact_store.py).
+    targets - predict_all wall-clock: the four targets sequentially vs fanned out on the
+             engine's thread pool (PREDICT_PARALLEL_TARGETS).
+    ga     - CoalBlendOptimizer.optimize wall time: per-individual vs per-generation
+             evaluation, the array population and the exhaustive 3-coal search. Uses Models/multioutput_rf_model.pkl when present, otherwise a
+             RandomForest stand-in with the same 22 -> 8 shape fitted on synthetic blends.
+    ga-ops - time of one generation's selection/crossover/mutation on a scored
+             population: list individuals vs the int32 array population.
+    islands- time-to-target fitness: serial array GA vs the island model (one
+             process per island). Target = exhaustive optimum within --tolerance.
+    store  - repeated simulations with different constraints sharing a fresh
+             prediction store: model rows predicted vs served from the store.
+    recs   - persisting a simulation's recommendations: one ORM object per blend vs
+             the bulk INSERT with emissions precomputed and the blend's coals in the child
+             table (simulation_runner.store_recommendations).
+             Defaults to a temporary sqlite file; pass --url for Postgres.
+"""
+
+import sys
+import os
+import time
+import argparse
+import warnings
+import multiprocessing as mp
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+warnings.filterwarnings("ignore")
+
+
+def _timeit(fn, repeat: int) -> float:
+    """Best-of-`repeat` wall time of fn() in milliseconds."""
+    fn()  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000.0
+
+
+# -------------------------
+# tree: sklearn vs compiled
+# -------------------------
+def bench_tree(rows: int, repeat: int):
+    from inference_engine import CoalBlendInferenceEngine, TARGETS
+    from compiled_models import compile_estimator, verify_compiled, describe
+
+    print("=== Tree predictor benchmark (sklearn vs array-compiled) ===\n")
+    engine = CoalBlendInferenceEngine(compiled_targets=[], artifact_store_dir="")
+    fr = getattr(engine.colwise_scaler, "feature_range", (0.0, 1.0))
+    rng = np.random.default_rng(0)
+
+    print(f"{'target':<6} {'compiled as':<46} {'exact':>6} {'1-row sk':>9} {'1-row cmp':>10} "
+          f"{f'{rows}-row sk':>12} {f'{rows}-row cmp':>13}")
+    for target in TARGETS:
+        estimator = engine._target_plans.get(target, {}).get("estimator")
+        if estimator is None:
+            print(f"{target:<6} (no unwrapped estimator; skipped)")
+            continue
+        compiled = compile_estimator(estimator)
+        if compiled is None:
+            print(f"{target:<6} (can't compile {type(estimator).__name__}; skipped)")
+            continue
+
+        n_features = len(engine._target_plans[target]["estimator_columns"])
+        X = rng.uniform(fr[0], fr[1], size=(rows, n_features))
+        x1 = X[:1]
+        check = verify_compiled(compiled, estimator, X)
+
+        sk_1 = _timeit(lambda: estimator.predict(x1), repeat)
+        cp_1 = _timeit(lambda: compiled.predict(x1), repeat)
+        sk_n = _timeit(lambda: estimator.predict(X), repeat)
+        cp_n = _timeit(lambda: compiled.predict(X), repeat)
+        print(f"{target:<6} {describe(compiled)[:46]:<46} {check['exact']:>6.3f} {sk_1:>7.2f}ms {cp_1:>8.2f}ms "
+              f"{sk_n:>10.2f}ms {cp_n:>11.2f}ms")
+
+    print(f"\nEngine dispatch: compiled path is used for batches of <= COMPILED_MAX_ROWS "
+          f"(currently {engine.compiled_max_rows}) rows, sklearn above.")
+
+
+# -------------------------
+# memory: pickles vs shared artifact store
+# -------------------------
+def _memory_worker(store_dir, results, release):
+    """One 'uvicorn worker': load the engine, score a blend, report memory, stay alive until released."""
+    import io
+    import contextlib
+    import psutil
+    warnings.filterwarnings("ignore")
+    from inference_engine import CoalBlendInferenceEngine
+    from test_inference import create_sample_coal_data
+
+    proc = psutil.Process()
+    before = proc.memory_full_info()
+    engine = CoalBlendInferenceEngine(artifact_store_dir=store_dir)
+    coal_properties = create_sample_coal_data()
+    blend = [{"coal_name": name, "percentage": 100.0 / len(coal_properties)} for name in coal_properties]
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run_inference(coal_properties, blend)
+    after = proc.memory_full_info()
+    results.put({
+        "pid": proc.pid,
+        "mapped": sorted(engine._stored_plans),
+        "rss_before": before.rss, "rss": after.rss,
+        "uss": after.uss, "pss": getattr(after, "pss", float("nan")),
+    })
+    release.wait()
+
+
+def _measure_workers(n_workers: int, store_dir: str):
+    ctx = mp.get_context("spawn")  # same start method uvicorn --workers uses
+    results, release = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_memory_worker, args=(store_dir, results, release)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    release.set()
+    for p in procs:
+        p.join()
+    return rows
+
+
+def bench_memory(n_workers: int, store_dir: str):
+    from artifact_store import build_store, ArtifactStore
+
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Models")
+    if ArtifactStore.open(store_dir, models_dir) is None:
+        print(f"Building artifact store in {store_dir} ...")
+        build_store(models_dir, store_dir)
+
+    mb = 1024.0 * 1024.0
+    print(f"\n=== Per-worker memory, {n_workers} concurrent workers (MB) ===\n")
+    print(f"{'mode':<8} {'pid':>7} {'RSS before load':>16} {'RSS':>8} {'USS':>8} {'PSS':>8}  mapped")
+    for mode, sdir in (("pickle", ""), ("store", store_dir)):
+        rows = _measure_workers(n_workers, sdir)
+        for r in rows:
+            print(f"{mode:<8} {r['pid']:>7} {r['rss_before'] / mb:>16.1f} {r['rss'] / mb:>8.1f} "
+                  f"{r['uss'] / mb:>8.1f} {r['pss'] / mb:>8.1f}  {','.join(r['mapped']) or '-'}")
+        print(f"{mode:<8} {'total':>7} {'':>16} {sum(r['rss'] for r in rows) / mb:>8.1f} "
+              f"{sum(r['uss'] for r in rows) / mb:>8.1f} {sum(r['pss'] for r in rows) / mb:>8.1f}\n")
+    print("USS = private to the worker; PSS = private + fair share of pages shared with the other workers.")
+
+
+# -------------------------
+# targets: sequential vs thread pool
+# -------------------------
+def bench_targets(threads: int, row_counts, repeat: int):
+    from inference_engine import CoalBlendInferenceEngine
+    from prediction_cache import PredictionCache
+
+    print(f"=== predict_all: sequential vs {threads} threads (host CPUs: {os.cpu_count()}) ===\n")
+    engines = {
+        "sequential": CoalBlendInferenceEngine(cache=PredictionCache(0), parallel_targets=0),
+        "parallel": CoalBlendInferenceEngine(cache=PredictionCache(0), parallel_targets=threads),
+    }
+    n_scaled = len(engines["sequential"]._scaled_names)
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>6} {'sequential':>12} {'parallel':>12} {'speedup':>8}")
+    for rows in row_counts:
+        S = np.zeros((rows, n_scaled + 1))
+        S[:, :n_scaled] = rng.uniform(0.0, 2.0, size=(rows, n_scaled))
+        ref = engines["sequential"]._predict_all_matrix(S)
+        got = engines["parallel"]._predict_all_matrix(S)
+        assert all(np.array_equal(ref[t], got[t]) for t in ref), "parallel predictions differ"
+        seq = _timeit(lambda: engines["sequential"]._predict_all_matrix(S), repeat)
+        par = _timeit(lambda: engines["parallel"]._predict_all_matrix(S), repeat)
+        print(f"{rows:>6} {seq:>10.2f}ms {par:>10.2f}ms {seq / par:>7.2f}x")
+
+
+# -------------------------
+# ga: optimizer wall time
+# -------------------------
+def _ga_fixture(n_coals: int, seed: int):
+    """(coal_df shaped like run_optimization's, 22->8 model, model description)."""
+    import joblib
+    import pandas as pd
+    # genetic_algorithm imports models -> database, which needs a URL but no connection here
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from genetic_algorithm import MODEL_FEATURES
+
+    rng = np.random.default_rng(seed)
+    columns = MODEL_FEATURES + ["N"]
+    coal_df = pd.DataFrame(rng.uniform(0.5, 60.0, size=(n_coals, len(columns))), columns=columns)
+    # Proximate analysis in realistic coking-coal ranges so the blend bounds are reachable
+    for col, (low, high) in {"Ash": (6.0, 18.0), "VM_weight": (15.0, 38.0), "FC": (45.0, 72.0)}.items():
+        coal_df[col] = rng.uniform(low, high, size=n_coals)
+    coal_df.insert(0, "Name_of_coal", [f"Coal {i}" for i in range(n_coals)])
+    coal_df["Cost"] = rng.uniform(80.0, 250.0, size=n_coals).round(2)
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Models", "multioutput_rf_model.pkl")
+    if os.path.exists(path):
+        return coal_df, joblib.load(path), path
+
+    from sklearn.ensemble import RandomForestRegressor
+    lows, highs = coal_df[MODEL_FEATURES].min().values, coal_df[MODEL_FEATURES].max().values
+    X = rng.uniform(lows, highs, size=(2000, len(MODEL_FEATURES)))
+    W = rng.normal(size=(len(MODEL_FEATURES), 8)) / len(MODEL_FEATURES)
+    y = X @ W + rng.normal(scale=0.5, size=(2000, 8))
+    # Blend ash/vm/fc are (noisy) linear mixes of the coal columns, as in the real model
+    y[:, 0:3] = X[:, [MODEL_FEATURES.index(c) for c in ("Ash", "VM_weight", "FC")]] + rng.normal(scale=0.3, size=(2000, 3))
+    y[:, 4:8] /= 100.0  # coke properties are fractions in the real model
+    model = RandomForestRegressor(n_estimators=100, max_depth=12, random_state=seed, n_jobs=-1)
+    model.fit(pd.DataFrame(X, columns=MODEL_FEATURES), y)
+    return coal_df, model, "stand-in RandomForestRegressor(100 trees, 22 -> 8)"
+
+
+def _run_ga(coal_df, model, seed: int, mode: str = "ga", **settings):
+    import random
+    from genetic_algorithm import CoalBlendOptimizer
+
+    random.seed(seed)
+    np.random.seed(seed)
+    optimizer = CoalBlendOptimizer("", coal_df, model=model)
+    for name, value in settings.items():
+        setattr(optimizer, name, value)
+    calls = {"n": 0}
+    predict = model.predict
+
+    def counting_predict(X):
+        calls["n"] += 1
+        return predict(X)
+
+    model.predict = counting_predict
+    try:
+        t = time.perf_counter()
+        result = optimizer.optimize(mode=mode)
+        elapsed = time.perf_counter() - t
+    finally:
+        del model.predict
+    return result, elapsed, calls["n"], optimizer
+
+
+def bench_ga(n_coals: int, seed: int):
+    import logging
+    logging.getLogger("genetic_algorithm").setLevel(logging.WARNING)
+
+    coal_df, model, source = _ga_fixture(n_coals, seed)
+    print(f"=== GA wall time ({n_coals} coals, model: {source}) ===\n")
+    print(f"{'mode':<16} {'wall':>9} {'predict calls':>14} {'blends':>8} {'blends/s':>10} {'best cost':>11}")
+    results = {}
+    modes = (("per-individual", {"BATCH_EVAL": False}), ("per-generation", {"BATCH_EVAL": True}),
+             ("array", {"ARRAY_POPULATION": True, "RANDOM_SEED": seed}), ("exhaustive", {"mode": "exhaustive"}),
+             ("gen+prefilter", {"LINEAR_PREFILTER": True}),
+             ("exh+prefilter", {"mode": "exhaustive", "LINEAR_PREFILTER": True}),
+             ("gen+surrogate", {"SURROGATE": True}),
+             ("array+surrogate", {"ARRAY_POPULATION": True, "RANDOM_SEED": seed, "SURROGATE": True}))
+    for mode, settings in modes:
+        result, elapsed, calls, _ = _run_ga(coal_df, model, seed, **settings)
+        results[mode] = (result, elapsed)
+        search = result["search"]
+        avoided = search.get("prefilter", search.get("surrogate", {})).get("model_rows_avoided")
+        print(f"{mode:<16} {elapsed:>8.2f}s {calls:>14} {search['evaluated']:>8} "
+              f"{search['blends_per_s'] or 0:>10.0f} {result['total_cost']:>11.3f}"
+              + (f"   ({avoided} model rows avoided)" if avoided is not None else ""))
+
+    same = ({k: v for k, v in results["per-individual"][0].items() if k != "search"}
+            == {k: v for k, v in results["per-generation"][0].items() if k != "search"})
+    print(f"\nIdentical results: {same}   speedup: "
+          f"{results['per-individual'][1] / results['per-generation'][1]:.1f}x")
+
+
+def bench_ga_ops(n_coals: int, pop_sizes, repeat: int):
+    import random
+
+    coal_df, _, _ = _ga_fixture(n_coals, 0)
+    from genetic_algorithm import CoalBlendOptimizer
+    print(f"=== GA operators, one generation on a scored population ({n_coals} coals) ===\n")
+    print(f"{'pop':>7} {'list':>10} {'array':>10} {'speedup':>8}")
+    for pop in pop_sizes:
+        opt = CoalBlendOptimizer("", coal_df, model=object())
+        opt.POP_SIZE = pop
+        random.seed(0)
+        rng = np.random.default_rng(0)
+
+        # list path: sort on cached fitness, then the tournament/crossover/mutate loop
+        population = [opt.generate_individual() for _ in range(pop)]
+        for ind in population:
+            opt._fitness_cache[(tuple(ind[:3]), tuple(ind[3:]))] = random.random()
+
+        def list_generation():
+            ranked = sorted(population, key=opt.fitness)
+            new_pop = ranked[:opt.ELITE_SIZE]
+            while len(new_pop) < pop:
+                p1 = opt._tournament_selection(ranked[:50])
+                p2 = opt._tournament_selection(ranked[:50])
+                new_pop.append(opt._mutate(opt._crossover(p1, p2)))
+            return new_pop
+
+        array_pop = opt.random_population(rng, pop)
+        array_fitness = rng.random(pop)
+
+        def array_generation():
+            order = np.argsort(array_fitness, kind="stable")
+            ranked = array_pop[order]
+            n_children = pop - opt.ELITE_SIZE
+            p1 = ranked[opt.tournament_select_array(rng, pop // 2, n_children)]
+            p2 = ranked[opt.tournament_select_array(rng, pop // 2, n_children)]
+            children = opt._canonicalize(opt.mutate_array(rng, opt.crossover_array(rng, p1, p2)))
+            return opt.deduplicate_array(rng, np.vstack([ranked[:opt.ELITE_SIZE], children]), keep=opt.ELITE_SIZE)
+
+        list_ms = _timeit(list_generation, repeat)
+        array_ms = _timeit(array_generation, repeat)
+        print(f"{pop:>7} {list_ms:>8.2f}ms {array_ms:>8.2f}ms {list_ms / array_ms:>7.1f}x")
+
+
+# -------------------------
+# islands: time to target fitness
+# -------------------------
+def _time_to_target(trace, target: float):
+    for elapsed, best in trace:
+        if best <= target:
+            return elapsed
+    return None
+
+
+def bench_islands(n_coals: int, island_counts, generations: int, tolerance: float, seed: int):
+    import logging
+    logging.getLogger("genetic_algorithm").setLevel(logging.WARNING)
+
+    coal_df, model, source = _ga_fixture(n_coals, seed)
+    from genetic_algorithm import CoalBlendOptimizer
+
+    exhaustive = CoalBlendOptimizer("", coal_df, model=model)
+    result = exhaustive.optimize(mode="exhaustive")
+    best = result["blend_combinations"][0]
+    names = list(exhaustive.coal_names)
+    optimum = exhaustive.fitness([names.index(c["name"]) for c in best["coals"]]
+                                 + [c["percentage"] for c in best["coals"]])
+    target = optimum + abs(optimum) * tolerance
+    print(f"=== GA time to target ({n_coals} coals, {generations} generations, model: {source}) ===")
+    print(f"Exhaustive optimum {optimum:.3f}; target <= {target:.3f} ({tolerance:.2%}); "
+          f"host CPUs: {os.cpu_count()}\n")
+    print(f"{'mode':<12} {'wall':>8} {'to target':>10} {'best fitness':>13}")
+
+    runs = [("serial", {"ARRAY_POPULATION": True})]
+    runs += [(f"{k} islands", {"ISLANDS": k}) for k in island_counts]
+    for label, settings in runs:
+        optimizer = CoalBlendOptimizer("", coal_df, model=model)
+        optimizer.N_GEN = generations
+        optimizer.RANDOM_SEED = seed
+        for name, value in settings.items():
+            setattr(optimizer, name, value)
+        t = time.perf_counter()
+        optimizer.optimize()
+        elapsed = time.perf_counter() - t
+        reached = _time_to_target(optimizer.search_trace, target)
+        final = optimizer.search_trace[-1][1]
+        print(f"{label:<12} {elapsed:>7.2f}s {f'{reached:.2f}s' if reached is not None else 'never':>10} "
+              f"{final:>13.3f}")
+
+
+# -------------------------
+# store: cross-simulation prediction store
+# -------------------------
+def bench_store(n_coals: int, runs: int, seed: int):
+    import logging
+    import tempfile
+    logging.getLogger("genetic_algorithm").setLevel(logging.WARNING)
+
+    coal_df, model, source = _ga_fixture(n_coals, seed)
+    from genetic_algorithm import CoalBlendOptimizer
+    from prediction_store import PredictionStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PredictionStore(os.path.join(tmp, "predictions.sqlite"))
+        print(f"=== GA runs sharing one prediction store ({n_coals} coals, model: {source}) ===\n")
+        print(f"{'run':>4} {'constraints':<22} {'wall':>8} {'predicted':>10} {'from store':>11} {'best cost':>10}")
+        for run in range(runs):
+            ash_high = 15 - run  # every run tightens blend ash
+            optimizer = CoalBlendOptimizer("", coal_df, model=model)
+            optimizer.ARRAY_POPULATION = True
+            optimizer.RANDOM_SEED = seed
+            optimizer.prediction_store = store
+            optimizer.model_version = "bench"
+            t = time.perf_counter()
+            result = optimizer.optimize(custom_constraints={"blend": {"ash": (5, ash_high)}})
+            elapsed = time.perf_counter() - t
+            used = result["search"]["prediction_store"]
+            print(f"{run + 1:>4} {f'blend ash 5-{ash_high}':<22} {elapsed:>7.2f}s {used['misses']:>10} "
+                  f"{used['hits']:>11} {result['total_cost']:>10.3f}")
+        print(f"\nstore: {store.stats()}")
+
+
+# -------------------------
+# recs: recommendation persistence
+# -------------------------
+def _synthetic_blends(coal_df, n_blends: int, seed: int):
+    rng = np.random.default_rng(seed)
+    names = coal_df["Name_of_coal"].tolist()
+    blends = []
+    for _ in range(n_blends):
+        picked = rng.choice(len(names), size=3, replace=False)
+        ratios = rng.choice(np.arange(5, 95, 5), size=2, replace=False)
+        ratios = [int(min(ratios)), int(max(ratios) - min(ratios)), int(100 - max(ratios))]
+        blends.append({
+            "coals": [{"name": names[i], "percentage": r} for i, r in zip(picked, ratios)],
+            "predicted": {k: float(v) for k, v in zip(
+                ["ash", "vm", "fc", "csn", "cri", "csr", "ash_final", "vm_final"], rng.uniform(0, 60, 8))},
+            "total_cost": float(rng.uniform(80, 250)),
+        })
+    return blends
+
+
+def bench_recs(row_counts, url: str, seed: int):
+    import tempfile
+    coal_df, _, _ = _ga_fixture(26, seed)
+    tmp = None
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmp.name, 'recs.sqlite')}"
+    os.environ["DATABASE_URL"] = url
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import models
+    from emissions import calculate_emissions
+    from simulation_runner import recommendation_rows, store_recommendations
+
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine, tables=[models.User.__table__, models.Simulation.__table__,
+                                                         models.SimulationCoalRecommendations.__table__,
+                                                         models.SimulationRecommendationCoal.__table__])
+    Session = sessionmaker(bind=engine)
+    names = coal_df["Name_of_coal"].tolist()
+
+    def orm_path(db, simulation_id, blends):
+        # The original path: a fresh all-coals coal_percentages dict and an ORM object per blend,
+        # emissions left for the read
+        for blend in blends:
+            coal_percentages = {name: 0.0 for name in names}
+            for coal in blend["coals"]:
+                coal_percentages[coal["name"]] = coal["percentage"]
+            db.add(models.SimulationCoalRecommendations(
+                simulation_id=simulation_id, coal_percentages=coal_percentages,
+                total_cost=blend.get("total_cost", 0.0),
+                **{f"predicted_{k}": v for k, v in blend["predicted"].items()}))
+        db.commit()
+
+    def bulk_path(db, simulation_id, blends):
+        store_recommendations(db, simulation_id, {"all_unique_blends": blends[:-1],
+                                                  "blend_combinations": blends[-1:]}, coal_df)
+        db.commit()
+
+    print(f"=== Persisting recommendations ({engine.dialect.name}) ===\n")
+    print(f"{'rows':>7} {'ORM objects':>12} {'bulk+emissions':>15} {'speedup':>8}")
+    simulation_id = 0
+    for n_rows in row_counts:
+        blends = _synthetic_blends(coal_df, n_rows, seed)
+        timings = []
+        for path in (orm_path, bulk_path):
+            simulation_id += 1
+            db = Session()
+            db.add(models.Simulation(id=simulation_id, scenario_name="bench", status="running"))
+            db.commit()
+            t = time.perf_counter()
+            path(db, simulation_id, blends)
+            timings.append(time.perf_counter() - t)
+            db.close()
+        print(f"{n_rows:>7} {timings[0] * 1e3:>10.1f}ms {timings[1] * 1e3:>13.1f}ms {timings[0] / timings[1]:>7.1f}x")
+
+    ### Vectorized emissions match the scalar formula on the catalog-weighted properties
+    row = recommendation_rows(0, blends[:1], coal_df)[0]
+    coals = coal_df.set_index("Name_of_coal")
+    weighted = {arg: sum(coals.loc[c["name"], col] * c["percentage"] / 100 for c in blends[0]["coals"])
+                for arg, col in {"fc": "FC", "ash": "Ash", "vm": "VM_weight", "s": "S", "n": "N",
+                                 "cri": "CRI_weight", "csr": "CSR_weight"}.items()}
+    expected = calculate_emissions(**weighted)
+    print(f"\nEmissions match scalar calculate_emissions: "
+          f"{bool(np.isclose(row['CO2_Emissions'], expected['CO2_Emissions']) and np.isclose(row['VOC_index'], expected['VOC_Index']))}")
+    engine.dispose()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coal blend inference benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_tree = sub.add_parser("tree", help="sklearn vs array-compiled tree predictors")
+    p_tree.add_argument("--rows", type=int, default=1000)
+    p_tree.add_argument("--repeat", type=int, default=20)
+
+    p_mem = sub.add_parser("memory", help="per-worker RSS: pickles vs memory-mapped artifact store")
+    p_mem.add_argument("--workers", type=int, default=4)
+    p_mem.add_argument("--store", default=os.getenv("ARTIFACT_STORE_DIR", "artifact_store"))
+
+    p_targets = sub.add_parser("targets", help="predict_all: sequential vs thread pool")
+    p_targets.add_argument("--threads", type=int, default=4)
+    p_targets.add_argument("--rows", default="1,100,1000")
+    p_targets.add_argument("--repeat", type=int, default=20)
+
+    p_ga = sub.add_parser("ga", help="GA wall time: per-individual vs per-generation evaluation")
+    p_ga.add_argument("--coals", type=int, default=26)
+    p_ga.add_argument("--seed", type=int, default=0)
+
+    p_ops = sub.add_parser("ga-ops", help="GA operator overhead: list vs array population")
+    p_ops.add_argument("--coals", type=int, default=26)
+    p_ops.add_argument("--pop", default="100,1000,10000")
+    p_ops.add_argument("--repeat", type=int, default=5)
+
+    p_isl = sub.add_parser("islands", help="GA time-to-target: serial vs island model")
+    p_isl.add_argument("--coals", type=int, default=26)
+    p_isl.add_argument("--islands", default="2,4")
+    p_isl.add_argument("--generations", type=int, default=60)
+    p_isl.add_argument("--tolerance", type=float, default=0.001, help="relative gap to the exhaustive optimum")
+    p_isl.add_argument("--seed", type=int, default=0)
+
+    p_store = sub.add_parser("store", help="GA runs sharing a prediction store")
+    p_store.add_argument("--coals", type=int, default=26)
+    p_store.add_argument("--runs", type=int, default=3)
+    p_store.add_argument("--seed", type=int, default=0)
+
+    p_recs = sub.add_parser("recs", help="recommendation persistence: ORM objects vs bulk insert")
+    p_recs.add_argument("--rows", default="1000,10000")
+    p_recs.add_argument("--url", default="", help="database URL (default: temporary sqlite file)")
+    p_recs.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "tree":
+        bench_tree(args.rows, args.repeat)
+    elif args.command == "memory":
+        bench_memory(args.workers, args.store)
+    elif args.command == "targets":
+        bench_targets(args.threads, [int(r) for r in args.rows.split(",")], args.repeat)
+    elif args.command == "ga":
+        bench_ga(args.coals, args.seed)
+    elif args.command == "ga-ops":
+        bench_ga_ops(args.coals, [int(p) for p in args.pop.split(",")], args.repeat)
+    elif args.command == "islands":
+        bench_islands(args.coals, [int(k) for k in args.islands.split(",")], args.generations,
+                      args.tolerance, args.seed)
+    elif args.command == "store":
+        bench_store(args.coals, args.runs, args.seed)
+    elif args.command == "recs":
+        bench_recs([int(r) for r in args.rows.split(",")], args.url, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# coal_catalog.py
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Numeric properties summed per blend (column order of the catalog matrix)
+# =========================
+CATALOG_PROPERTIES = [
+    "IM", "Ash", "VM", "FC", "S", "P", "SiO2", "Al2O3", "Fe2O3", "CaO", "MgO",
+    "Na2O", "K2O", "TiO2", "Mn3O4", "SO3", "P2O5", "BaO", "SrO", "ZnO",
+    "CRI", "CSR", "N", "HGI", "Vitrinite", "Liptinite", "Semi_Fusinite",
+    "CSN_FSI", "Initial_Softening_Temp", "MBI", "CBI", "Log_Max_Fluidity",
+    "C", "H", "O", "ss", "Rank",
+    "V7", "V8", "V9", "V10", "V11", "V12", "V13", "V14", "V15", "V16", "V17", "V18", "V19",
+    "Inertinite", "Minerals", "MaxFluidity",
+]
+
+# Category flags (one-hot block of the catalog)
+CATEGORY_FLAGS = ["HCC", "SHCC", "HFCC", "PCI", "WC"]
+
+# Oxides used by the basicity index (plain, unweighted sums over the blend's coals)
+BI_OXIDES = ["Fe2O3", "CaO", "MgO", "Na2O", "K2O", "SiO2", "Al2O3", "TiO2"]
+
+
+def _as_float(coal: Any, prop: str) -> float:
+    """Attribute -> float; missing, None, non-numeric or non-finite values count as 0.0."""
+    val = getattr(coal, prop, None)
+    if val is None:
+        return 0.0
+    try:
+        v = float(val)
+    except Exception:
+        return 0.0
+    return v if np.isfinite(v) else 0.0
+
+
+class CoalCatalog:
+    """
+    Dense, read-only view of a set of coals:
+      - values:   float64 matrix (coals × CATALOG_PROPERTIES)
+      - category: float64 one-hot matrix (coals × CATEGORY_FLAGS)
+      - index:    coal_name -> row
+
+    Per-blend sums become matrix products against a (blends × coals) weight matrix,
+    so no attribute lookups happen after the catalog is built.
+    """
+
+    def __init__(self, names: List[str], values: np.ndarray, category: np.ndarray):
+        self.names = list(names)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.category = np.ascontiguousarray(category, dtype=np.float64)
+        self.prop_index: Dict[str, int] = {p: j for j, p in enumerate(CATALOG_PROPERTIES)}
+        self._fingerprint: Optional[str] = None
+        self._row_digests: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_properties(cls, coal_properties: Dict[str, Any]) -> "CoalCatalog":
+        """Build from {coal_name: CoalProperties-like object} (SQLAlchemy rows or mocks)."""
+        names = [name for name, coal in coal_properties.items() if coal]
+        values = np.zeros((len(names), len(CATALOG_PROPERTIES)), dtype=np.float64)
+        category = np.zeros((len(names), len(CATEGORY_FLAGS)), dtype=np.float64)
+
+        for i, name in enumerate(names):
+            coal = coal_properties[name]
+            values[i] = [_as_float(coal, p) for p in CATALOG_PROPERTIES]
+
+            cat = getattr(coal, "category", None)
+            if cat is None:
+                cat = getattr(coal, "coal_category", "")
+            cat = str(cat).upper()
+            if cat in CATEGORY_FLAGS:
+                category[i, CATEGORY_FLAGS.index(cat)] = 1.0
+
+        return cls(names, values, category)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of names, property values and categories."""
+        if self._fingerprint is None:
+            h = hashlib.sha256()
+            h.update("\x1f".join(self.names).encode("utf-8"))
+            h.update(self.values.tobytes())
+            h.update(self.category.tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def blend_fingerprint(self, coal_names: List[str]) -> str:
+        """Content hash of only the rows a blend uses (names not in the catalog hash as absent)."""
+        h = hashlib.sha256()
+        for name in sorted(set(coal_names)):
+            digest = self._row_digests.get(name)
+            if digest is None:
+                i = self.index.get(name)
+                digest = b"-" if i is None else hashlib.sha256(
+                    self.values[i].tobytes() + self.category[i].tobytes()).digest()
+                self._row_digests[name] = digest
+            h.update(name.encode("utf-8") + b"\x1f" + digest)
+        return h.hexdigest()
+
+    def column(self, prop: str) -> np.ndarray:
+        return self.values[:, self.prop_index[prop]]
+
+    # -------------------------
+    # Blend -> weight matrices
+    # -------------------------
+    def weight_matrix(self, list_of_blend_ratios: List[List[Dict]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns (weights, counts, total_weight):
+          weights[n, c]   = Σ raw percentage of coal c in blend n (no /100)
+          counts[n, c]    = how many times coal c appears in blend n
+          total_weight[n] = Σ raw percentage of blend n, including coals not in the catalog
+        """
+        n = len(list_of_blend_ratios)
+        weights = np.zeros((n, len(self.names)), dtype=np.float64)
+        counts = np.zeros((n, len(self.names)), dtype=np.float64)
+        total_weight = np.zeros(n, dtype=np.float64)
+
+        for r, blend_ratios in enumerate(list_of_blend_ratios):
+            for b in blend_ratios:
+                try:
+                    w_raw = float(b.get("percentage", 0.0))
+                except Exception:
+                    w_raw = 0.0
+                total_weight[r] += w_raw
+
+                c = self.index.get(b.get("coal_name"))
+                if c is None:
+                    continue
+                weights[r, c] += w_raw
+                counts[r, c] += 1.0
+
+        return weights, counts, total_weight
+
+    # -------------------------
+    # Sums (one matrix product each)
+    # -------------------------
+    def weighted_sums(self, weights: np.ndarray) -> np.ndarray:
+        """(blends × coals) @ (coals × props) -> Σ value·weight per property."""
+        return weights @ self.values
+
+    def category_sums(self, weights: np.ndarray) -> np.ndarray:
+        """(blends × coals) @ (coals × categories) -> raw weight per category flag."""
+        return weights @ self.category
+
+    def unweighted_sums(self, counts: np.ndarray, props: List[str]) -> np.ndarray:
+        """Plain sums of `props` over the coals included in each blend (ignores percentages)."""
+        cols = [self.prop_index[p] for p in props]
+        return counts @ self.values[:, cols]
@@ -0,0 +1,348 @@
+# compiled_models.py
+"""
+Array-compiled predictors for the fitted per-target estimators.
+
+Tree ensembles (RandomForest / GradientBoosting / LightGBM) are flattened into
+contiguous NumPy arrays (feature, threshold, left, right, value) and evaluated
+for a whole batch with a vectorized level-by-level traversal. Linear members are
+reduced to coef/intercept, VotingRegressor combines its members exactly like
+sklearn does, and anything else (e.g. KNN) is called through its own predict.
+
+compile_estimator() returns None when an estimator can't be reproduced, so the
+caller can keep using the sklearn object.
+"""
+import copy
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# LightGBM objectives whose raw score is the prediction (identity link)
+_LGBM_IDENTITY_OBJECTIVES = {"regression", "regression_l2", "l2", "regression_l1", "l1",
+                             "huber", "fair", "quantile", "mape"}
+
+# LightGBM's kZeroThreshold (values in (-k, k] count as zero for missing_type == "Zero")
+_LGBM_ZERO_THRESHOLD = 1e-35
+
+
+class CompiledTrees:
+    """
+    A list of binary trees packed into flat node arrays (node ids are global across
+    trees; children are stored as pairs so the next node is children[2*node + go_right]).
+    Traversal advances every (row, tree) pair one level per step and drops pairs as
+    they reach a leaf, so the work follows the actual path lengths.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, depth: int, float32_inputs: bool,
+                 zero_missing: Optional[np.ndarray] = None, default_left: Optional[np.ndarray] = None):
+        left = np.asarray(left, dtype=np.intp)
+        right = np.asarray(right, dtype=np.intp)
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children = np.ascontiguousarray(np.stack([left, right], axis=1).ravel())
+        self.is_leaf = np.ascontiguousarray(left == np.arange(len(left)))
+        self.value = np.ascontiguousarray(value, dtype=np.float64)  # (n_nodes, n_outputs)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.depth = int(depth)
+        # sklearn trees compare float32(X) against float64 thresholds
+        self.float32_inputs = bool(float32_inputs)
+        # LightGBM missing_type == "Zero": zeros follow default_left instead of the threshold
+        self.zero_missing = zero_missing if zero_missing is not None and zero_missing.any() else None
+        self.default_left = default_left
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """(n_rows, n_features) -> (n_rows, n_trees, n_outputs) leaf values."""
+        X = np.asarray(X, dtype=np.float64)
+        if self.float32_inputs:
+            X = X.astype(np.float32).astype(np.float64)
+        n_rows, n_features = X.shape
+        Xf = np.ascontiguousarray(X).ravel()
+
+        # One entry per (row, tree) pair, row-major
+        pos = np.arange(n_rows * self.n_trees)
+        node = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        leaf_node = np.empty(n_rows * self.n_trees, dtype=np.intp)
+
+        while pos.size:
+            done = self.is_leaf[node]
+            if done.any():
+                leaf_node[pos[done]] = node[done]
+                keep = ~done
+                pos, node, row_base = pos[keep], node[keep], row_base[keep]
+                if not pos.size:
+                    break
+            x = Xf[row_base + self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if self.zero_missing is not None:
+                is_zero = (x > -_LGBM_ZERO_THRESHOLD) & (x <= _LGBM_ZERO_THRESHOLD)
+                go_left = np.where(self.zero_missing[node] & is_zero, self.default_left[node], go_left)
+            node = self.children[2 * node + ~go_left]
+
+        return self.value[leaf_node].reshape(n_rows, self.n_trees, -1)
+
+    # -------------------------
+    # Builders
+    # -------------------------
+    @classmethod
+    def from_sklearn_trees(cls, trees: List[Any]) -> "CompiledTrees":
+        """Flatten fitted sklearn DecisionTreeRegressor objects (or their tree_)."""
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for est in trees:
+            t = getattr(est, "tree_", est)
+            n = t.node_count
+            ids = np.arange(offset, offset + n)
+            leaf = t.children_left == -1
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(np.where(leaf, np.inf, t.threshold))
+            left.append(np.where(leaf, ids, t.children_left + offset))
+            right.append(np.where(leaf, ids, t.children_right + offset))
+            value.append(t.value[:, :, 0])
+            roots.append(offset)
+            depth = max(depth, int(t.max_depth))
+            offset += n
+        return cls(np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+                   np.concatenate(right), np.concatenate(value), np.array(roots), depth,
+                   float32_inputs=True)
+
+    @classmethod
+    def from_lightgbm_dump(cls, tree_info: List[Dict[str, Any]]) -> Optional["CompiledTrees"]:
+        """Flatten LightGBM Booster.dump_model()["tree_info"]. None for categorical/linear trees."""
+        feature, threshold, left, right, value = [], [], [], [], []
+        zero_missing, default_left, roots = [], [], []
+        depth = 0
+
+        def new_node() -> int:
+            for arr, fill in ((feature, 0), (threshold, np.inf), (left, -1), (right, -1),
+                              (value, 0.0), (zero_missing, False), (default_left, False)):
+                arr.append(fill)
+            return len(feature) - 1
+
+        for info in tree_info:
+            if info.get("num_cat", 0) or info.get("is_linear", False):
+                return None
+            stack = [(info["tree_structure"], new_node(), 1)]
+            roots.append(stack[0][1])
+            while stack:
+                node, i, level = stack.pop()
+                depth = max(depth, level)
+                if "leaf_value" in node:
+                    left[i] = right[i] = i
+                    value[i] = float(node["leaf_value"])
+                    continue
+                if node.get("decision_type") != "<=":
+                    return None
+                feature[i] = int(node["split_feature"])
+                threshold[i] = float(node["threshold"])
+                zero_missing[i] = node.get("missing_type") == "Zero"
+                default_left[i] = bool(node.get("default_left", True))
+                left[i], right[i] = new_node(), new_node()
+                stack.append((node["left_child"], left[i], level + 1))
+                stack.append((node["right_child"], right[i], level + 1))
+
+        return cls(np.array(feature), np.array(threshold), np.array(left), np.array(right),
+                   np.array(value)[:, None], np.array(roots), depth, float32_inputs=False,
+                   zero_missing=np.array(zero_missing, dtype=bool),
+                   default_left=np.array(default_left, dtype=bool))
+
+
+class CompiledForest:
+    """RandomForestRegressor: mean of the trees, accumulated tree by tree like sklearn."""
+
+    kind = "forest"
+
+    def __init__(self, trees: CompiledTrees, n_outputs: int):
+        self.trees = trees
+        self.n_outputs = n_outputs
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        vals = self.trees.leaf_values(X)
+        out = np.cumsum(vals, axis=1)[:, -1] / self.trees.n_trees
+        return out[:, 0] if self.n_outputs == 1 else out
+
+
+class CompiledBoosting:
+    """GradientBoosting / LightGBM: base + Σ scale·tree, accumulated in stage order."""
+
+    kind = "boosting"
+
+    def __init__(self, trees: CompiledTrees, base: float, scale: float):
+        self.trees = trees
+        self.base = float(base)
+        self.scale = float(scale)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        vals = self.trees.leaf_values(X)[:, :, 0]
+        if self.scale != 1.0:
+            vals = self.scale * vals
+        vals = np.concatenate([np.full((vals.shape[0], 1), self.base), vals], axis=1)
+        return np.cumsum(vals, axis=1)[:, -1]
+
+
+class CompiledLinear:
+    """Linear models (Ridge, BayesianRidge, Huber, LinearRegression): X @ coef + intercept."""
+
+    kind = "linear"
+
+    def __init__(self, coef: np.ndarray, intercept: float):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.coef + self.intercept
+
+
+class Passthrough:
+    """Members with no array form (e.g. KNN) keep their own predict."""
+
+    kind = "passthrough"
+
+    def __init__(self, estimator: Any):
+        self.estimator = estimator
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(self.estimator.predict(X), dtype=float)
+
+
+class RowwisePredictor:
+    """
+    Calls est.predict one row at a time. Used for nearest-neighbour members: sklearn breaks
+    equal-distance ties differently depending on the batch size, so a batched call can pick
+    other neighbours than the single-row call for the same input.
+    """
+
+    kind = "rowwise"
+
+    def __init__(self, estimator: Any):
+        self.estimator = estimator
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X)
+        if X.shape[0] <= 1:
+            return np.asarray(self.estimator.predict(X), dtype=float)
+        return np.concatenate([np.asarray(self.estimator.predict(X[i:i + 1]), dtype=float) for i in range(X.shape[0])])
+
+
+def stabilize_neighbors(est: Any) -> Any:
+    """Batch-size-independent version of est: KNN (or VotingRegressor KNN members) predict row-wise."""
+    kind = type(est).__name__
+    if kind in ("KNeighborsRegressor", "RadiusNeighborsRegressor"):
+        return RowwisePredictor(est)
+    if kind == "VotingRegressor" and any(type(m).__name__.endswith("NeighborsRegressor") for m in est.estimators_):
+        est = copy.copy(est)
+        est.estimators_ = [stabilize_neighbors(m) for m in est.estimators_]
+    return est
+
+
+class CompiledVoting:
+    """VotingRegressor: np.average over member predictions with the fitted weights."""
+
+    kind = "voting"
+
+    def __init__(self, members: List[Any], weights: Optional[List[float]]):
+        self.members = members
+        self.weights = weights
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        preds = np.asarray([m.predict(X) for m in self.members]).T
+        return np.average(preds, axis=1, weights=self.weights)
+
+
+def describe(compiled: Any) -> str:
+    """Short human-readable summary, e.g. 'voting[forest(100), boosting(100), passthrough]'."""
+    if isinstance(compiled, CompiledVoting):
+        return "voting[" + ", ".join(describe(m) for m in compiled.members) + "]"
+    trees = getattr(compiled, "trees", None)
+    if trees is not None:
+        return f"{compiled.kind}({trees.n_trees})"
+    return compiled.kind
+
+
+# -------------------------
+# Compiler
+# -------------------------
+def compile_estimator(est: Any, allow_passthrough: bool = False) -> Optional[Any]:
+    """
+    Return an object with .predict(X: ndarray) reproducing est.predict, or None.
+    allow_passthrough lets a VotingRegressor keep uncompilable members as-is.
+    """
+    kind = type(est).__name__
+    try:
+        if kind == "RowwisePredictor":
+            return _passthrough_or_none(est, allow_passthrough)
+
+        if kind == "VotingRegressor":
+            members = [compile_estimator(m, allow_passthrough=True) for m in est.estimators_]
+            if all(isinstance(m, Passthrough) for m in members):
+                return None
+            return CompiledVoting(members, getattr(est, "_weights_not_none", est.weights))
+
+        if kind in ("RandomForestRegressor", "ExtraTreesRegressor"):
+            return CompiledForest(CompiledTrees.from_sklearn_trees(est.estimators_), est.n_outputs_)
+
+        if kind == "GradientBoostingRegressor":
+            init = est.init_
+            if isinstance(init, str) and init == "zero":
+                base = 0.0
+            elif type(init).__name__ == "DummyRegressor":
+                base = float(np.ravel(init.constant_)[0])
+            else:
+                return _passthrough_or_none(est, allow_passthrough)
+            return CompiledBoosting(CompiledTrees.from_sklearn_trees(list(est.estimators_[:, 0])),
+                                    base, est.learning_rate)
+
+        if kind == "LGBMRegressor":
+            booster = est.booster_
+            dump = booster.dump_model()
+            objective = str(dump.get("objective", "")).split(" ")[0]
+            if objective not in _LGBM_IDENTITY_OBJECTIVES or dump.get("average_output", False):
+                return _passthrough_or_none(est, allow_passthrough)
+            tree_info = dump["tree_info"]
+            best = getattr(booster, "best_iteration", 0) or 0
+            if best > 0:
+                tree_info = tree_info[:best * dump.get("num_tree_per_iteration", 1)]
+            trees = CompiledTrees.from_lightgbm_dump(tree_info)
+            if trees is None:
+                return _passthrough_or_none(est, allow_passthrough)
+            return CompiledBoosting(trees, 0.0, 1.0)
+
+        if kind in ("Ridge", "BayesianRidge", "HuberRegressor", "LinearRegression", "Lasso", "ElasticNet"):
+            coef = np.asarray(est.coef_, dtype=float)
+            if coef.ndim != 1:
+                return _passthrough_or_none(est, allow_passthrough)
+            return CompiledLinear(coef, float(np.ravel(est.intercept_)[0]))
+    except Exception as e:
+        logger.warning("Could not compile %s: %s", kind, e)
+
+    return _passthrough_or_none(est, allow_passthrough)
+
+
+def _passthrough_or_none(est: Any, allow_passthrough: bool) -> Optional[Any]:
+    return Passthrough(est) if allow_passthrough else None
+
+
+def verify_compiled(compiled: Any, est: Any, X: np.ndarray) -> Dict[str, float]:
+    """
+    Compare compiled.predict against est.predict on X.
+    Returns {"exact": fraction of bit-identical outputs, "max_abs_diff": ...}.
+    """
+    expected = np.asarray(est.predict(X), dtype=float)
+    got = np.asarray(compiled.predict(X), dtype=float)
+    if expected.shape != got.shape:
+        return {"exact": 0.0, "max_abs_diff": float("inf")}
+    return {
+        "exact": float(np.mean(expected == got)) if expected.size else 1.0,
+        "max_abs_diff": float(np.max(np.abs(expected - got))) if expected.size else 0.0,
+    }
@@ -0,0 +1,35 @@
+# emissions.py
+"""
+Blend emission estimates from weighted coal properties. Pure arithmetic, so every
+argument may also be a numpy array (one value per blend); the worker computes all
+recommendations of a simulation in one call (simulation_runner.recommendation_rows).
+"""
+
+
+# fixed carbon fc , s->sulphur , n->nitrogen ,
+def calculate_emissions(fc, ash, vm, s, n, cri, csr):
+    emissions = {}
+    # CO2
+    emissions["CO2_Emissions"] = 0.7 * (fc / 100) * (44.01 / 12.01) * 10
+    # CO
+    emissions["CO_Emissions"] = 0.3 * (fc / 100) * (28.01 / 12.01) * 10
+    # SO
+    emissions["SO2_Emissions"] = (s / 100) * (64.07 / 32.06) * 10
+    # NO
+    emissions["NO_Emissions"] = 0.2 * (n / 100) * (30.01 / 14.01) * 10
+    # NO2
+    emissions["NO2_Emissions"] = 0.2 * (n / 100) * (46.01 / 14.01) * 10
+
+    # PM Index
+    pm_index = 0.4 * (ash / 9) + 0.3 * (cri / 28) + 0.3 * (1 - csr / 65)
+    emissions["PM_Index"] = pm_index
+    emissions["PM10_Emissions"] = 0.7 * pm_index
+    emissions["PM25_Emissions"] = 0.3 * pm_index
+
+    # VOC Index
+    voc_index = 0.5 * (vm / 2.5) + 0.2 * (cri / 28) + 0.2 * (1 - csr / 65) + 0.1 * (n / 1.0)
+    emissions["VOC_Index"] = voc_index
+    emissions["VOC_Emissions"] = 0.9 * voc_index
+    emissions["PAH_Emissions"] = 0.1 * voc_index
+
+    return emissions
@@ -3,28 +3,117 @@ import numpy as np
 import itertools
 import random
 import joblib
+import heapq
 import logging
+import os
+import time
 from typing import List, Dict, Tuple, Any, Callable
 from functools import lru_cache
 from collections import defaultdict
 import traceback
 from sqlalchemy.orm import Session
 import models  ######### Changed from backend.models to models
+from surrogate import QuadraticSurrogate
+from prediction_store import N_OUTPUTS, blend_key, catalog_version
 
 logger = logging.getLogger(__name__)
 
+# Input columns of multioutput_rf_model.pkl (the blend features without N)
+MODEL_FEATURES = [
+    'IM', 'Ash', 'VM_weight', 'FC', 'S', 'P', 'SiO2', 'Al2O3', 'Fe2O3',
+    'CaO', 'MgO', 'Na2O', 'K2O', 'TiO2', 'Mn3O4', 'SO3', 'P2O5',
+    'BaO', 'SrO', 'ZnO', 'CRI_weight', 'CSR_weight'
+]
+
+# Prediction column of each (group, constraint name); see predict_properties_batch
+PRED_COLUMNS = {
+    ('blend', 'ash'): 0, ('blend', 'vm'): 1, ('blend', 'fc'): 2, ('blend', 'csn'): 3,
+    ('coke', 'cri'): 4, ('coke', 'csr'): 5, ('coke', 'ash'): 6, ('coke', 'vm'): 7,
+}
+
+# Blend constraints that are exact linear mixes of one coal_features column
+# (blend 'csn' has no coal column, so it is never pre-screened)
+LINEAR_BLEND_COLUMNS = {'ash': 'Ash', 'vm': 'VM_weight', 'fc': 'FC'}
+# Added to the fitness of blends screened out before the model (pre-filter rejects,
+# surrogate skips) so they rank behind every blend the model scored
+SCREENED_OUT_OFFSET = 1e9
+
+def canonical_pairs(indices, ratios) -> Tuple[Tuple[int, int], ...]:
+    """Blend identity: (coal index, ratio) pairs sorted by index, so each ratio stays with its coal."""
+    return tuple(sorted(zip(map(int, indices), map(int, ratios))))
+
+
+class HallOfFame:
+    """
+    The `size` best distinct blends of a run, by fitness, with the predictions and cost
+    captured when they were scored. A max-heap on fitness holds the current members;
+    blends are de-duplicated on canonical_pairs.
+    Entries are (fitness, pairs, preds, cost).
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self._heap = []  # (-fitness, pairs) - the root is the worst member
+        self._entries = {}  # pairs -> entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def worst(self) -> float:
+        return -self._heap[0][0] if len(self._heap) >= self.size else float('inf')
+
+    def offer(self, pairs: Tuple[Tuple[int, int], ...], fitness: float, preds: np.ndarray, cost: float) -> None:
+        if pairs in self._entries or fitness >= self.worst:
+            return
+        entry = (float(fitness), pairs, np.array(preds, dtype=float), float(cost))
+        if len(self._heap) >= self.size:
+            _, evicted = heapq.heapreplace(self._heap, (-entry[0], pairs))
+            del self._entries[evicted]
+        else:
+            heapq.heappush(self._heap, (-entry[0], pairs))
+        self._entries[pairs] = entry
+
+    def offer_batch(self, indices: np.ndarray, ratios: np.ndarray, fitness: np.ndarray,
+                    preds: np.ndarray, cost: np.ndarray) -> None:
+        """Offer scored rows; only those better than the current worst member are looked at."""
+        candidates = np.flatnonzero(fitness < self.worst)
+        if len(candidates) > self.size:
+            candidates = candidates[np.argpartition(fitness[candidates], self.size - 1)[:self.size]]
+        for n in candidates[np.argsort(fitness[candidates], kind="stable")]:
+            self.offer(canonical_pairs(indices[n], ratios[n]), fitness[n], preds[n], cost[n])
+
+    def merge(self, entries: List[Tuple]) -> None:
+        for fitness, pairs, preds, cost in entries:
+            self.offer(pairs, fitness, preds, cost)
+
+    def entries(self) -> List[Tuple]:
+        """Members, best first (ties broken by blend)."""
+        return sorted(self._entries.values(), key=lambda e: (e[0], e[1]))
+
+
 class CoalBlendOptimizer:
-    def __init__(self, model_path: str, coal_data: pd.DataFrame):
-        self.model = joblib.load(model_path)
+    def __init__(self, model_path: str, coal_data: pd.DataFrame, model: Any = None):
+        # A preloaded model (e.g. from the model registry) skips the per-run unpickle
+        self.model = model if model is not None else joblib.load(model_path)
+        self.model_path = model_path
+        ### Shared store of raw predictions (prediction_store.PredictionStore); needs model_version
+        self.prediction_store = None
+        self.model_version = None
         self.coal_df = coal_data
         
         ######### Convert coal data to numpy arrays for faster computation
         self.coal_features = self.coal_df.iloc[:, 1:-1].values.astype(float)
         self.coal_costs = self.coal_df['Cost'].values
         self.coal_names = self.coal_df['Name_of_coal'].values
+        self.catalog_version = catalog_version(self.coal_df)
+        feature_columns = list(self.coal_df.columns[1:-1])
+        self._linear_columns = {key: feature_columns.index(col)
+                                for key, col in LINEAR_BLEND_COLUMNS.items() if col in feature_columns}
         
         ######### Pre-compute valid ratios as a list of tuples
         self.NONZERO_RATIO_POOL = self._valid_nonzero_ratios()
+        self.NONZERO_RATIO_ARRAY = np.array(self.NONZERO_RATIO_POOL, dtype=np.int32)
         
         ######### Default constraints
         self.constraints = {
@@ -41,6 +130,9 @@ class CoalBlendOptimizer:
                 'vm': (0.5, 2.0)
             }
         }
+        ### Penalty weight per (group, name); missing entries weigh 1.0
+        self.constraint_weights = {}
+        self._compile_constraints()
         
         ##### GA Settings
         self.POP_SIZE = 100
@@ -48,6 +140,27 @@ class CoalBlendOptimizer:
         self.MUTATION_RATE = 0.4  ### Increased mutation rate
         self.ELITE_SIZE = 10
         self.TOURNAMENT_SIZE = 5
+        self.BATCH_EVAL = True  ### Score each generation with one model.predict (evaluate_population)
+        self.ARRAY_POPULATION = False  ### int32 (P, 6) population with vectorized operators (_optimize_array)
+        self.RANDOM_SEED = None  ### Seed for the array path's numpy Generator
+        self.LINEAR_PREFILTER = False  ### Screen blend ash/vm/fc bounds before model.predict (prefilter_batch)
+        self.PREFILTER_TOLERANCE = 2.0  ### Reject only beyond bound -/+ this many percentage points
+        self.SURROGATE = False  ### Rank batches with QuadraticSurrogate; only the best part goes to the model
+        self.SURROGATE_KEEP = 0.3  ### Fraction of each screened batch scored by the model
+        self.SURROGATE_MAX_ERROR = 0.1  ### Relative fitness error above which every row is scored
+        self.SURROGATE_MIN_SAMPLES = 200  ### Model-scored blends before the first fit
+        self.SURROGATE_REFIT_EVERY = 200  ### Refit after this many new model-scored blends
+
+        ##### Exhaustive search settings (optimize(mode="exhaustive"))
+        self.EXHAUSTIVE_CHUNK = 20000  ### Candidate blends scored per model.predict
+        self.EXHAUSTIVE_TOP_K = 50  ### Best blends kept (returned as all_unique_blends)
+        self.HALL_OF_FAME_SIZE = 30  ### Best distinct blends returned as all_unique_blends (GA modes)
+
+        ##### Island model settings (ISLANDS > 1 runs island_ga.optimize_islands)
+        self.ISLANDS = 0  ### Sub-populations, one worker process each; POP_SIZE is per island
+        self.MIGRATION_INTERVAL = 5  ### Generations between migrations
+        self.MIGRANTS = 2  ### Elites each island sends per migration
+        self.MIGRATION_TOPOLOGY = "ring"  ### "ring" (island i -> i+1) or "all" (best of every island)
         
         ### Cache for fitness calculations
         self._fitness_cache = {}
@@ -55,8 +168,22 @@ class CoalBlendOptimizer:
         
         ### Track unique solutions
         self._unique_solutions = set()
-        ### Track all unique blends found during optimization
-        self._all_unique_blends = set()
+        ### Best distinct blends of the run, with their predictions and cost
+        self.hall_of_fame = HallOfFame(self.HALL_OF_FAME_SIZE)
+        ### Pre-filter counters (rows screened / rejected without a model call)
+        self.prefilter_stats = {"screened": 0, "rejected": 0}
+        ### Surrogate tier: estimates for skipped blends (re-screened when they reappear) and counters
+        self.surrogate = None
+        self._surrogate_estimates = {}
+        self.surrogate_stats = {"screened": 0, "model_scored": 0, "skipped": 0, "full_batches": 0}
+        self.store_stats = {"hits": 0, "misses": 0}
+        ### Fitness-cache lookups of the run (cache hit rate in progress events)
+        self.cache_stats = {"lookups": 0, "hits": 0}
+        ### (elapsed_s, best fitness so far) per generation of the last run
+        self.search_trace = []
+        ### Called with a progress event after every generation / epoch / chunk (optimize(progress_callback=...))
+        self.progress_callback = None
+        self._started = time.perf_counter()
 
     def _valid_nonzero_ratios(self) -> List[Tuple[int, ...]]:
         """Generate valid ratio combinations."""
@@ -75,20 +202,206 @@ class CoalBlendOptimizer:
 
     def predict_properties(self, blend: np.ndarray) -> np.ndarray:
         """Vectorized property prediction."""
+        return self.predict_properties_batch(blend[np.newaxis, :])[0]
+
+    def predict_properties_batch(self, blends: np.ndarray) -> np.ndarray:
+        """(P, 23) blend matrix -> (P, 8) predictions with one model.predict call."""
         # The ML model expects 22 features (without N), but our blend has 23 features (with N)
         # So we exclude the last column (N) when passing to the model
-        blend_without_n = blend[:-1]  # Remove the last element (N column)
+        blends_without_n = blends[:, :-1]  # Remove the last column (N)
         
-        feature_names = [
-            'IM', 'Ash', 'VM_weight', 'FC', 'S', 'P', 'SiO2', 'Al2O3', 'Fe2O3', 
-            'CaO', 'MgO', 'Na2O', 'K2O', 'TiO2', 'Mn3O4', 'SO3', 'P2O5', 
-            'BaO', 'SrO', 'ZnO', 'CRI_weight', 'CSR_weight'
-        ]
-        blend_df = pd.DataFrame([blend_without_n], columns=feature_names)
-        preds = self.model.predict(blend_df)[0]
+        blend_df = pd.DataFrame(blends_without_n, columns=MODEL_FEATURES)
+        preds = np.array(self.model.predict(blend_df), dtype=float).reshape(len(blends), -1)
         ### Convert coke properties to percentages
-        preds[4:8] *= 100  ### Vectorized conversion
+        preds[:, 4:8] *= 100  ### Vectorized conversion
         return preds
+
+    def blend_features_batch(self, indices: np.ndarray, ratios: np.ndarray) -> np.ndarray:
+        """(P, 3) coal indices + (P, 3) ratios -> (P, 23) blend matrix (same arithmetic as get_blend_features)."""
+        return np.sum(self.coal_features[indices] * ratios[:, :, np.newaxis] / 100, axis=1)
+
+    def _compile_constraints(self) -> None:
+        """
+        Turn self.constraints into penalty arrays: prediction column, lo, hi and weight
+        per constraint, matched by (group, name) through PRED_COLUMNS. None bounds are open.
+        """
+        cols, lo, hi, weights = [], [], [], []
+        for group in ('blend', 'coke'):
+            for name, (low, high) in self.constraints.get(group, {}).items():
+                col = PRED_COLUMNS.get((group, name))
+                if col is None:
+                    logger.warning(f"Ignoring unknown {group} constraint '{name}'")
+                    continue
+                cols.append(col)
+                lo.append(-np.inf if low is None else float(low))
+                hi.append(np.inf if high is None else float(high))
+                weights.append(float(self.constraint_weights.get((group, name), 1.0)))
+        self._penalty_cols = np.array(cols, dtype=int)
+        self._penalty_lo = np.array(lo)
+        self._penalty_hi = np.array(hi)
+        self._penalty_weights = np.array(weights)
+
+    def compute_penalty_batch(self, preds: np.ndarray) -> np.ndarray:
+        """Weighted squared bound violations for every row of a (P, 8) prediction matrix."""
+        val = preds[:, self._penalty_cols]
+        excess = np.maximum(self._penalty_lo - val, 0.0) + np.maximum(val - self._penalty_hi, 0.0)
+        return (excess ** 2) @ self._penalty_weights
+
+    def compute_cost_batch(self, indices: np.ndarray, ratios: np.ndarray) -> np.ndarray:
+        """compute_cost for every row."""
+        return np.sum(self.coal_costs[indices] * ratios, axis=1) / 100
+
+    def evaluate_population(self, population: List[List[Any]]) -> int:
+        """
+        Score every individual not yet in the fitness cache with one blend matrix, one
+        model.predict and array penalties/costs. Returns how many were scored.
+        """
+        pending = {}
+        for ind in population:
+            key = (tuple(ind[:3]), tuple(ind[3:]))
+            if key not in self._fitness_cache:
+                pending[key] = None
+        self.cache_stats["lookups"] += len(population)
+        self.cache_stats["hits"] += len(population) - len(pending)
+        if not pending:
+            return 0
+
+        keys = list(pending)
+        self._score_keys(keys)
+        return len(keys)
+
+    def _score_keys(self, keys: List[Tuple[Tuple[int, ...], Tuple[int, ...]]]) -> None:
+        """
+        Batch-score (indices, ratios) keys into the fitness cache. Pre-filter rejects
+        are cached with their linear-value penalty; surrogate skips only get an estimate.
+        """
+        indices = np.array([k[0] for k in keys], dtype=int)
+        ratios = np.array([k[1] for k in keys])
+        cost = self.compute_cost_batch(indices, ratios)
+        penalty = np.zeros(len(keys))
+        rows = np.arange(len(keys))
+        if self.LINEAR_PREFILTER:
+            ### Rejected rows rank behind every scored row, ordered by their linear-value penalty
+            feasible, linear_penalty = self.prefilter_batch(indices, ratios)
+            penalty[~feasible] = linear_penalty[~feasible] + SCREENED_OUT_OFFSET
+            rows = rows[feasible]
+
+        skipped = np.empty(0, dtype=int)
+        if len(rows):
+            blends = self.blend_features_batch(indices[rows], ratios[rows])
+            estimate = None
+            if self.surrogate is not None and self.surrogate.fitted:
+                estimate = cost[rows] + self.compute_penalty_batch(self.surrogate.predict(blends))
+                promising = self._surrogate_promising(estimate)
+                skipped = rows[~promising]
+                penalty[skipped] = estimate[~promising] - cost[skipped] + SCREENED_OUT_OFFSET
+                rows, blends, estimate = rows[promising], blends[promising], estimate[promising]
+            preds = self._predict_rows(indices[rows], ratios[rows], blends)
+            penalty[rows] = self.compute_penalty_batch(preds)
+            if self.surrogate is not None:
+                self._surrogate_update(blends, preds, estimate, cost[rows] + penalty[rows])
+            self.hall_of_fame.offer_batch(indices[rows], ratios[rows], cost[rows] + penalty[rows],
+                                          preds, cost[rows])
+
+        fitness = cost + penalty
+        is_skipped = np.zeros(len(keys), dtype=bool)
+        is_skipped[skipped] = True
+        for key, value, skip in zip(keys, fitness, is_skipped):
+            if skip:
+                self._surrogate_estimates[key] = float(value)
+            else:
+                self._fitness_cache[key] = float(value)
+                self._surrogate_estimates.pop(key, None)
+
+    def _predict_rows(self, indices: np.ndarray, ratios: np.ndarray, blends: np.ndarray) -> np.ndarray:
+        """predict_properties_batch, served from the prediction store where it already has the blend."""
+        store = self.prediction_store
+        if store is None or self.model_version is None:
+            return self.predict_properties_batch(blends)
+        namespace = f"{self.catalog_version}:{self.model_version}"
+        keys = [blend_key(i, r) for i, r in zip(indices.tolist(), ratios.tolist())]
+        found = store.get_many(namespace, list(dict.fromkeys(keys)))
+        missing = [n for n, key in enumerate(keys) if key not in found]
+        preds = np.empty((len(keys), N_OUTPUTS))
+        if missing:
+            predicted = self.predict_properties_batch(blends[missing])
+            preds[missing] = predicted
+            store.put_many(namespace, {keys[n]: row for n, row in zip(missing, predicted)})
+        for n, key in enumerate(keys):
+            if key in found:
+                preds[n] = found[key]
+        self.store_stats["hits"] += len(keys) - len(missing)
+        self.store_stats["misses"] += len(missing)
+        return preds
+
+    def _cached_fitness(self, key: Tuple[Tuple[int, ...], Tuple[int, ...]]) -> float:
+        """Model fitness if scored, else the surrogate estimate from the last screening."""
+        if key in self._fitness_cache:
+            return self._fitness_cache[key]
+        return self._surrogate_estimates[key]
+
+    def _surrogate_promising(self, estimate: np.ndarray) -> np.ndarray:
+        """Rows the model should score: the best SURROGATE_KEEP by estimate, or all while the error is unknown/high."""
+        promising = np.ones(len(estimate), dtype=bool)
+        error = self.surrogate.error
+        if error is None or error > self.SURROGATE_MAX_ERROR:
+            self.surrogate_stats["full_batches"] += 1
+            return promising
+        n_keep = max(1, int(np.ceil(self.SURROGATE_KEEP * len(estimate))))
+        if n_keep < len(estimate):
+            promising[:] = False
+            promising[np.argpartition(estimate, n_keep - 1)[:n_keep]] = True
+        self.surrogate_stats["screened"] += len(estimate)
+        self.surrogate_stats["skipped"] += int((~promising).sum())
+        return promising
+
+    def _surrogate_update(self, blends: np.ndarray, preds: np.ndarray, estimate: np.ndarray,
+                          fitness: np.ndarray) -> None:
+        """Track the surrogate's error on model-scored rows, add them as samples and refit when due."""
+        self.surrogate_stats["model_scored"] += len(blends)
+        if estimate is not None and len(estimate):
+            self.surrogate.observe_error(estimate, fitness)
+        self.surrogate.add(blends, preds)
+        due = self.SURROGATE_REFIT_EVERY if self.surrogate.fitted else self.SURROGATE_MIN_SAMPLES
+        if self.surrogate.new_samples >= due and self.surrogate.n_samples >= self.SURROGATE_MIN_SAMPLES:
+            self.surrogate.fit()
+
+    def linear_blend_properties(self, indices: np.ndarray, ratios: np.ndarray) -> Dict[str, np.ndarray]:
+        """Blend ash/vm/fc as the ratio-weighted mix of the coal columns (no model call)."""
+        weights = ratios / 100
+        return {key: np.sum(self.coal_features[indices, col] * weights, axis=1)
+                for key, col in self._linear_columns.items()}
+
+    def prefilter_batch(self, indices: np.ndarray, ratios: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Screen candidates against the blend bounds on their linear properties.
+        Returns (feasible mask, penalty of the linear values); a row is rejected when a
+        value lies more than PREFILTER_TOLERANCE outside its bound.
+        """
+        feasible = np.ones(len(indices), dtype=bool)
+        penalty = np.zeros(len(indices))
+        tol = self.PREFILTER_TOLERANCE
+        for key, val in self.linear_blend_properties(indices, ratios).items():
+            if key not in self.constraints['blend']:
+                continue
+            low, high = self.constraints['blend'][key]
+            feasible &= (val >= low - tol) & (val <= high + tol)
+            penalty += np.where(val < low, (low - val) ** 2, np.where(val > high, (val - high) ** 2, 0.0))
+        self.prefilter_stats["screened"] += len(indices)
+        self.prefilter_stats["rejected"] += int((~feasible).sum())
+        return feasible, penalty
+
+    def evaluate_array(self, population: np.ndarray) -> np.ndarray:
+        """Fitness vector for an int32 (P, 6) population; each distinct row is scored once."""
+        unique, inverse = np.unique(population, axis=0, return_inverse=True)
+        keys = [(tuple(row[:3]), tuple(row[3:])) for row in unique.tolist()]
+        missing = [key for key in keys if key not in self._fitness_cache]
+        self.cache_stats["lookups"] += len(keys)
+        self.cache_stats["hits"] += len(keys) - len(missing)
+        if missing:
+            self._score_keys(missing)
+        values = np.array([self._cached_fitness(key) for key in keys])
+        return values[inverse.reshape(-1)]
     ### ###   predicted_coal_properties = {
     ###         "ash_percent": float(predictions[0]),
     ###         "vm_percent": float(predictions[1]),
@@ -104,16 +417,7 @@ class CoalBlendOptimizer:
 
     def compute_penalty(self, preds: np.ndarray) -> float:
         """Vectorized penalty computation."""
-        penalty = 0
-        keys = list(self.constraints['blend'].keys()) + list(self.constraints['coke'].keys())
-        for i, key in enumerate(keys):
-            low, high = self.constraints['blend'].get(key, self.constraints['coke'].get(key))
-            val = preds[i]
-            if val < low:
-                penalty += (low - val) ** 2
-            elif val > high:
-                penalty += (val - high) ** 2
-        return penalty
+        return float(self.compute_penalty_batch(np.asarray(preds)[np.newaxis, :])[0])
 
     def compute_cost(self, indices: List[int], ratios: List[float]) -> float:
         """Vectorized cost computation."""
@@ -129,6 +433,12 @@ class CoalBlendOptimizer:
         if cache_key in self._fitness_cache:
             return self._fitness_cache[cache_key]
         
+        if cache_key in self._surrogate_estimates:
+            return self._surrogate_estimates[cache_key]
+        if self.LINEAR_PREFILTER or self.surrogate is not None:
+            self._score_keys([cache_key])
+            return self._cached_fitness(cache_key)
+
         ### Calculate fitness
         blend_features = self.get_blend_features(indices, ratios)
         preds = self.predict_properties(blend_features)
@@ -137,11 +447,80 @@ class CoalBlendOptimizer:
         
         ### Cache result
         self._fitness_cache[cache_key] = cost + penalty
+        self.hall_of_fame.offer(canonical_pairs(indices, ratios), cost + penalty, preds, cost)
         return self._fitness_cache[cache_key]
 
+    def _reset_run_state(self, started: float) -> None:
+        """Clear the caches, unique-blend tracking and counters of the previous run."""
+        self._unique_solutions.clear()
+        self._fitness_cache.clear()
+        self.hall_of_fame = HallOfFame(self.HALL_OF_FAME_SIZE)
+        self.prefilter_stats = {"screened": 0, "rejected": 0}
+        self.surrogate = QuadraticSurrogate() if self.SURROGATE else None
+        self._surrogate_estimates = {}
+        self.surrogate_stats = {"screened": 0, "model_scored": 0, "skipped": 0, "full_batches": 0}
+        self.store_stats = {"hits": 0, "misses": 0}
+        self.cache_stats = {"lookups": 0, "hits": 0}
+        self.search_trace = []
+        self._started = started
+        self._deadline = None
+        self._target_fitness = None
+        self._patience = None
+        self.stop_reason = "completed"
+        self.generations_run = 0
+
+    def _should_terminate(self, best_fitness: float, since_improvement: int = 0) -> bool:
+        """Check target / patience / time budget after a generation (or chunk); sets stop_reason."""
+        reason = None
+        if self._target_fitness is not None and best_fitness <= self._target_fitness:
+            reason = "target_fitness"
+        elif self._patience is not None and since_improvement >= self._patience:
+            reason = "converged"
+        elif self._deadline is not None:
+            ### Stop if the next step would likely overrun the budget (last step's duration)
+            now = time.perf_counter()
+            last_step = self.search_trace[-1][0] - self.search_trace[-2][0] if len(self.search_trace) > 1 else 0.0
+            if now + last_step >= self._deadline:
+                reason = "time_budget"
+        if reason is not None:
+            self.stop_reason = reason
+            logger.info(f"Stopping early ({reason}) after {self.generations_run} generations, "
+                        f"best fitness {best_fitness}")
+        return reason is not None
+
+    def _trace(self, best_fitness: float, evaluated: int = None, fraction: float = None) -> None:
+        """
+        Record best fitness after a step and send a progress event to progress_callback.
+        evaluated defaults to the blends in the fitness cache, fraction to generations_run / N_GEN.
+        """
+        elapsed = time.perf_counter() - self._started
+        self.search_trace.append((elapsed, float(best_fitness)))
+        if self.progress_callback is None:
+            return
+        if evaluated is None:
+            evaluated = len(self._fitness_cache)
+        if fraction is None:
+            fraction = self.generations_run / max(self.N_GEN, 1)
+        lookups = self.cache_stats["lookups"]
+        event = {
+            "generation": self.generations_run,
+            "n_gen": self.N_GEN,
+            "progress": round(100.0 * min(fraction, 1.0), 2),
+            "best_fitness": float(best_fitness),
+            "evaluated": int(evaluated),
+            "evals_per_s": evaluated / elapsed if elapsed > 0 else None,
+            "cache_hit_rate": self.cache_stats["hits"] / lookups if lookups else None,
+            "elapsed_s": elapsed,
+        }
+        try:
+            self.progress_callback(event)
+        except Exception as e:
+            ### Progress reporting must never end the search
+            logger.warning(f"Progress callback failed: {e}")
+
     def _is_unique_solution(self, indices: Tuple[int, ...], ratios: Tuple[int, ...]) -> bool:
         """Check if a solution is unique."""
-        solution_key = (tuple(sorted(indices)), tuple(sorted(ratios)))
+        solution_key = canonical_pairs(indices, ratios)
         if solution_key in self._unique_solutions:
             return False
         self._unique_solutions.add(solution_key)
@@ -160,23 +539,52 @@ class CoalBlendOptimizer:
         ratios = random.choice(self.NONZERO_RATIO_POOL)
         return list(indices) + list(ratios)
 
-    def optimize(self, custom_constraints: Dict = None, stop_check: Callable[[], bool] = None) -> Dict:
-        """Main optimization method with enhanced logging and error handling."""
+    def optimize(self, custom_constraints: Dict = None, stop_check: Callable[[], bool] = None,
+                 mode: str = "ga", time_budget_s: float = None, target_fitness: float = None,
+                 patience: int = None, progress_callback: Callable[[Dict], None] = None) -> Dict:
+        """
+        Main optimization method with enhanced logging and error handling.
+        mode="ga" runs the genetic algorithm, mode="exhaustive" scores every 3-coal blend.
+
+        The run ends early, returning the best blend so far, when time_budget_s has
+        elapsed, the best fitness reaches target_fitness, or (GA only) it has not
+        improved for `patience` generations. result["search"] records stop_reason
+        ("completed", "time_budget", "target_fitness" or "converged") and generations_run.
+        A stop_check request still returns None.
+
+        progress_callback, if given, receives a dict after every generation (island
+        epoch, exhaustive chunk): generation, n_gen, progress (%), best_fitness,
+        evaluated, evals_per_s, cache_hit_rate and elapsed_s.
+        """
+        if mode not in ("ga", "exhaustive"):
+            raise ValueError(f"Unknown optimization mode: {mode}")
         try:
-            logger.info("Starting optimization with constraints: %s", custom_constraints)
+            logger.info("Starting %s optimization with constraints: %s", mode, custom_constraints)
+            started = time.perf_counter()
             
             if custom_constraints:
                 self._update_constraints(custom_constraints)
             
-            ### Reset unique solutions tracking
-            self._unique_solutions.clear()
-            self._fitness_cache.clear()
-            self._all_unique_blends.clear()
+            self._reset_run_state(started)
+            self.progress_callback = progress_callback
+            self._deadline = started + time_budget_s if time_budget_s is not None else None
+            self._target_fitness = target_fitness
+            self._patience = patience
             
+            if mode == "exhaustive":
+                return self._optimize_exhaustive(stop_check, started)
+            if self.ISLANDS > 1:
+                from island_ga import optimize_islands
+                return optimize_islands(self, stop_check)
+            if self.ARRAY_POPULATION:
+                return self._with_search_stats(self._optimize_array(stop_check), "ga", started,
+                                               evaluated=len(self._fitness_cache))
+
             ### Initialize population
             population = [self.generate_individual() for _ in range(self.POP_SIZE)]
             best_fitness = float('inf')
             generations_without_improvement = 0
+            since_improvement = 0  ### Not reset by injection (patience)
             best_solution = None
             
             ### Run GA
@@ -188,7 +596,9 @@ class CoalBlendOptimizer:
                     
                 logger.info(f"Generation {gen+1}/{self.N_GEN}")
                 
-                ### Sort population by fitness
+                ### Score the new individuals in one batch, then sort population by fitness
+                if self.BATCH_EVAL:
+                    self.evaluate_population(population)
                 population.sort(key=self.fitness)
                 
                 ### Check for improvement
@@ -197,9 +607,11 @@ class CoalBlendOptimizer:
                     best_fitness = current_best_fitness
                     best_solution = population[0]
                     generations_without_improvement = 0
+                    since_improvement = 0
                     logger.info(f"New best fitness: {best_fitness}")
                 else:
                     generations_without_improvement += 1
+                    since_improvement += 1
                 
                 ### If stuck, inject random individuals
                 if generations_without_improvement > 3:
@@ -207,16 +619,15 @@ class CoalBlendOptimizer:
                     population = population[:self.ELITE_SIZE] + [self.generate_individual() for _ in range(self.POP_SIZE - self.ELITE_SIZE)]
                     generations_without_improvement = 0
                 
-                ### Log best individual and store unique blends
+                ### Log best individual (the hall of fame keeps the best blends with their predictions)
                 best_ind = population[0]
                 indices, ratios = best_ind[:3], best_ind[3:]
                 coal_names = [self.coal_names[i] for i in indices]
                 logger.info(f"Best in generation {gen+1}: {coal_names} with ratios {ratios}")
-                
-                ### Store unique blend for this generation
-                blend_key = (tuple(sorted(indices)), tuple(sorted(ratios)))
-                if blend_key not in self._all_unique_blends:
-                    self._all_unique_blends.add(blend_key)
+                self.generations_run = gen + 1
+                self._trace(best_fitness)
+                if self._should_terminate(best_fitness, since_improvement):
+                    break
                 
                 ### Create new population
                 new_pop = population[:self.ELITE_SIZE]
@@ -231,77 +642,101 @@ class CoalBlendOptimizer:
             if best_solution is None:
                 raise ValueError("No valid solution found during optimization")
 
-            ### Get final result
-            indices, ratios = best_solution[:3], best_solution[3:]
-            coal_names = [self.coal_names[i] for i in indices]
-            cost = float(self.compute_cost(indices, ratios))
-            blend_features = self.get_blend_features(tuple(indices), tuple(ratios))
-            preds = self.predict_properties(blend_features)
-
-            logger.info(f"Optimization completed. Best solution: {coal_names} with ratios {ratios}")
-            logger.info(f"Total unique blends found: {len(self._all_unique_blends)}")
-
-            ### Convert all numpy types to Python native types
-            result = {
-                "blend_combinations": [{
-                    "coals": [
-                        {"name": str(name), "percentage": int(ratio)}
-                        for name, ratio in zip(coal_names, ratios)
-                    ],
-                    "predicted": {
-                        "ash": float(preds[0]),
-                        "vm": float(preds[1]),
-                        "fc": float(preds[2]),
-                        "csn": float(preds[3]),
-                        "cri": float(preds[4]),
-                        "csr": float(preds[5]),
-                        "ash_final": float(preds[6]),
-                        "vm_final": float(preds[7])
-                    },
-                    "cost": float(cost)
-                }],
-                "total_cost": float(cost),
-                "all_unique_blends": []
-            }
-
-            ### Add all unique blends to the result
-            for blend_key in self._all_unique_blends:
-                indices, ratios = blend_key
-                coal_names = [self.coal_names[i] for i in indices]
-                blend_features = self.get_blend_features(tuple(indices), tuple(ratios))
-                preds = self.predict_properties(blend_features)
-                cost = float(self.compute_cost(list(indices), list(ratios)))
-                
-                result["all_unique_blends"].append({
-                    "coals": [
-                        {"name": str(name), "percentage": int(ratio)}
-                        for name, ratio in zip(coal_names, ratios)
-                    ],
-                    "predicted": {
-                        "ash": float(preds[0]),
-                        "vm": float(preds[1]),
-                        "fc": float(preds[2]),
-                        "csn": float(preds[3]),
-                        "cri": float(preds[4]),
-                        "csr": float(preds[5]),
-                        "ash_final": float(preds[6]),
-                        "vm_final": float(preds[7])
-                    },
-                    "total_cost": float(cost)
-                })
-
-            return result
+            return self._with_search_stats(
+                self._build_result(best_solution), "ga", started,
+                evaluated=len(self._fitness_cache))
         except Exception as e:
             logger.error(f"Error in optimization: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
+    def _blend_entry(self, indices: Tuple[int, ...], ratios: Tuple[int, ...], preds: np.ndarray) -> Dict:
+        """{"coals", "predicted"} for one blend, with native Python types."""
+        return {
+            "coals": [
+                {"name": str(self.coal_names[i]), "percentage": int(ratio)}
+                for i, ratio in zip(indices, ratios)
+            ],
+            "predicted": {
+                "ash": float(preds[0]),
+                "vm": float(preds[1]),
+                "fc": float(preds[2]),
+                "csn": float(preds[3]),
+                "cri": float(preds[4]),
+                "csr": float(preds[5]),
+                "ash_final": float(preds[6]),
+                "vm_final": float(preds[7])
+            },
+        }
+
+    def _build_result(self, best_solution: List[Any] = None) -> Dict:
+        """
+        Result dict from the hall of fame: its best member and all members, with the
+        predictions and cost recorded when they were scored (no model call). The GA's
+        best_solution is only predicted when nothing was model-scored (all screened out).
+        """
+        entries = self.hall_of_fame.entries()
+        if not entries:
+            indices, ratios = np.array([best_solution[:3]], dtype=int), np.array([best_solution[3:]])
+            preds = self._predict_rows(indices, ratios, self.blend_features_batch(indices, ratios))[0]
+            cost = float(self.compute_cost(best_solution[:3], best_solution[3:]))
+            entries = [(cost + self.compute_penalty(preds), canonical_pairs(best_solution[:3], best_solution[3:]),
+                        preds, cost)]
+
+        def blend(entry, cost_key):
+            _, pairs, preds, cost = entry
+            return dict(self._blend_entry([i for i, _ in pairs], [r for _, r in pairs], preds), **{cost_key: cost})
+
+        best = entries[0]
+        logger.info(f"Optimization completed. Best solution: {blend(best, 'cost')['coals']} "
+                    f"with fitness {best[0]}")
+        logger.info(f"Total unique blends found: {len(entries)}")
+        return {
+            "blend_combinations": [blend(best, "cost")],
+            "total_cost": best[3],
+            "all_unique_blends": [blend(entry, "total_cost") for entry in entries],
+        }
+
+    def _with_search_stats(self, result: Dict, mode: str, started: float, evaluated: int = None,
+                           space: int = None) -> Dict:
+        """Attach {"search": {...}} with evaluated blends and throughput; passes None through (stopped)."""
+        if result is None:
+            return None
+        elapsed = time.perf_counter() - started
+        result["search"] = {
+            "mode": mode,
+            "evaluated": evaluated,
+            "space": space,
+            "elapsed_s": elapsed,
+            "blends_per_s": evaluated / elapsed if evaluated and elapsed > 0 else None,
+            "stop_reason": self.stop_reason,
+            "generations_run": self.generations_run,
+        }
+        if self.LINEAR_PREFILTER:
+            result["search"]["prefilter"] = dict(self.prefilter_stats, tolerance=self.PREFILTER_TOLERANCE,
+                                                 model_rows_avoided=self.prefilter_stats["rejected"])
+        if self.prediction_store is not None and self.model_version is not None:
+            result["search"]["prediction_store"] = dict(self.store_stats, model_rows_avoided=self.store_stats["hits"])
+        if self.surrogate is not None:
+            result["search"]["surrogate"] = dict(self.surrogate_stats, **self.surrogate.stats(),
+                                                 model_rows_avoided=self.surrogate_stats["skipped"])
+        logger.info("%s search: %s blends in %.2fs (pre-filter: %s, surrogate: %s)", mode, evaluated, elapsed,
+                    self.prefilter_stats if self.LINEAR_PREFILTER else "off",
+                    self.surrogate_stats if self.surrogate is not None else "off")
+        return result
+
     def _update_constraints(self, custom_constraints: Dict) -> None:
-        """Update constraints with custom values."""
-        if 'blend' in custom_constraints:
-            self.constraints['blend'].update(custom_constraints['blend'])
-        if 'coke' in custom_constraints:
-            self.constraints['coke'].update(custom_constraints['coke'])
+        """
+        Update constraints with custom values and recompile the penalty arrays.
+        Names are matched case-insensitively; optional 'weights' has the same
+        {'blend': {name: w}, 'coke': {name: w}} shape.
+        """
+        for group in ('blend', 'coke'):
+            for name, bounds in custom_constraints.get(group, {}).items():
+                self.constraints[group][str(name).lower()] = tuple(bounds)
+            for name, weight in custom_constraints.get('weights', {}).get(group, {}).items():
+                self.constraint_weights[(group, str(name).lower())] = float(weight)
+        self._compile_constraints()
         logger.info(f"Updated constraints: {self.constraints}")
 
     def _tournament_selection(self, population: List[List[Any]]) -> List[Any]:
@@ -351,4 +786,250 @@ class CoalBlendOptimizer:
                 i, j = random.sample(range(3), 2)
                 indices[i], indices[j] = indices[j], indices[i]
         
-        return indices + ratios
\ No newline at end of file
+        return indices + ratios
+    # -------------------------
+    # Array population (ARRAY_POPULATION)
+    # -------------------------
+    # Individuals are rows of an int32 (P, 6) array [i, j, k, r1, r2, r3] kept in
+    # canonical form (coal indices ascending, ratios permuted with them), so equal
+    # blends are equal rows and np.unique finds duplicates. Operators draw from one
+    # numpy Generator and work on whole populations at once.
+
+    def _random_indices(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """(n, 3) distinct coal indices per row."""
+        return np.argsort(rng.random((n, len(self.coal_df))), axis=1)[:, :3].astype(np.int32)
+
+    def _random_ratios(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return self.NONZERO_RATIO_ARRAY[rng.integers(len(self.NONZERO_RATIO_ARRAY), size=n)]
+
+    def random_population(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return self._canonicalize(np.hstack([self._random_indices(rng, n), self._random_ratios(rng, n)]))
+
+    @staticmethod
+    def _canonicalize(population: np.ndarray) -> np.ndarray:
+        order = np.argsort(population[:, :3], axis=1, kind="stable")
+        return np.hstack([np.take_along_axis(population[:, :3], order, axis=1),
+                          np.take_along_axis(population[:, 3:], order, axis=1)])
+
+    def _repair_indices(self, rng: np.random.Generator, indices: np.ndarray) -> np.ndarray:
+        """Redraw repeated coal indices within a row until all three are distinct."""
+        indices = indices.copy()
+        while True:
+            dup = np.zeros(indices.shape, dtype=bool)
+            dup[:, 1] = indices[:, 1] == indices[:, 0]
+            dup[:, 2] = (indices[:, 2] == indices[:, 0]) | (indices[:, 2] == indices[:, 1])
+            n_dup = int(dup.sum())
+            if not n_dup:
+                return indices
+            indices[dup] = rng.integers(len(self.coal_df), size=n_dup)
+
+    def tournament_select_array(self, rng: np.random.Generator, pool_size: int, n: int) -> np.ndarray:
+        """Row numbers of n tournament winners among the first pool_size rows of a fitness-sorted population."""
+        entrants = rng.integers(pool_size, size=(n, min(self.TOURNAMENT_SIZE, pool_size)))
+        return entrants.min(axis=1)  # sorted population: lowest row number = best fitness
+
+    def crossover_array(self, rng: np.random.Generator, parents1: np.ndarray, parents2: np.ndarray) -> np.ndarray:
+        """One-point crossover on the coal indices (cut after 1 or 2), fresh ratios from the pool."""
+        n = len(parents1)
+        cut = rng.integers(1, 3, size=n)[:, np.newaxis]
+        indices = np.where(np.arange(3) < cut, parents1[:, :3], parents2[:, :3])
+        return np.hstack([self._repair_indices(rng, indices), self._random_ratios(rng, n)])
+
+    def mutate_array(self, rng: np.random.Generator, children: np.ndarray) -> np.ndarray:
+        """Vectorized _mutate: replace one coal and/or the ratios; otherwise force a ratio redraw or an index swap."""
+        n = len(children)
+        rows = np.arange(n)
+        indices, ratios = children[:, :3].copy(), children[:, 3:].copy()
+
+        mutate_idx = rng.random(n) < self.MUTATION_RATE
+        positions = rng.integers(3, size=n)
+        indices[rows[mutate_idx], positions[mutate_idx]] = rng.integers(len(self.coal_df), size=int(mutate_idx.sum()))
+        indices = self._repair_indices(rng, indices)
+
+        mutate_ratio = rng.random(n) < self.MUTATION_RATE
+        ratios[mutate_ratio] = self._random_ratios(rng, int(mutate_ratio.sum()))
+
+        forced = ~(mutate_idx | mutate_ratio)
+        redraw = forced & (rng.random(n) < 0.5)
+        ratios[redraw] = self._random_ratios(rng, int(redraw.sum()))
+        swap = rows[forced & ~redraw]
+        first = rng.integers(3, size=len(swap))
+        second = (first + rng.integers(1, 3, size=len(swap))) % 3
+        a, b = indices[swap, first].copy(), indices[swap, second].copy()
+        indices[swap, first], indices[swap, second] = b, a
+
+        return np.hstack([indices, ratios])
+
+    def deduplicate_array(self, rng: np.random.Generator, population: np.ndarray,
+                          keep: int = 0, max_rounds: int = 5) -> np.ndarray:
+        """Replace repeated rows (after the first `keep` rows, which are left alone) with random individuals."""
+        population = population.copy()
+        for _ in range(max_rounds):
+            _, first = np.unique(population, axis=0, return_index=True)
+            is_dup = np.ones(len(population), dtype=bool)
+            is_dup[first] = False
+            is_dup[:keep] = False
+            n_dup = int(is_dup.sum())
+            if not n_dup:
+                break
+            population[is_dup] = self.random_population(rng, n_dup)
+        return population
+
+    def rank_array(self, population: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score and sort a population, best first. Returns (population, fitness)."""
+        fitness = self.evaluate_array(population)
+        order = np.argsort(fitness, kind="stable")
+        return population[order], fitness[order]
+
+    def inject_array(self, rng: np.random.Generator, population: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Keep the elite of a sorted population, refill with random individuals and re-rank."""
+        elite = min(self.ELITE_SIZE, self.POP_SIZE)
+        population = self.deduplicate_array(rng, np.vstack([
+            population[:elite], self.random_population(rng, self.POP_SIZE - elite)]), keep=elite)
+        return self.rank_array(population)
+
+    def offspring_array(self, rng: np.random.Generator, population: np.ndarray) -> np.ndarray:
+        """Next generation of a sorted population: elite + mutated crossover children of tournament winners."""
+        elite = min(self.ELITE_SIZE, self.POP_SIZE)
+        pool = min(max(1, self.POP_SIZE // 2), len(population))  ### The better half (50 of 100 in optimize)
+        n_children = self.POP_SIZE - elite
+        parents1 = population[self.tournament_select_array(rng, pool, n_children)]
+        parents2 = population[self.tournament_select_array(rng, pool, n_children)]
+        children = self._canonicalize(self.mutate_array(rng, self.crossover_array(rng, parents1, parents2)))
+        return self.deduplicate_array(rng, np.vstack([population[:elite], children]), keep=elite)
+
+    def _optimize_array(self, stop_check: Callable[[], bool] = None) -> Dict:
+        """optimize() on an int32 (P, 6) population with a parallel fitness vector."""
+        if len(self.coal_df) < 3:
+            raise ValueError("At least 3 coals are needed to build a blend")
+        rng = np.random.default_rng(self.RANDOM_SEED)
+
+        population = self.deduplicate_array(rng, self.random_population(rng, self.POP_SIZE))
+        best_fitness = float('inf')
+        generations_without_improvement = 0
+        since_improvement = 0
+        best_solution = None
+
+        for gen in range(self.N_GEN):
+            if stop_check and stop_check():
+                logger.info("Optimization stopped by user request")
+                return None
+
+            logger.info(f"Generation {gen+1}/{self.N_GEN}")
+
+            population, fitness = self.rank_array(population)
+            if fitness[0] < best_fitness:
+                best_fitness = float(fitness[0])
+                best_solution = population[0].tolist()
+                generations_without_improvement = 0
+                since_improvement = 0
+                logger.info(f"New best fitness: {best_fitness}")
+            else:
+                generations_without_improvement += 1
+                since_improvement += 1
+
+            if generations_without_improvement > 3:
+                logger.info("Injecting random individuals to increase diversity")
+                population, fitness = self.inject_array(rng, population)
+                generations_without_improvement = 0
+
+            best_ind = population[0].tolist()
+            logger.info(f"Best in generation {gen+1}: {[self.coal_names[i] for i in best_ind[:3]]} "
+                        f"with ratios {best_ind[3:]}")
+            self.generations_run = gen + 1
+            self._trace(best_fitness)
+            if self._should_terminate(best_fitness, since_improvement):
+                break
+
+            population = self.offspring_array(rng, population)
+
+        if best_solution is None:
+            raise ValueError("No valid solution found during optimization")
+
+        return self._build_result(best_solution)
+
+    # -------------------------
+    # Exhaustive search (optimize(mode="exhaustive"))
+    # -------------------------
+    @staticmethod
+    def _pareto_mask(cost: np.ndarray, penalty: np.ndarray) -> np.ndarray:
+        """Rows not dominated on (cost, penalty), both minimized; one row per distinct point."""
+        order = np.lexsort((penalty, cost))
+        best_before = np.minimum.accumulate(np.concatenate([[np.inf], penalty[order][:-1]]))
+        mask = np.zeros(len(cost), dtype=bool)
+        mask[order[penalty[order] < best_before]] = True
+        return mask
+
+    def _optimize_exhaustive(self, stop_check: Callable[[], bool], started: float) -> Dict:
+        """
+        Score every 3-coal blend (each coal combination x every ratio in NONZERO_RATIO_POOL)
+        in chunks of about EXHAUSTIVE_CHUNK rows, keeping the EXHAUSTIVE_TOP_K best by
+        fitness and the cost/penalty Pareto front.
+        """
+        if len(self.coal_df) < 3:
+            raise ValueError("At least 3 coals are needed to build a blend")
+        combos = np.array(list(itertools.combinations(range(len(self.coal_df)), 3)), dtype=np.int32)
+        ratio_pool = self.NONZERO_RATIO_ARRAY
+        space = len(combos) * len(ratio_pool)
+        combos_per_chunk = max(1, self.EXHAUSTIVE_CHUNK // len(ratio_pool))
+        logger.info("Exhaustive search over %d blends (%d combinations x %d ratios)",
+                    space, len(combos), len(ratio_pool))
+
+        self.hall_of_fame = HallOfFame(self.EXHAUSTIVE_TOP_K)
+        front = np.empty((0, 6), dtype=np.int32)
+        front_cost, front_penalty, front_preds = np.empty(0), np.empty(0), np.empty((0, 8))
+        evaluated = 0
+
+        for start in range(0, len(combos), combos_per_chunk):
+            if stop_check and stop_check():
+                logger.info("Optimization stopped by user request")
+                return None
+
+            chunk = combos[start:start + combos_per_chunk]
+            indices = np.repeat(chunk, len(ratio_pool), axis=0)
+            ratios = np.tile(ratio_pool, (len(chunk), 1))
+            evaluated += len(indices)
+            if self.LINEAR_PREFILTER:
+                ### Blends outside the hard blend bounds (plus tolerance) are not eligible
+                feasible, _ = self.prefilter_batch(indices, ratios)
+                indices, ratios = indices[feasible], ratios[feasible]
+                if not len(indices):
+                    continue
+            preds = self.predict_properties_batch(self.blend_features_batch(indices, ratios))
+            cost = self.compute_cost_batch(indices, ratios)
+            penalty = self.compute_penalty_batch(preds)
+            fitness = cost + penalty
+            rows = np.hstack([indices, ratios])
+
+            ### Running top-K by fitness
+            self.hall_of_fame.offer_batch(indices, ratios, fitness, preds, cost)
+
+            ### Running Pareto front: merge this chunk's front into the current one
+            chunk_front = self._pareto_mask(cost, penalty)
+            front = np.vstack([front, rows[chunk_front]])
+            front_cost = np.concatenate([front_cost, cost[chunk_front]])
+            front_penalty = np.concatenate([front_penalty, penalty[chunk_front]])
+            front_preds = np.vstack([front_preds, preds[chunk_front]])
+            keep = self._pareto_mask(front_cost, front_penalty)
+            front, front_cost = front[keep], front_cost[keep]
+            front_penalty, front_preds = front_penalty[keep], front_preds[keep]
+
+            logger.info("Exhaustive search: %d/%d blends, %.0f blends/s", evaluated, space,
+                        evaluated / max(time.perf_counter() - started, 1e-9))
+            if len(self.hall_of_fame):
+                best_fitness = self.hall_of_fame.entries()[0][0]
+                self._trace(best_fitness, evaluated=evaluated, fraction=evaluated / space)
+                if evaluated < space and self._should_terminate(best_fitness):
+                    break
+
+        if not len(self.hall_of_fame):
+            raise ValueError("No blend passes the linear pre-filter; widen the blend bounds or PREFILTER_TOLERANCE")
+        result = self._build_result()
+
+        order = np.argsort(front_cost, kind="stable")
+        result["pareto_front"] = [
+            dict(self._blend_entry(row[:3], row[3:], preds), total_cost=float(c), penalty=float(p))
+            for row, preds, c, p in zip(front[order].tolist(), front_preds[order],
+                                        front_cost[order], front_penalty[order])
+        ]
+        return self._with_search_stats(result, "exhaustive", started, evaluated=evaluated, space=space)
@@ -1,14 +1,23 @@
 
 # inference_engine.py
 import os
+import re
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Tuple, Iterable
 
 import numpy as np
 import pandas as pd
 import joblib
 
+from coal_catalog import CoalCatalog, CATALOG_PROPERTIES, CATEGORY_FLAGS, BI_OXIDES
+from compiled_models import compile_estimator, verify_compiled, describe, stabilize_neighbors
+from prediction_cache import PredictionCache, canonical_blend, artifact_hash
+from artifact_store import ArtifactStore
+
 logger = logging.getLogger(__name__)
 
 # =========================
@@ -27,17 +36,74 @@ FINAL_FEATURE_ORDER = [
     "CRI_direct", "CSR_from_CRI", "CSR_direct",
 ]
 
+
 # Present in final_features but must be DROPPED before scaling
 TARGET_COLUMNS = ["CRI", "CSR", "ASH", "VM"]
 
-# Category flags
-CATEGORY_FLAGS = ["HCC", "SHCC", "HFCC", "PCI", "WC"]
+# Predicted targets (one {TARGET}_model.pkl each)
+TARGETS = ["CRI", "CSR", "VM", "ASH"]
+
+
+@contextmanager
+def _bare_arrays():
+    """The compiled plan feeds bare arrays to estimators that were fitted on DataFrames."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        yield
+
+
+def _unwrap_pipeline(model: Any, feats: List[str]) -> Optional[Tuple[Any, np.ndarray, np.ndarray]]:
+    """
+    For a (pycaret/sklearn) pipeline whose steps before the estimator only impute,
+    drop or rename columns, return (final_estimator, column index into feats, NaN fill).
+    Returns None for anything else.
+    """
+    steps = getattr(model, "steps", None)
+    if not steps:
+        return None
+    estimator = steps[-1][1]
+    names_in = getattr(estimator, "feature_names_in_", None)
+    if names_in is None:
+        return None
+
+    renamed = list(feats)
+    fills: Dict[str, float] = {}
+    for _, step in steps[:-1]:
+        tr = getattr(step, "transformer", step)
+        kind = type(tr).__name__
+        if kind == "SimpleImputer":
+            cols = getattr(step, "include", None)
+            cols = list(feats) if cols is None else list(cols)
+            if not cols:
+                continue
+            stats = getattr(tr, "statistics_", None)
+            if stats is None or len(stats) != len(cols):
+                return None
+            fills.update({c: float(v) for c, v in zip(cols, stats)})
+        elif kind == "RemoveMulticollinearity" or hasattr(tr, "drop_"):
+            continue  # column selection is resolved by name below
+        elif kind == "CleanColumnNames" and hasattr(tr, "match"):
+            renamed = [re.sub(tr.match, "", str(c)) for c in renamed]
+        else:
+            return None
+
+    pos = {name: i for i, name in enumerate(renamed)}
+    if any(name not in pos for name in names_in):
+        return None
+    columns = np.array([pos[name] for name in names_in], dtype=np.intp)
+    nan_fill = np.array([fills.get(feats[i], np.nan) for i in columns], dtype=float)
+    return estimator, columns, nan_fill
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a run_inference result (one level of dicts of floats) so callers can't mutate the cache."""
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in result.items()}
 
 
 class CoalBlendInferenceEngine:
     """
     Flow:
-      1) Weighted averages from DB schema (object attributes).
+      1) Weighted averages from DB schema (packed once into a CoalCatalog matrix).
       2) Engineer BI/MBI/CBI/VRs/Log(MaxFluidity).
       3) Compute CRI_direct / CSR_from_CRI / CSR_direct.
       4) Build FINAL feature dict (exact keys above).
@@ -45,13 +111,43 @@ class CoalBlendInferenceEngine:
       6) For each target (CRI/CSR/VM/ASH):
            scaled_features --(select columns from {TARGET}_features.pkl)--> X
            X --({TARGET}_model.pkl.predict)--> prediction
+         Column selection uses integer index plans compiled at load time (_compile_feature_plan).
       7) Emissions (from predictions with weighted fallbacks).
     """
 
-    def __init__(self, models_dir: Optional[str] = None):
+    def __init__(self, models_dir: Optional[str] = None, compiled_targets: Optional[Iterable[str]] = None,
+                 cache: Optional[PredictionCache] = None, artifact_store_dir: Optional[str] = None,
+                 parallel_targets: Optional[int] = None):
         # All artifacts live here
         self.models_dir = models_dir or os.path.join(os.path.dirname(__file__), "Models")
 
+        # Targets served by the array-compiled predictor (compiled_models.py).
+        # Default comes from COMPILED_TARGETS, e.g. "CRI,CSR,ASH,VM" or "all"; empty = sklearn only.
+        if compiled_targets is None:
+            compiled_targets = [t for t in os.getenv("COMPILED_TARGETS", "").replace(" ", "").split(",") if t]
+        compiled_targets = [t.upper() for t in compiled_targets]
+        self.compiled_targets = set(TARGETS if "ALL" in compiled_targets else compiled_targets)
+        # Above this many rows the sklearn estimators (threaded Cython) are faster than the
+        # level-by-level NumPy traversal, so larger batches go through sklearn.
+        self.compiled_max_rows = int(os.getenv("COMPILED_MAX_ROWS", "256"))
+
+        # Pre-converted, memory-mapped predictors shared by all workers (artifact_store.py).
+        # Targets found in a current store are not unpickled at all. "" disables it.
+        if artifact_store_dir is None:
+            artifact_store_dir = os.getenv("ARTIFACT_STORE_DIR", "")
+        self.artifact_store_dir = artifact_store_dir or None
+        self._stored_plans: Dict[str, Dict[str, Any]] = {}
+
+        # Opt-in: predict the targets concurrently on a persistent thread pool (tree predict
+        # releases the GIL). PREDICT_PARALLEL_TARGETS = 0 (off), N threads, or "auto" (host CPUs, max 4).
+        if parallel_targets is None:
+            env = os.getenv("PREDICT_PARALLEL_TARGETS", "0").strip().lower()
+            parallel_targets = min(len(TARGETS), os.cpu_count() or 1) if env == "auto" else int(env or 0)
+        self._target_pool: Optional[ThreadPoolExecutor] = None
+        if parallel_targets > 1:
+            self._target_pool = ThreadPoolExecutor(max_workers=min(parallel_targets, len(TARGETS)),
+                                                   thread_name_prefix="predict-target")
+
         # Column-wise scaler and its training order
         self.colwise_scaler = None
         self.colwise_feature_names: Optional[List[str]] = None
@@ -61,6 +157,16 @@ class CoalBlendInferenceEngine:
         self.target_features: Dict[str, List[str]] = {}
         self.target_scalers: Dict[str, Any] = {}  # optional; safe to stay empty
 
+        # Compiled column plan (see _compile_feature_plan)
+        self._scaler_order: List[str] = []
+        self._scaled_names: List[str] = []
+        self._target_plans: Dict[str, Dict[str, Any]] = {}
+
+        # Result cache for run_inference, keyed by (blend's coal rows hash, model_version, canonical blend).
+        # Sized by PREDICTION_CACHE_SIZE / PREDICTION_CACHE_TTL_S; size 0 disables it.
+        self.cache = cache if cache is not None else PredictionCache.from_env()
+        self.model_version: Optional[str] = None
+
         logger.info(f"Initializing inference engine with models directory: {self.models_dir}")
         self.load_all_models()
 
@@ -74,8 +180,15 @@ class CoalBlendInferenceEngine:
           - {TARGET}_features.pkl (list[str] feature names from the SCALED dict)
           - {TARGET}_model.pkl    (trained estimator with .predict)
           - (optional) {TARGET}_scaler.pkl
+        Targets present in a current artifact store are memory-mapped from it instead
+        of unpickling {TARGET}_model.pkl.
         """
         try:
+            # 0) Artifact version + optional shared store
+            self.model_version = artifact_hash(self.models_dir)
+            store = ArtifactStore.open(self.artifact_store_dir, self.models_dir, self.model_version)
+            self._stored_plans = {}
+
             # 1) Column-wise scaler
             scaler_path = os.path.join(self.models_dir, "scaler_colwise.pkl")
             if os.path.exists(scaler_path):
@@ -95,7 +208,7 @@ class CoalBlendInferenceEngine:
                 )
 
             # 2) Per-target feature lists + models (+ optional scalers)
-            for target in ["CRI", "CSR", "VM", "ASH"]:
+            for target in TARGETS:
                 # features list
                 fpath = os.path.join(self.models_dir, f"{target}_features.pkl")
                 if os.path.exists(fpath):
@@ -116,7 +229,13 @@ class CoalBlendInferenceEngine:
                     self.target_scalers[target] = sblob["scaler"] if isinstance(sblob, dict) else sblob
                     logger.info("Loaded %s_scaler.pkl", target)
 
-                # model
+                # model (memory-mapped from the store when available)
+                stored = store.load_target_plan(target) if store is not None else None
+                if stored is not None:
+                    self._stored_plans[target] = stored
+                    self.target_models.pop(target, None)
+                    logger.info("Mapped %s predictor from artifact store %s", target, self.artifact_store_dir)
+                    continue
                 mpath = os.path.join(self.models_dir, f"{target}_model.pkl")
                 if os.path.exists(mpath):
                     with open(mpath, "rb") as f:
@@ -125,6 +244,13 @@ class CoalBlendInferenceEngine:
                 else:
                     logger.warning("%s_model.pkl missing in %s", target, self.models_dir)
 
+            # 3) Integer index plan for scaling/prediction
+            self._compile_feature_plan()
+
+            # 4) Cached results from other artifacts are dropped
+            self.cache.clear()
+            logger.info("Model artifacts version %s", self.model_version[:12])
+
         except Exception as e:
             logger.exception("Error loading models/scalers")
             raise
@@ -148,78 +274,54 @@ class CoalBlendInferenceEngine:
     # -------------------------
     # Weighted averages  ->  **Weighted sums (no /100)**
     # -------------------------
-    def calculate_weighted_averages(self, coal_properties: Dict[str, Any], blend_ratios: List[Dict]) -> Dict[str, float]:
+    def calculate_weighted_averages(self, coal_properties: Dict[str, Any], blend_ratios: List[Dict],
+                                    verbose: bool = True) -> Dict[str, float]:
         """
         Compute pure weighted SUMS for numeric properties and category composition.
         Uses the input weights exactly as provided (e.g., 30 and 70) — NO /100 and NO renormalization.
+        `coal_properties` may be the usual {name: CoalProperties} dict or a prebuilt CoalCatalog.
         """
         logger.info("Starting weighted-sum calculations (no averaging)...")
-
-        props = [
-            "IM", "Ash", "VM", "FC", "S", "P", "SiO2", "Al2O3", "Fe2O3", "CaO", "MgO",
-            "Na2O", "K2O", "TiO2", "Mn3O4", "SO3", "P2O5", "BaO", "SrO", "ZnO",
-            "CRI", "CSR", "N", "HGI", "Vitrinite", "Liptinite", "Semi_Fusinite",
-            "CSN_FSI", "Initial_Softening_Temp", "MBI", "CBI", "Log_Max_Fluidity",
-            "C", "H", "O", "ss", "Rank",
-            "V7", "V8", "V9", "V10", "V11", "V12", "V13", "V14", "V15", "V16", "V17", "V18", "V19",
-            "Inertinite", "Minerals", "MaxFluidity",
-        ]
-
-        weighted: Dict[str, float] = {f"weighted_{p}": 0.0 for p in props}
-        cats = {k: 0.0 for k in CATEGORY_FLAGS}
-        total_weight = 0.0
-
-        # Pass: accumulate raw weight for categories and numeric sums
-        for b in blend_ratios:
-            name = b.get("coal_name")
-            try:
-                w_raw = float(b.get("percentage", 0.0))  # e.g., 30, 70
-            except Exception:
-                w_raw = 0.0
-            total_weight += w_raw
-
-            coal = coal_properties.get(name)
-            if not coal:
-                continue
-
-            # Categories as raw sum of input weights
-            category = getattr(coal, "category", None)
-            if category is None:
-                category = getattr(coal, "coal_category", "")
-            cat = str(category).upper()
-            if cat in cats:
-                cats[cat] += w_raw
-
-            # Numeric properties as raw weighted sums: Σ (value * weight)
-            for p in props:
-                if not hasattr(coal, p):
-                    continue
-                val = getattr(coal, p)
-                if val is None:
-                    continue
-                try:
-                    v = float(val)
-                except Exception:
-                    continue
-                weighted[f"weighted_{p}"] += v * w_raw
-
-        # Store category flags as raw sums (e.g., 100 if weights sum to 100)
-        for k, v in cats.items():
-            weighted[k] = float(v)
-
-        # Optional convenience keys (raw sums). You can uncomment if you want explicit keys.
-        # weighted["CRI"] = weighted.get("weighted_CRI", 0.0)
-        # weighted["CSR"] = weighted.get("weighted_CSR", 0.0)
-        # weighted["ASH"] = weighted.get("weighted_Ash", 0.0)
-        # weighted["VM"]  = weighted.get("weighted_VM", 0.0)
-
-        # Keep total weight for later (used to compute averages internally for formulas)
-        weighted["_total_weight"] = total_weight
-
+        weighted = self.calculate_weighted_averages_batch(coal_properties, [blend_ratios])[0]
         logger.info("Weighted-sum calculations completed.")
-        self._print_section("Weighted Averages", weighted)
+        if verbose:
+            self._print_section("Weighted Averages", weighted)
         return weighted
 
+    def calculate_weighted_averages_batch(self, coal_properties: Dict[str, Any],
+                                          list_of_blend_ratios: List[List[Dict]]) -> List[Dict[str, float]]:
+        """
+        Weighted sums for N blends as three matrix products against the coal catalog:
+          weighted_<prop> = W @ values, categories = W @ one-hot, BI oxide sums = counts @ values.
+        The oxide sums are stored as private "_sum_<oxide>" keys (like "_total_weight")
+        so engineer_features does not need to walk the coals again.
+        """
+        catalog = self._as_catalog(coal_properties)
+        weights, counts, total_weight = catalog.weight_matrix(list_of_blend_ratios)
+        prop_sums = catalog.weighted_sums(weights)
+        cat_sums = catalog.category_sums(weights)
+        oxide_sums = catalog.unweighted_sums(counts, BI_OXIDES)
+
+        rows = []
+        for r in range(len(list_of_blend_ratios)):
+            weighted: Dict[str, float] = {
+                f"weighted_{p}": float(v) for p, v in zip(CATALOG_PROPERTIES, prop_sums[r])
+            }
+            # Store category flags as raw sums (e.g., 100 if weights sum to 100)
+            for k, v in zip(CATEGORY_FLAGS, cat_sums[r]):
+                weighted[k] = float(v)
+            # Keep total weight for later (used to compute averages internally for formulas)
+            weighted["_total_weight"] = float(total_weight[r])
+            for k, v in zip(BI_OXIDES, oxide_sums[r]):
+                weighted[f"_sum_{k}"] = float(v)
+            rows.append(weighted)
+        return rows
+
+    def _as_catalog(self, coal_properties: Any) -> CoalCatalog:
+        if isinstance(coal_properties, CoalCatalog):
+            return coal_properties
+        return CoalCatalog.from_properties(coal_properties)
+
     # -------------------------
     # Feature engineering
     # -------------------------
@@ -304,18 +406,12 @@ class CoalBlendInferenceEngine:
 
       def sum_unweighted(prop: str) -> float:
         """Plain sum of a property over included coals (ignores percentages)."""
-        total = 0.0
-        for b in blend_ratios:
-            name = b.get("coal_name")
-            coal = coal_properties.get(name)
-            if not coal:
-                continue
-            try:
-                v = getattr(coal, prop, 0.0)
-                total += float(v) if v is not None else 0.0
-            except Exception:
-                pass
-        return total
+        key = f"_sum_{prop}"
+        if key in w:
+            return w[key]
+        catalog = self._as_catalog(coal_properties)
+        _, counts, _ = catalog.weight_matrix([blend_ratios])
+        return float(catalog.unweighted_sums(counts, [prop])[0, 0])
 
     # --- BI (UNWEIGHTED SUM over oxides) ---
       num = (
@@ -404,7 +500,8 @@ class CoalBlendInferenceEngine:
     def build_final_features(self,
                              weighted: Dict[str, float],
                              engineered: Dict[str, float],
-                             direct: Dict[str, float]) -> Dict[str, float]:
+                             direct: Dict[str, float],
+                             verbose: bool = True) -> Dict[str, float]:
         logger.info("Building final feature dictionary (exact names)...")
         g = weighted.get
 
@@ -458,65 +555,162 @@ class CoalBlendInferenceEngine:
         # self._print_section("Final before order Features (build_final_features)", final_features)
         # enforce order & presence
         ordered = {k: final_features.get(k, 0.0) for k in FINAL_FEATURE_ORDER}
-        self._print_section("Final Features (build_final_features)", ordered)
+        if verbose:
+            self._print_section("Final Features (build_final_features)", ordered)
         return ordered
 
     # -------------------------
-    # Column-wise normalization (scaler_colwise.pkl)
+    # Compiled column plan (built once in load_all_models)
     # -------------------------
-    def normalize_features(self, final_features: Dict[str, float]) -> Dict[str, float]:
+    def _compile_feature_plan(self) -> None:
         """
-        Column-wise normalization using scaler_colwise.pkl.
-        1) Drop CRI/CSR/ASH/VM
-        2) Build vector in the scaler's training order (feature_names)
-        3) Transform robustly (handles 1-feature scalers)
-        4) Clip to scaler.feature_range (avoid negatives if range starts at 0)
-        Returns: dict[name] -> scaled_value
+        Precompute integer index arrays so scaling/prediction is pure NumPy indexing:
+          FINAL_FEATURE_ORDER --(_scaler_src)--> scaler input columns (missing -> _scaler_fill)
+          scaled space = scaler columns + unscaled extras + one trailing zero column
+          scaled space --(plan["columns"])--> {TARGET}_features order
         """
-        # 1) Remove raw targets before scaling
-        feats_for_scaler = {k: v for k, v in final_features.items() if k not in TARGET_COLUMNS}
-
-        # 2) Ensure scaler exists
-        if not hasattr(self, "colwise_scaler") or self.colwise_scaler is None:
-            logger.warning("Column-wise scaler not loaded; returning unscaled features.")
-            return feats_for_scaler
+        final_pos = {name: i for i, name in enumerate(FINAL_FEATURE_ORDER)}
+        non_target = [k for k in FINAL_FEATURE_ORDER if k not in TARGET_COLUMNS]
 
-        # 3) Use training order if provided
-        if getattr(self, "colwise_feature_names", None):
+        order: List[str] = []
+        fill = np.zeros(0, dtype=float)
+        if self.colwise_scaler is not None:
             # Guard against accidentally saved target names
-            order = [name for name in self.colwise_feature_names if name not in TARGET_COLUMNS]
-        else:
-            order = list(feats_for_scaler.keys())
-
-        # 4) Assemble vector; fill missing with per-feature min (or 0.0)
-        vals = []
-        data_min = getattr(self.colwise_scaler, "data_min_", None)
-        for i, name in enumerate(order):
-            if name in feats_for_scaler:
-                vals.append(float(feats_for_scaler[name]))
+            if self.colwise_feature_names:
+                order = [name for name in self.colwise_feature_names if name not in TARGET_COLUMNS]
             else:
-                fill = 0.0
-                if isinstance(data_min, np.ndarray) and data_min.shape[0] == len(order):
-                    try:
-                        fill = float(data_min[i])
-                    except Exception:
-                        pass
-                vals.append(fill)
+                order = list(non_target)
+            # Missing inputs are filled with the per-feature min (or 0.0)
+            fill = np.zeros(len(order), dtype=float)
+            data_min = getattr(self.colwise_scaler, "data_min_", None)
+            if isinstance(data_min, np.ndarray) and data_min.shape[0] == len(order):
+                fill = data_min.astype(float)
+
+        extras = [k for k in non_target if k not in set(order)]
+        self._scaler_order = order
+        self._scaler_src = np.array([final_pos.get(n, -1) for n in order], dtype=np.intp)
+        self._scaler_fill = fill
+        self._extra_src = np.array([final_pos[k] for k in extras], dtype=np.intp)
+        self._scaled_names = order + extras
+
+        zero_col = len(self._scaled_names)
+        scaled_pos = {name: i for i, name in enumerate(self._scaled_names)}
+        self._target_plans = {}
+        for target, feats in self.target_features.items():
+            columns = np.array([scaled_pos.get(name, zero_col) for name in feats], dtype=np.intp)
+            self._target_plans[target] = self._compile_target_plan(target, feats, columns)
+
+    def _compile_target_plan(self, target: str, feats: List[str], columns: np.ndarray) -> Dict[str, Any]:
+        """
+        Column plan for one target. If the model is a pipeline whose preprocessing only
+        imputes/drops/renames columns, also resolve the final estimator's column order so
+        predict can skip the pipeline (and its DataFrame) entirely. The shortcut is only
+        kept if it matches the full pipeline on a probe batch.
+        """
+        plan: Dict[str, Any] = {"columns": columns, "estimator": None, "estimator_columns": None,
+                                "nan_fill": None, "compiled": None}
+        stored = self._stored_plans.get(target)
+        if stored is not None:
+            # Store entries were verified against the pipeline when the store was built
+            plan.update(estimator=stored["estimator"], estimator_columns=np.asarray(stored["estimator_columns"]),
+                        nan_fill=np.asarray(stored["nan_fill"]))
+            return plan
 
-        X = np.array(vals, dtype=float).reshape(1, -1)
+        model = self.target_models.get(target)
+        if model is None or target in self.target_scalers:
+            return plan
+
+        unwrapped = _unwrap_pipeline(model, feats)
+        if unwrapped is None:
+            return plan
+        estimator, est_columns, nan_fill = unwrapped
+        # Neighbour members predict row-wise so batched and single-row results are identical
+        estimator = stabilize_neighbors(estimator)
+
+        lo, hi = 0.0, 1.0
+        fr = getattr(self.colwise_scaler, "feature_range", None)
+        if isinstance(fr, tuple) and len(fr) == 2 and None not in fr:
+            lo, hi = float(fr[0]), float(fr[1])
+        probe = np.random.default_rng(0).uniform(lo, hi, size=(8, len(feats)))
+        try:
+            # Row by row: the single-row pipeline output is the reference (see stabilize_neighbors)
+            expected = np.concatenate([
+                np.asarray(model.predict(pd.DataFrame(probe[i:i + 1], columns=feats)), dtype=float).ravel()
+                for i in range(probe.shape[0])
+            ])
+            with _bare_arrays():
+                got = np.asarray(estimator.predict(probe[:, est_columns]), dtype=float).ravel()
+        except Exception as e:
+            logger.warning("Could not compile %s pipeline (%s); using model.predict.", target, e)
+            return plan
+        if expected.shape != got.shape or not np.allclose(expected, got, rtol=1e-9, atol=1e-9):
+            logger.warning("Compiled %s pipeline disagrees with model.predict; using model.predict.", target)
+            return plan
+
+        plan.update(estimator=estimator, estimator_columns=est_columns, nan_fill=nan_fill)
+        logger.info("Compiled %s pipeline: %d -> %d columns.", target, len(feats), len(est_columns))
+
+        if target in self.compiled_targets:
+            plan["compiled"] = self._compile_estimator_arrays(target, estimator, lo, hi, len(est_columns))
+        return plan
+
+    def _compile_estimator_arrays(self, target: str, estimator: Any, lo: float, hi: float,
+                                  n_features: int) -> Optional[Any]:
+        """Array-compile the final estimator; kept only if it reproduces estimator.predict exactly."""
+        compiled = compile_estimator(estimator)
+        if compiled is None:
+            logger.warning("%s estimator (%s) can't be array-compiled; using sklearn.", target,
+                           type(estimator).__name__)
+            return None
+        probe = np.random.default_rng(1).uniform(lo, hi, size=(256, n_features))
+        try:
+            with _bare_arrays():
+                check = verify_compiled(compiled, estimator, probe)
+        except Exception as e:
+            logger.warning("Array-compiled %s predictor failed verification (%s); using sklearn.", target, e)
+            return None
+        if check["exact"] < 1.0:
+            logger.warning("Array-compiled %s predictor is not bit-identical (exact=%.3f, max diff=%.3g); "
+                           "using sklearn.", target, check["exact"], check["max_abs_diff"])
+            return None
+        logger.info("Array-compiled %s predictor: %s (bit-identical on %d probe rows).",
+                    target, describe(compiled), probe.shape[0])
+        return compiled
 
-        # 5) Transform (with 1-feature fallback)
+    # -------------------------
+    # Matrix helpers (compiled plan)
+    # -------------------------
+    def _final_matrix(self, final_rows: List[Dict[str, float]]) -> np.ndarray:
+        """Final feature dicts -> N×len(FINAL_FEATURE_ORDER) matrix."""
+        X = np.array([[row.get(k, 0.0) for k in FINAL_FEATURE_ORDER] for row in final_rows], dtype=float)
+        return X.reshape(len(final_rows), len(FINAL_FEATURE_ORDER))
+
+    def _scale_matrix(self, X_final: np.ndarray) -> np.ndarray:
+        """
+        Column-wise normalization using scaler_colwise.pkl, on the compiled plan.
+        Returns N×(len(_scaled_names)+1): scaled columns, unscaled extras, trailing zeros.
+        """
+        n_scaled = len(self._scaler_order)
+        S = np.zeros((X_final.shape[0], len(self._scaled_names) + 1), dtype=float)
+        if n_scaled:
+            X = np.where(self._scaler_src >= 0, X_final[:, self._scaler_src], self._scaler_fill)
+            S[:, :n_scaled] = self._transform_colwise(X)
+        S[:, n_scaled:-1] = X_final[:, self._extra_src]
+        return S
+
+    def _transform_colwise(self, X: np.ndarray) -> np.ndarray:
+        # Transform (with 1-feature fallback)
         try:
             X_scaled = self.colwise_scaler.transform(X)
         except Exception:
             try:
-                X_scaled = self.colwise_scaler.transform(X.reshape(-1, 1)).reshape(1, -1)
+                X_scaled = self.colwise_scaler.transform(X.reshape(-1, 1)).reshape(X.shape)
                 logger.warning("Column-wise scaler expects 1 feature; applied element-wise transform.")
             except Exception as e2:
                 logger.error(f"Column-wise scaling failed: {e2}. Returning unscaled features.")
-                return feats_for_scaler
+                return X
 
-        # 6) Optional clamp to feature_range
+        # Optional clamp to feature_range
         try:
             fr = getattr(self.colwise_scaler, "feature_range", None)
             if isinstance(fr, tuple) and len(fr) == 2 and None not in fr:
@@ -524,16 +718,79 @@ class CoalBlendInferenceEngine:
                 X_scaled = np.clip(X_scaled, float(lo), float(hi))
         except Exception:
             pass
+        return X_scaled
 
-        scaled = {name: float(X_scaled[0, i]) for i, name in enumerate(order)}
-        # Keep any extra keys that weren't in 'order' (left unscaled)
-        for k, v in feats_for_scaler.items():
-            if k not in scaled:
-                scaled[k] = float(v)
+    def _scaled_dicts(self, S: np.ndarray) -> List[Dict[str, float]]:
+        return [dict(zip(self._scaled_names, row)) for row in S[:, :-1].tolist()]
 
+    def _scaled_matrix_from_dicts(self, scaled_rows: List[Dict[str, float]]) -> np.ndarray:
+        S = np.array([[row.get(name, 0.0) for name in self._scaled_names] + [0.0] for row in scaled_rows],
+                     dtype=float)
+        return S.reshape(len(scaled_rows), len(self._scaled_names) + 1)
+
+    def _predict_matrix(self, target: str, S: np.ndarray) -> np.ndarray:
+        """One predict call for all rows of the scaled matrix. Zeros if assets are missing or predict fails."""
+        n = S.shape[0]
+        model = self.target_models.get(target)
+        plan = self._target_plans.get(target)
+        if plan is None or (model is None and plan["estimator"] is None):
+            logger.warning(f"Missing assets for {target} (model or features). Returning 0.0")
+            return np.zeros(n, dtype=float)
+        if n == 0:
+            return np.zeros(0, dtype=float)
+
+        X = S[:, plan["columns"]]
+        try:
+            if plan["estimator"] is not None:
+                Xe = X[:, plan["estimator_columns"]]
+                missing = np.isnan(Xe)
+                if missing.any():
+                    Xe = np.where(missing, plan["nan_fill"], Xe)
+                predictor = plan["estimator"]
+                if plan["compiled"] is not None and n <= self.compiled_max_rows and not np.isnan(Xe).any():
+                    predictor = plan["compiled"]
+                with _bare_arrays():
+                    return np.asarray(predictor.predict(Xe), dtype=float).reshape(n)
+
+            X = pd.DataFrame(X, columns=self.target_features[target])
+            # Optional per-target scaler
+            tscaler = self.target_scalers.get(target)
+            if tscaler is not None:
+                try:
+                    X = tscaler.transform(X)
+                except Exception as e:
+                    logger.warning(f"Target scaler failed for {target}: {e}. Using unscaled features.")
+            return np.asarray(model.predict(X), dtype=float).reshape(n)
+        except Exception as e:
+            logger.error(f"Model prediction failed for {target}: {e}")
+            return np.zeros(n, dtype=float)
+
+    def _predict_all_matrix(self, S: np.ndarray) -> Dict[str, np.ndarray]:
+        if self._target_pool is None:
+            return {t: self._predict_matrix(t, S) for t in TARGETS}
+        futures = {t: self._target_pool.submit(self._predict_matrix, t, S) for t in TARGETS}
+        return {t: f.result() for t, f in futures.items()}
+
+    # -------------------------
+    # Column-wise normalization (scaler_colwise.pkl)
+    # -------------------------
+    def normalize_features(self, final_features: Dict[str, float]) -> Dict[str, float]:
+        """
+        Column-wise normalization using scaler_colwise.pkl.
+        1) Drop CRI/CSR/ASH/VM
+        2) Build vector in the scaler's training order (feature_names)
+        3) Transform robustly (handles 1-feature scalers)
+        4) Clip to scaler.feature_range (avoid negatives if range starts at 0)
+        Returns: dict[name] -> scaled_value
+        """
+        scaled = self.normalize_features_batch([final_features])[0]
         self._print_section("Scaled Features (after column-wise normalize)", scaled)
         return scaled
 
+    def normalize_features_batch(self, final_features_rows: List[Dict[str, float]]) -> List[Dict[str, float]]:
+        """Same as normalize_features, for N blends with a single scaler.transform call."""
+        return self._scaled_dicts(self._scale_matrix(self._final_matrix(final_features_rows)))
+
     # -------------------------
     # Predict one target
     # -------------------------
@@ -542,35 +799,25 @@ class CoalBlendInferenceEngine:
         Build X from scaled_features using {TARGET}_features.pkl, then predict.
         Applies optional {TARGET}_scaler.pkl if present.
         """
-        model = self.target_models.get(target)
-        feats = self.target_features.get(target)
-        if model is None or feats is None:
-            logger.warning(f"Missing assets for {target} (model or features). Returning 0.0")
-            return 0.0
+        return float(self.predict_target_batch(target, [scaled_features])[0])
 
-        Xrow = {name: scaled_features.get(name, 0.0) for name in feats}
-        X = pd.DataFrame([Xrow], columns=feats)
-
-        # Optional per-target scaler
-        tscaler = self.target_scalers.get(target)
-        if tscaler is not None:
-            try:
-                X = tscaler.transform(X)
-            except Exception as e:
-                logger.warning(f"Target scaler failed for {target}: {e}. Using unscaled features.")
-
-        try:
-            y = model.predict(X)[0]
-            return float(y)
-        except Exception as e:
-            logger.error(f"Model prediction failed for {target}: {e}")
-            return 0.0
+    def predict_target_batch(self, target: str, scaled_rows: List[Dict[str, float]]) -> np.ndarray:
+        """Batched predict_target: a single model.predict call; returns an array of N predictions."""
+        return self._predict_matrix(target, self._scaled_matrix_from_dicts(scaled_rows))
 
     # -------------------------
     # Predict all targets
     # -------------------------
     def predict_all(self, scaled_features: Dict[str, float]) -> Dict[str, float]:
-        return {t: self.predict_target(t, scaled_features) for t in ["CRI", "CSR", "VM", "ASH"]}
+        return self.predict_all_batch([scaled_features])[0]
+
+    def predict_all_batch(self, scaled_rows: List[Dict[str, float]]) -> List[Dict[str, float]]:
+        """One predict call per target over all rows; returns one {target: value} dict per row."""
+        return self._target_rows(self._predict_all_matrix(self._scaled_matrix_from_dicts(scaled_rows)))
+
+    def _target_rows(self, columns: Dict[str, np.ndarray]) -> List[Dict[str, float]]:
+        n = len(next(iter(columns.values()))) if columns else 0
+        return [{t: float(columns[t][r]) for t in columns} for r in range(n)]
 
     # -------------------------
     # Emissions
@@ -604,6 +851,27 @@ class CoalBlendInferenceEngine:
     # -------------------------
     # Orchestrator
     # -------------------------
+    def _blend_features(self, coal_properties: Dict[str, Any], blend_ratios: List[Dict],
+                        verbose: bool = True):
+        """Steps 1-4 of the flow for one blend. Returns (weighted dict, final feature dict)."""
+        # 1) Weighted
+        w = self.calculate_weighted_averages(coal_properties, blend_ratios, verbose=verbose)
+        return self._features_from_weighted(w, coal_properties, blend_ratios, verbose=verbose)
+
+    def _features_from_weighted(self, w: Dict[str, float], coal_properties: Dict[str, Any],
+                                blend_ratios: List[Dict], verbose: bool = True):
+        """Steps 2-4 of the flow, given the weighted sums of step 1."""
+        # 2) Engineer
+        engineered = self.engineer_features(w, coal_properties, blend_ratios)
+        w = {**w, **engineered}
+
+        # 3) Direct formulas
+        direct = self.calculate_direct_formulas(w)
+
+        # 4) Final features (exact keys)
+        final_features = self.build_final_features(w, engineered, direct, verbose=verbose)
+        return w, final_features
+
     def run_inference(self, coal_properties: Dict[str, Any], blend_ratios: List[Dict]) -> Dict[str, Any]:
         """
         Returns:
@@ -614,26 +882,23 @@ class CoalBlendInferenceEngine:
             "emissions":          { ... }
           }
         """
-        # 1) Weighted
-        w = self.calculate_weighted_averages(coal_properties, blend_ratios)
-        
-        # /direct = self.calculate_direct_formulas(w)
-
-        # 2) Engineer
-        engineered = self.engineer_features(w, coal_properties, blend_ratios)
-        w = {**w, **engineered}
-
-        # 3) Direct formulas
-        direct = self.calculate_direct_formulas(w)
+        # 0) Cache: same coals (by content) + same artifacts + same blend -> same result
+        catalog = self._as_catalog(coal_properties)
+        key = self._cache_key(catalog, blend_ratios)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Prediction cache hit for %s", key[2])
+            return _copy_result(cached)
 
-        # 4) Final features (exact keys)
-        final_features = self.build_final_features(w, engineered, direct)
+        # 1-4) Weighted -> engineered -> direct -> final features
+        w, final_features = self._blend_features(catalog, blend_ratios)
 
         # 5) Scale (drop CRI/CSR/ASH/VM first, then column-wise normalize)
-        scaled_features = self.normalize_features(final_features)
+        S = self._scale_matrix(self._final_matrix([final_features]))
+        scaled_features = self._scaled_dicts(S)[0]
 
         # 6) Predict
-        predicted_targets = self.predict_all(scaled_features)
+        predicted_targets = self._target_rows(self._predict_all_matrix(S))[0]
 
         # 7) Emissions
         emissions = self.calculate_emissions(predicted_targets, w)
@@ -644,9 +909,71 @@ class CoalBlendInferenceEngine:
         self._print_section("Predicted Targets", predicted_targets)
         self._print_section("Emissions", emissions)
 
-        return {
+        result = {
             "final_features": final_features,
             "scaled_features": scaled_features,
             "predicted_targets": predicted_targets,
             "emissions": emissions,
         }
+        self.cache.put(key, _copy_result(result))
+        return result
+
+    def run_inference_batch(self, coal_properties: Dict[str, Any],
+                            list_of_blend_ratios: List[List[Dict]]) -> List[Dict[str, Any]]:
+        """
+        Score N blends in one pass: weighted sums come from one catalog matrix product,
+        engineered features are built per blend, then everything is stacked into
+        one N×F matrix that goes through a single scaler.transform and one
+        model.predict per target. Returns one dict per blend, in input order,
+        with the same keys as run_inference. Debug sections are not printed.
+        """
+        # Pack the coals once; weighted sums for all blends are a single matrix product
+        catalog = self._as_catalog(coal_properties)
+
+        # Cached blends are served directly; only the misses go through the pipeline
+        keys = [self._cache_key(catalog, blend_ratios) for blend_ratios in list_of_blend_ratios]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+        todo: Dict[Any, List[int]] = {}
+        for i, key in enumerate(keys):
+            if key in todo:
+                todo[key].append(i)  # duplicate within this batch
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = _copy_result(cached)
+            else:
+                todo[key] = [i]
+
+        if todo:
+            miss_idx = [positions[0] for positions in todo.values()]
+            miss_blends = [list_of_blend_ratios[i] for i in miss_idx]
+            weighted_rows, final_rows = [], []
+            for w, blend_ratios in zip(self.calculate_weighted_averages_batch(catalog, miss_blends), miss_blends):
+                w, final_features = self._features_from_weighted(w, catalog, blend_ratios, verbose=False)
+                weighted_rows.append(w)
+                final_rows.append(final_features)
+
+            S = self._scale_matrix(self._final_matrix(final_rows))
+            scaled_rows = self._scaled_dicts(S)
+            predicted_rows = self._target_rows(self._predict_all_matrix(S))
+
+            for positions, w, final_features, scaled_features, predicted_targets in zip(
+                    todo.values(), weighted_rows, final_rows, scaled_rows, predicted_rows):
+                result = {
+                    "final_features": final_features,
+                    "scaled_features": scaled_features,
+                    "predicted_targets": predicted_targets,
+                    "emissions": self.calculate_emissions(predicted_targets, w),
+                }
+                self.cache.put(keys[positions[0]], _copy_result(result))
+                results[positions[0]] = result
+                for i in positions[1:]:
+                    results[i] = _copy_result(result)
+
+        logger.info("Batch inference completed for %d blends (%d computed).", len(keys), len(todo))
+        return results
+
+    def _cache_key(self, catalog: CoalCatalog, blend_ratios: List[Dict]) -> Tuple[str, Optional[str], Tuple]:
+        # Only the blend's own coal rows matter, so the same blend hits whatever other coals came along
+        blend = canonical_blend(blend_ratios)
+        return (catalog.blend_fingerprint([name for name, _ in blend]), self.model_version, blend)
@@ -0,0 +1,222 @@
+# island_ga.py
+"""
+Island-model GA for CoalBlendOptimizer (optimizer.ISLANDS > 1).
+
+Each island is a worker process holding its own array population (see
+CoalBlendOptimizer.rank_array / offspring_array) and its own copy of the model,
+loaded once when the process starts. From the artifact store it is a memory-mapped
+compiled forest shared with the other islands; otherwise it is unpickled.
+
+The coordinator runs the islands in epochs of MIGRATION_INTERVAL generations.
+After each epoch every island reports its elites, its best individual and its
+hall of fame (best blends with their predictions). The coordinator keeps the
+global best and merges the halls of fame. It sends each island its migrants:
+    ring - the elites of the previous island (i-1 -> i)
+    all  - the best MIGRANTS individuals across all islands
+plus the global best. Migrants replace the worst individuals of the receiver.
+stop_check and the time budget / target / patience limits are checked between
+epochs, so they act with a granularity of MIGRATION_INTERVAL generations.
+"""
+import logging
+import multiprocessing as mp
+import os
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Optimizer attributes copied into every island
+ISLAND_SETTINGS = [
+    "constraints", "constraint_weights", "POP_SIZE", "MUTATION_RATE", "ELITE_SIZE",
+    "TOURNAMENT_SIZE", "LINEAR_PREFILTER", "PREFILTER_TOLERANCE", "SURROGATE", "SURROGATE_KEEP",
+    "SURROGATE_MAX_ERROR", "SURROGATE_MIN_SAMPLES", "SURROGATE_REFIT_EVERY",
+    "prediction_store", "model_version", "HALL_OF_FAME_SIZE",
+]
+TOPOLOGIES = ("ring", "all")
+# Per-island counters summed into the coordinator's optimizer after every epoch
+COUNTERS = ("prefilter_stats", "surrogate_stats", "store_stats", "cache_stats")
+
+
+def _load_model(model_ref: Any) -> Any:
+    """model_ref is a model object or the path of the pickled multi-output model."""
+    if not isinstance(model_ref, str):
+        return model_ref
+    from artifact_store import ArtifactStore
+    store = ArtifactStore.open(os.getenv("ARTIFACT_STORE_DIR", ""), os.path.dirname(model_ref))
+    model = store.load_multioutput() if store is not None else None
+    return model if model is not None else joblib.load(model_ref)
+
+
+# -------------------------
+# Island worker process
+# -------------------------
+def _island_main(conn, coal_df, model_ref: Any, settings: Dict[str, Any], seed) -> None:
+    from genetic_algorithm import CoalBlendOptimizer
+
+    try:
+        optimizer = CoalBlendOptimizer("", coal_df, model=_load_model(model_ref))
+        for name, value in settings.items():
+            setattr(optimizer, name, value)
+        optimizer._compile_constraints()
+        optimizer._reset_run_state(time.perf_counter())
+        rng = np.random.default_rng(seed)
+        population = optimizer.deduplicate_array(rng, optimizer.random_population(rng, optimizer.POP_SIZE))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+    conn.send(("ready", None))
+
+    best_fitness = float("inf")
+    stagnant = 0
+    while True:
+        message = conn.recv()
+        if message[0] == "stop":
+            break
+        _, generations, migrants = message
+        try:
+            if migrants is not None and len(migrants):
+                population, _ = optimizer.rank_array(population)
+                keep = max(0, len(population) - len(migrants))
+                population = optimizer.deduplicate_array(rng, np.vstack([population[:keep], migrants]))
+
+            for _ in range(generations):
+                population, fitness = optimizer.rank_array(population)
+                if fitness[0] < best_fitness:
+                    best_fitness, stagnant = float(fitness[0]), 0
+                else:
+                    stagnant += 1
+                if stagnant > 3:
+                    population, fitness = optimizer.inject_array(rng, population)
+                    stagnant = 0
+                population = optimizer.offspring_array(rng, population)
+
+            population, fitness = optimizer.rank_array(population)
+            conn.send(("ok", {
+                "elites": population[:settings.get("MIGRANTS", 2)].copy(),
+                "elite_fitness": fitness[:settings.get("MIGRANTS", 2)].copy(),
+                "best": population[0].tolist(),
+                "best_fitness": float(fitness[0]),
+                "hall_of_fame": optimizer.hall_of_fame.entries(),
+                "evaluated": len(optimizer._fitness_cache),
+                "prefilter_stats": dict(optimizer.prefilter_stats),
+                "surrogate_stats": dict(optimizer.surrogate_stats),
+                "store_stats": dict(optimizer.store_stats),
+                "cache_stats": dict(optimizer.cache_stats),
+            }))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+            return
+
+
+class _Island:
+    def __init__(self, ctx, index: int, coal_df, model_ref: Any, settings: Dict[str, Any], seed):
+        self.index = index
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_island_main, args=(child, coal_df, model_ref, settings, seed),
+                                   name=f"ga-island-{index}", daemon=True)
+        self.process.start()
+        child.close()
+
+    def receive(self) -> Any:
+        status, payload = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(f"GA island {self.index} failed:\n{payload}")
+        return payload
+
+    def close(self) -> None:
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+# -------------------------
+# Coordinator
+# -------------------------
+def _migrants(reports: List[Dict[str, Any]], topology: str, global_best: List[int]) -> List[np.ndarray]:
+    """Rows each island receives after an epoch."""
+    k = len(reports)
+    if topology == "ring":
+        incoming = [reports[(i - 1) % k]["elites"] for i in range(k)]
+    else:
+        elites = np.vstack([r["elites"] for r in reports])
+        fitness = np.concatenate([r["elite_fitness"] for r in reports])
+        best = elites[np.argsort(fitness, kind="stable")[:len(reports[0]["elites"])]]
+        incoming = [best] * k
+    best_row = np.array([global_best], dtype=np.int32)
+    return [np.unique(np.vstack([rows, best_row]), axis=0) for rows in incoming]
+
+
+def optimize_islands(optimizer, stop_check: Optional[Callable[[], bool]] = None) -> Optional[Dict]:
+    """Run optimizer.ISLANDS islands for optimizer.N_GEN generations; same result shape as optimize()."""
+    if optimizer.MIGRATION_TOPOLOGY not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {optimizer.MIGRATION_TOPOLOGY}")
+    if len(optimizer.coal_df) < 3:
+        raise ValueError("At least 3 coals are needed to build a blend")
+
+    n_islands = int(optimizer.ISLANDS)
+    interval = max(1, int(optimizer.MIGRATION_INTERVAL))
+    settings = {name: getattr(optimizer, name) for name in ISLAND_SETTINGS}
+    settings["MIGRANTS"] = max(1, int(optimizer.MIGRANTS))
+    path = optimizer.model_path
+    model_ref = path if path and os.path.exists(path) else optimizer.model
+    seeds = np.random.SeedSequence(optimizer.RANDOM_SEED).spawn(n_islands)
+
+    ctx = mp.get_context("spawn")
+    started = time.perf_counter()
+    islands = [_Island(ctx, i, optimizer.coal_df, model_ref, settings, seeds[i]) for i in range(n_islands)]
+    try:
+        for island in islands:
+            island.receive()
+        logger.info("%d GA islands ready in %.2fs", n_islands, time.perf_counter() - started)
+
+        best_solution, best_fitness = None, float("inf")
+        since_improvement = 0
+        migrants: List[Optional[np.ndarray]] = [None] * n_islands
+        evaluated = [0] * n_islands
+        counters: List[Dict[str, Any]] = [{} for _ in range(n_islands)]
+        done = 0
+        while done < optimizer.N_GEN:
+            if stop_check and stop_check():
+                logger.info("Optimization stopped by user request")
+                return None
+            generations = min(interval, optimizer.N_GEN - done)
+            for island, rows in zip(islands, migrants):
+                island.conn.send(("evolve", generations, rows))
+            reports = [island.receive() for island in islands]
+            done += generations
+
+            previous_best = best_fitness
+            for i, report in enumerate(reports):
+                evaluated[i] = report["evaluated"]
+                counters[i] = {name: report[name] for name in COUNTERS}
+                optimizer.hall_of_fame.merge(report["hall_of_fame"])
+                if report["best_fitness"] < best_fitness:
+                    best_fitness, best_solution = report["best_fitness"], report["best"]
+            since_improvement = 0 if best_fitness < previous_best else since_improvement + generations
+            ### Island counters are cumulative; the run totals are their sums
+            for name in COUNTERS:
+                totals = getattr(optimizer, name)
+                for key in totals:
+                    totals[key] = sum(c[name][key] for c in counters)
+            optimizer.generations_run = done
+            optimizer._trace(best_fitness, evaluated=sum(evaluated))
+            logger.info(f"Generation {done}/{optimizer.N_GEN}: global best fitness {best_fitness}")
+            if optimizer._should_terminate(best_fitness, since_improvement):
+                break
+            migrants = _migrants(reports, optimizer.MIGRATION_TOPOLOGY, best_solution)
+    finally:
+        for island in islands:
+            island.close()
+
+    if best_solution is None:
+        raise ValueError("No valid solution found during optimization")
+    result = optimizer._build_result(best_solution)
+    return optimizer._with_search_stats(result, "islands", optimizer._started, evaluated=sum(evaluated))
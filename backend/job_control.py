@@ -0,0 +1,134 @@
+# job_control.py
+"""
+Cross-process control plane for running simulations.
+
+The simulation_jobs row is the shared registry: any API worker can read a job's
+status, owner, heartbeat and live progress, and request a stop by setting
+stop_requested (jobs.request_stop). The request is also published with Postgres
+NOTIFY on CHANNEL, so the job process that runs the GA learns about it at its
+next check_stop, i.e. within one generation (one epoch with islands, one chunk in
+exhaustive mode).
+
+Each job process keeps one StopListener. stop_requested() drains pending
+notifications from a dedicated LISTEN connection (non-blocking, no query) and, at
+most every poll_s, re-reads the job's stop_requested flag as a safety net for
+missed notifications and for databases without LISTEN/NOTIFY (sqlite).
+"""
+import logging
+import os
+import time
+from typing import Dict, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "simulation_control"
+
+
+def notify_stop(db: Session, simulation_id: int) -> None:
+    """Publish a stop request; delivered when db commits. No-op off Postgres."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                   {"channel": CHANNEL, "payload": str(simulation_id)})
+
+
+class StopListener:
+    def __init__(self, engine, session_factory, poll_s: float = 1.0):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.poll_s = poll_s
+        self._conn = None
+        self._watching: Set[int] = set()
+        self._requested: Set[int] = set()
+        self._last_check: Dict[int, float] = {}
+        self.listening = engine.dialect.name == "postgresql"
+        if self.listening:
+            self._connect()
+
+    @classmethod
+    def from_env(cls, engine, session_factory) -> "StopListener":
+        return cls(engine, session_factory, float(os.getenv("JOB_CONTROL_POLL_S", "1.0")))
+
+    def _connect(self) -> None:
+        try:
+            raw = self.engine.raw_connection()
+            raw.detach()  # autocommit LISTEN connection, kept out of the pool
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            self._conn = conn
+            self._last_check.clear()  # re-read flags: notifications may have been missed
+        except Exception as e:
+            logger.warning(f"LISTEN {CHANNEL} failed, polling the jobs table instead: {e}")
+            self._conn = None
+
+    def _drain(self) -> None:
+        if self._conn is None:
+            self._connect()
+            if self._conn is None:
+                return
+        try:
+            self._conn.poll()
+            while self._conn.notifies:
+                payload = self._conn.notifies.pop(0).payload
+                if payload.isdigit() and int(payload) in self._watching:
+                    self._requested.add(int(payload))
+        except Exception as e:
+            logger.warning(f"Lost the {CHANNEL} listener: {e}")
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _check_table(self, simulation_id: int) -> bool:
+        db = self.session_factory()
+        try:
+            return (db.query(models.SimulationJob.id)
+                    .filter(models.SimulationJob.simulation_id == simulation_id,
+                            models.SimulationJob.status == "running",
+                            models.SimulationJob.stop_requested.is_(True))
+                    .first()) is not None
+        except Exception as e:
+            logger.warning(f"Could not read stop flag of simulation {simulation_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+    def stop_requested(self, simulation_id: int) -> bool:
+        """Cheap enough to call every generation."""
+        if self.listening:
+            self._drain()
+        if simulation_id in self._requested:
+            return True
+        now = time.monotonic()
+        if now - self._last_check.get(simulation_id, float("-inf")) >= self.poll_s:
+            self._last_check[simulation_id] = now
+            if self._check_table(simulation_id):
+                self._requested.add(simulation_id)
+                return True
+        return False
+
+    def watch(self, simulation_id: int) -> None:
+        """Start tracking a simulation this process is about to run."""
+        self.forget(simulation_id)
+        self._watching.add(simulation_id)
+
+    def forget(self, simulation_id: int) -> None:
+        """Drop state for a finished job so a later run of the simulation starts clean."""
+        self._watching.discard(simulation_id)
+        self._requested.discard(simulation_id)
+        self._last_check.pop(simulation_id, None)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
@@ -0,0 +1,250 @@
+# jobs.py
+"""
+Durable simulation job queue on the simulation_jobs table (migrations/001_simulation_jobs.sql).
+
+The API only enqueues. worker.py processes claim the oldest claimable job with
+SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers never block on or
+double-claim a row. A claimed job is "running" under its worker_id and the worker
+refreshes heartbeat_at while the GA runs. Jobs whose heartbeat is older than the
+stale timeout (crashed worker, killed container) are put back in the queue by
+requeue_stale(). Failures are retried with exponential backoff until max_attempts.
+Stop requests and live progress go through the same row (see job_control.py).
+
+Timestamps are written by the workers in UTC, so hosts are assumed NTP-synced;
+the stale timeout (default 60s) is far above any normal skew.
+"""
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from job_control import notify_stop
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STOPPED_BY_USER = "Simulation stopped by user"
+
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_S = float(os.getenv("JOB_RETRY_BACKOFF_S", "30"))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue(db: Session, simulation_id: int, payload: Dict[str, Any],
+            max_attempts: Optional[int] = None) -> models.SimulationJob:
+    """Queue a run of simulation_id; an already queued/running job for it is returned as is."""
+    existing = _active_job(db, simulation_id)
+    if existing is not None:
+        return existing
+    job = models.SimulationJob(
+        simulation_id=simulation_id,
+        status=QUEUED,
+        payload=payload,
+        stop_requested=False,
+        attempts=0,
+        max_attempts=max_attempts or MAX_ATTEMPTS,
+        run_after=_now(),
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent enqueue won the ux_simulation_jobs_active race
+        db.rollback()
+        existing = _active_job(db, simulation_id)
+        if existing is None:
+            raise
+        return existing
+    db.refresh(job)
+    logger.info(f"Queued job {job.id} for simulation {simulation_id}")
+    return job
+
+
+def _active_job(db: Session, simulation_id: int) -> Optional[models.SimulationJob]:
+    return (db.query(models.SimulationJob)
+            .filter(models.SimulationJob.simulation_id == simulation_id,
+                    models.SimulationJob.status.in_([QUEUED, RUNNING]))
+            .first())
+
+
+def claim(db: Session, worker_id: str) -> Optional[models.SimulationJob]:
+    """Take the oldest claimable queued job, skipping rows other workers have locked."""
+    now = _now()
+    job = (db.query(models.SimulationJob)
+           .filter(models.SimulationJob.status == QUEUED,
+                   models.SimulationJob.run_after <= now)
+           .order_by(models.SimulationJob.run_after, models.SimulationJob.id)
+           .with_for_update(skip_locked=True)
+           .first())
+    if job is None:
+        db.rollback()
+        return None
+    job.status = RUNNING
+    job.attempts = (job.attempts or 0) + 1
+    job.worker_id = worker_id
+    job.started_at = now
+    job.heartbeat_at = now
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _owned(db: Session, job_id: int, worker_id: str):
+    return db.query(models.SimulationJob).filter(models.SimulationJob.id == job_id,
+                                                 models.SimulationJob.worker_id == worker_id,
+                                                 models.SimulationJob.status == RUNNING)
+
+
+def _update_owned(db: Session, job_id: int, worker_id: str, values: Dict[str, Any]) -> bool:
+    """Update a job only while worker_id still owns it in the running state."""
+    updated = _owned(db, job_id, worker_id).update(values, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+    """Refresh heartbeat_at (and progress). False means the job was reclaimed: stop working on it."""
+    values: Dict[str, Any] = {"heartbeat_at": _now()}
+    if progress is not None:
+        values["progress"] = progress
+    return _update_owned(db, job_id, worker_id, values)
+
+
+def complete(db: Session, job_id: int, worker_id: str) -> bool:
+    return _update_owned(db, job_id, worker_id, {"status": COMPLETED, "finished_at": _now()})
+
+
+def finish_stopped(db: Session, job: models.SimulationJob, worker_id: str) -> bool:
+    """The worker honoured a stop request: cancel the job and fail its simulation together."""
+    updated = (_owned(db, job.id, worker_id)
+               .update({"status": CANCELLED, "finished_at": _now()}, synchronize_session=False))
+    if updated:
+        _mark_simulation_failed(db, job.simulation_id, STOPPED_BY_USER)
+    db.commit()
+    return updated == 1
+
+
+def release(db: Session, job: models.SimulationJob, worker_id: str) -> bool:
+    """Give a job back to the queue without spending an attempt (worker shutting down)."""
+    return _update_owned(db, job.id, worker_id, {
+        "status": QUEUED, "worker_id": None, "run_after": _now(),
+        "attempts": max(0, (job.attempts or 1) - 1),
+    })
+
+
+def _retry_or_fail(job: models.SimulationJob, error: str) -> bool:
+    """Requeue with exponential backoff while attempts remain; returns True if requeued."""
+    job.error_message = error
+    job.worker_id = None
+    if (job.attempts or 0) < (job.max_attempts or MAX_ATTEMPTS):
+        job.status = QUEUED
+        job.run_after = _now() + timedelta(seconds=RETRY_BACKOFF_S * 2 ** max(0, (job.attempts or 1) - 1))
+        return True
+    job.status = FAILED
+    job.finished_at = _now()
+    return False
+
+
+def fail(db: Session, job_id: int, worker_id: str, error: str) -> Optional[bool]:
+    """
+    Record a failed attempt. Returns True if the job was requeued, False if it is
+    now permanently failed, None if this worker no longer owns it.
+    """
+    job = (db.query(models.SimulationJob)
+           .filter(models.SimulationJob.id == job_id,
+                   models.SimulationJob.worker_id == worker_id,
+                   models.SimulationJob.status == RUNNING)
+           .with_for_update()
+           .first())
+    if job is None:
+        db.rollback()
+        return None
+    requeued = _retry_or_fail(job, error)
+    if not requeued:
+        _mark_simulation_failed(db, job.simulation_id, error)
+    db.commit()
+    return requeued
+
+
+def requeue_stale(db: Session, stale_after_s: float) -> int:
+    """Requeue (or fail, when out of attempts) running jobs whose worker stopped heartbeating."""
+    cutoff = _now() - timedelta(seconds=stale_after_s)
+    stale = (db.query(models.SimulationJob)
+             .filter(models.SimulationJob.status == RUNNING,
+                     models.SimulationJob.heartbeat_at < cutoff)
+             .with_for_update(skip_locked=True)
+             .all())
+    for job in stale:
+        error = f"Worker {job.worker_id} stopped heartbeating"
+        logger.warning(f"Job {job.id} (simulation {job.simulation_id}): {error}")
+        if job.stop_requested:
+            job.status = CANCELLED
+            job.finished_at = _now()
+            _mark_simulation_failed(db, job.simulation_id, STOPPED_BY_USER)
+        elif not _retry_or_fail(job, error):
+            _mark_simulation_failed(db, job.simulation_id, error)
+    db.commit()
+    return len(stale)
+
+
+def request_stop(db: Session, simulation_id: int) -> int:
+    """
+    Stop a simulation from any process: queued jobs are cancelled outright, running
+    ones get stop_requested and a NOTIFY so their worker stops within a generation.
+    Returns the running jobs signalled; their worker sets the final status
+    (finish_stopped), otherwise the caller does.
+    """
+    filters = (models.SimulationJob.simulation_id == simulation_id,)
+    (db.query(models.SimulationJob)
+     .filter(*filters, models.SimulationJob.status == QUEUED)
+     .update({"status": CANCELLED, "stop_requested": True, "finished_at": _now()},
+             synchronize_session=False))
+    signalled = (db.query(models.SimulationJob)
+                 .filter(*filters, models.SimulationJob.status == RUNNING)
+                 .update({"stop_requested": True}, synchronize_session=False))
+    if signalled:
+        notify_stop(db, simulation_id)
+    db.commit()
+    return signalled
+
+
+def job_status(db: Session, simulation_id: int) -> Optional[Dict[str, Any]]:
+    """The latest job of a simulation as seen by every API worker."""
+    job = (db.query(models.SimulationJob)
+           .filter(models.SimulationJob.simulation_id == simulation_id)
+           .order_by(models.SimulationJob.id.desc())
+           .first())
+    if job is None:
+        return None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "worker_id": job.worker_id,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "stop_requested": bool(job.stop_requested),
+        "progress": job.progress,
+        "heartbeat_at": job.heartbeat_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error_message": job.error_message,
+    }
+
+
+def _mark_simulation_failed(db: Session, simulation_id: int, error: str) -> None:
+    simulation = db.query(models.Simulation).filter_by(id=simulation_id).first()
+    if simulation is not None:
+        simulation.status = "failed"
+        simulation.error_message = error
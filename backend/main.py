@@ -1,8 +1,9 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, status, Response, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, Response, BackgroundTasks, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, Column, Integer, String, func as sa_func
+from sqlalchemy.orm import sessionmaker, Session, selectinload
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta, datetime
@@ -12,7 +13,6 @@ import logging
 from typing import List, Dict, Optional
 import joblib
 import numpy as np
-from genetic_algorithm import CoalBlendOptimizer
 import pandas as pd
 import asyncio
 import traceback
@@ -30,7 +30,14 @@ import models
 import schemas
 import auth
 from database import engine, get_db
-from inference_engine import CoalBlendInferenceEngine
+from model_registry import ModelRegistry
+from worker_pool import BoundedExecutor, PoolFull
+from micro_batcher import MicroBatcher
+from prediction_store import PredictionStore
+import jobs
+from simulation_events import stream_updates
+from simulation_runner import backfill_emissions
+import metrics
 
 load_dotenv()
 
@@ -81,100 +88,34 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
-# Load the prediction models
-def load_models():
+# Load the model registry: inference engine + GA multi-output model, versioned by artifact hash.
+# Requests take `model_registry.active` once, so a hot-swap never changes models mid-request.
+def load_model_registry():
     models_dir = os.path.join(os.path.dirname(__file__), "Models")
     try:
-        # Load the single model that takes 22 inputs and gives 8 outputs
-        with open(os.path.join(models_dir, "multioutput_rf_model.pkl"), "rb") as f:
-            model = joblib.load(f)
-        return model
+        registry = ModelRegistry(models_dir)
+        registry.start_watcher(float(os.getenv("MODEL_WATCH_INTERVAL_S", "0")))
+        return registry
     except Exception as e:
-        logger.error(f"Error loading model: {str(e)}")
+        logger.error(f"Error loading models: {str(e)}")
         raise
 
-# Load model at startup
-prediction_model = load_models()
+# Load models at startup
+model_registry = load_model_registry()
 
-# Initialize inference engine
-def load_inference_engine():
-    models_dir = os.path.join(os.path.dirname(__file__), "Models")
-    try:
-        inference_engine = CoalBlendInferenceEngine(models_dir)
-        return inference_engine
-    except Exception as e:
-        logger.error(f"Error loading inference engine: {str(e)}")
-        raise
+# Bounded pool for /predict work (PREDICT_POOL_WORKERS threads, PREDICT_POOL_MAX_QUEUE waiting)
+prediction_pool = BoundedExecutor.from_env("predict", "PREDICT_POOL")
 
-# Load inference engine at startup
-inference_engine = load_inference_engine()
+# Coalesces concurrent /predict calls into one batched predict (PREDICT_BATCH_MAX_WAIT_MS / PREDICT_BATCH_MAX_SIZE)
+prediction_batcher = MicroBatcher.from_env(lambda: model_registry.active, prediction_pool)
 
-# Add a global dictionary to track running simulations
-running_simulations = {}
+# Raw GA predictions shared across simulations and processes (PREDICTION_STORE_PATH; unset = off)
+prediction_store = PredictionStore.from_env()
 
 # @app.post("/test-cors")
 # def test_cors():
 #     return {"message": "CORS works!"}
 
-# fixed carbon fc , s->sulphur , n->nitrogen ,
-def calculate_emissions(fc, ash, vm, s, n, cri, csr):
-    emissions = {}
-    # CO2
-    emissions["CO2_Emissions"] = 0.7 * (fc / 100) * (44.01 / 12.01) * 10
-    # CO
-    emissions["CO_Emissions"] = 0.3 * (fc / 100) * (28.01 / 12.01) * 10
-    # SO
-    emissions["SO2_Emissions"] = (s / 100) * (64.07 / 32.06) * 10
-    # NO
-    emissions["NO_Emissions"] = 0.2 * (n / 100) * (30.01 / 14.01) * 10
-    # NO2
-    emissions["NO2_Emissions"] = 0.2 * (n / 100) * (46.01 / 14.01) * 10
-
-    # PM Index
-    pm_index = 0.4 * (ash / 9) + 0.3 * (cri / 28) + 0.3 * (1 - csr / 65)
-    emissions["PM_Index"] = pm_index
-    emissions["PM10_Emissions"] = 0.7 * pm_index
-    emissions["PM25_Emissions"] = 0.3 * pm_index
-
-    # VOC Index
-    voc_index = 0.5 * (vm / 2.5) + 0.2 * (cri / 28) + 0.2 * (1 - csr / 65) + 0.1 * (n / 1.0)
-    emissions["VOC_Index"] = voc_index
-    emissions["VOC_Emissions"] = 0.9 * voc_index
-    emissions["PAH_Emissions"] = 0.1 * voc_index
-
-    return emissions
-
-
-
-    """Helper function to parse coal properties from text."""
-    def extract_number(pattern, text):
-        import re
-        match = re.search(fr'{pattern}\s*[:=]?\s*([\d.]+)', text, re.IGNORECASE)
-        return float(match.group(1)) if match else None
-
-    return {
-        "IM": extract_number(r'(?:Inherent\s+Moisture|IM)', text),
-        "Ash": extract_number(r'Ash', text),
-        "VM": extract_number(r'(?:Volatile\s+Matter|VM)', text),
-        "FC": extract_number(r'(?:Fixed\s+Carbon|FC)', text),
-        "S": extract_number(r'(?:Sulphur|Sulfur|S)', text),
-        "P": extract_number(r'(?:Phosphorus|P)', text),
-        "SiO2": extract_number(r'SiO2', text),
-        "Al2O3": extract_number(r'Al2O3', text),
-        "Fe2O3": extract_number(r'Fe2O3', text),
-        "CaO": extract_number(r'CaO', text),
-        "MgO": extract_number(r'MgO', text),
-        "Na2O": extract_number(r'Na2O', text),
-        "K2O": extract_number(r'K2O', text),
-        "TiO2": extract_number(r'TiO2', text),
-        "Mn3O4": extract_number(r'Mn3O4', text),
-        "SO3": extract_number(r'SO3', text),
-        "P2O5": extract_number(r'P2O5', text),
-        "CRI": extract_number(r'CRI', text),
-        "CSR": extract_number(r'CSR', text),
-        "N": extract_number(r'(?:Nitrogen|N)', text),
-    }
-
 def parse_coal_properties(text: str) -> dict:
     """Helper function to parse coal properties from text."""
     def extract_number(pattern, text):
@@ -378,112 +319,35 @@ async def predict_blend(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    try:
-        logger.info(f"Processing prediction request for user: {current_user.email}")
-        logger.info(f"Input blends: {prediction_input.blends}")
-        
-        # Validate total percentage equals 100
-        total_percentage = sum(blend.percentage for blend in prediction_input.blends)
-        if abs(total_percentage - 100) > 0.01:  # Allow for small floating point differences
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Total percentage must equal 100%"
-            )
+    logger.info(f"Processing prediction request for user: {current_user.email}")
+    logger.info(f"Input blends: {prediction_input.blends}")
 
-        # Get properties for all coals in the blend
-        coal_properties = {}
-        for blend in prediction_input.blends:
-            coal = db.query(models.CoalProperties).filter(
-                models.CoalProperties.coal_name == blend.coal_name
-            ).first()
-            
-            if not coal:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Coal properties not found for: {blend.coal_name}"
-                )
-            
-            coal_properties[blend.coal_name] = coal
-            logger.info(f"\nCoal Properties for {blend.coal_name} ({blend.percentage}%):")
-            logger.info(f"IM: {coal.IM}")
-            logger.info(f"Ash: {coal.Ash}")
-            logger.info(f"VM: {coal.VM}")
-            logger.info(f"FC: {coal.FC}")
-            logger.info(f"S: {coal.S}")
-            logger.info(f"P: {coal.P}")
-            logger.info(f"SiO2: {coal.SiO2}")
-            logger.info(f"Al2O3: {coal.Al2O3}")
-            logger.info(f"Fe2O3: {coal.Fe2O3}")
-            logger.info(f"CaO: {coal.CaO}")
-            logger.info(f"MgO: {coal.MgO}")
-            logger.info(f"Na2O: {coal.Na2O}")
-            logger.info(f"K2O: {coal.K2O}")
-            logger.info(f"TiO2: {coal.TiO2}")
-            logger.info(f"Mn3O4: {coal.Mn3O4}")
-            logger.info(f"SO3: {coal.SO3}")
-            logger.info(f"P2O5: {coal.P2O5}")
-            logger.info(f"BaO: {coal.BaO}")
-            logger.info(f"SrO: {coal.SrO}")
-            logger.info(f"ZnO: {coal.ZnO}")
-            logger.info(f"CRI: {coal.CRI}")
-            logger.info(f"CSR: {coal.CSR}")
-            logger.info(f"N:{coal.N}")
-            logger.info(f"HGI: {coal.HGI}")
-            logger.info(f"Coal Category: {coal.coal_category}")
-
-        # ========================================
-        # Use the inference engine for complete prediction
-        # ========================================
-        logger.info("\n=== Using Inference Engine for Complete Prediction ===")
-    
-        
-        # Convert blend input to the format expected by inference engine
-        blend_ratios = [{"coal_name": blend.coal_name, "percentage": blend.percentage} 
-                       for blend in prediction_input.blends]
-        
-        # Run complete inference pipeline
-        inference_results = inference_engine.run_inference(coal_properties, blend_ratios)
-        
-        # Extract results
-        # enhanced_blend_properties = inference_results["final_features"]
-        # predicted_targets = inference_results["predicted_targets"]
-        # emissions = inference_results["emissions"]
-        enhanced_blend_properties = inference_results["final_features"]
-        predicted_targets = inference_results["predicted_targets"]
-        emissions = inference_results["emissions"]
-        
-        # Format predictions for response
-        predicted_coal_properties = {
-            "ASH": enhanced_blend_properties.get("ASH", 0.0)/100,
-            "VM": enhanced_blend_properties.get("VM", 0.0)/100,
-            "FC": enhanced_blend_properties.get("weighted_F.C")/100,
-            "CSN": enhanced_blend_properties.get("weighted_CSN/FSI")/100  # Not predicted in current model
-        }
-        
-        predicted_coke_properties = {
-            "CRI": predicted_targets.get("CRI", 0.0),
-            "CSR": predicted_targets.get("CSR", 0.0),
-            "ASH": predicted_targets.get("ASH", 0.0),
-            "VM": predicted_targets.get("VM", 0.0),
-            "N": (enhanced_blend_properties.get("weighted_N", 0.0)*100) * 0.1,
-            "S": float(enhanced_blend_properties.get("weighted_S", 0.0)/ 100 )* 0.85,
-            "P": float(enhanced_blend_properties.get("weighted_Phosphorus", 0.0) / 100) * 0.9,
-            "C": float(enhanced_blend_properties.get("weighted_C",0.0)/100)
-        }
-        
-        # logger.info("=== Inference Engine Prediction completed successfully ===")
-        # logger.info(f"Predicted targets: {predicted_targets}")
-        # logger.info(f"Emissions: {emissions}")
-
-        # Create response using the schema
-        response = schemas.PredictionOutput(
-            blend_properties=enhanced_blend_properties,
-            predicted_coke_properties=predicted_coke_properties,
-            predicted_coal_properties=predicted_coal_properties
+    # Validate total percentage equals 100
+    total_percentage = sum(blend.percentage for blend in prediction_input.blends)
+    if abs(total_percentage - 100) > 0.01:  # Allow for small floating point differences
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Total percentage must equal 100%"
         )
-        
-        return response
-        
+
+    # DB lookups + CPU-bound inference run on the bounded prediction pool, never on the event loop
+    try:
+        coal_properties, blend_ratios = await prediction_pool.run(_load_blend_coals, prediction_input, db)
+        if prediction_batcher.enabled:
+            # Coalesced with concurrent requests into one batched predict
+            inference_results, model_version = await prediction_batcher.submit(coal_properties, blend_ratios)
+        else:
+            inference_results, model_version = await prediction_pool.run(_run_inference, coal_properties, blend_ratios)
+        return _prediction_response(inference_results, model_version)
+    except PoolFull:
+        metrics.counter("predict.rejected").inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Prediction service is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in predict_blend: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -491,6 +355,144 @@ async def predict_blend(
             detail=f"An error occurred during prediction: {str(e)}"
         )
 
+def _load_blend_coals(prediction_input: schemas.PredictionInput, db: Session):
+    """Coal rows for the blend (one IN query) and the engine's blend_ratios format."""
+    # Get properties for all coals in the blend (one IN query)
+    names = list(dict.fromkeys(blend.coal_name for blend in prediction_input.blends))
+    found = {}
+    for coal in db.query(models.CoalProperties).filter(models.CoalProperties.coal_name.in_(names)).all():
+        found.setdefault(coal.coal_name, coal)
+
+    coal_properties = {}
+    for blend in prediction_input.blends:
+        coal = found.get(blend.coal_name)
+        
+        if not coal:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Coal properties not found for: {blend.coal_name}"
+            )
+        
+        coal_properties[blend.coal_name] = coal
+        logger.info(f"\nCoal Properties for {blend.coal_name} ({blend.percentage}%):")
+        logger.info(f"IM: {coal.IM}")
+        logger.info(f"Ash: {coal.Ash}")
+        logger.info(f"VM: {coal.VM}")
+        logger.info(f"FC: {coal.FC}")
+        logger.info(f"S: {coal.S}")
+        logger.info(f"P: {coal.P}")
+        logger.info(f"SiO2: {coal.SiO2}")
+        logger.info(f"Al2O3: {coal.Al2O3}")
+        logger.info(f"Fe2O3: {coal.Fe2O3}")
+        logger.info(f"CaO: {coal.CaO}")
+        logger.info(f"MgO: {coal.MgO}")
+        logger.info(f"Na2O: {coal.Na2O}")
+        logger.info(f"K2O: {coal.K2O}")
+        logger.info(f"TiO2: {coal.TiO2}")
+        logger.info(f"Mn3O4: {coal.Mn3O4}")
+        logger.info(f"SO3: {coal.SO3}")
+        logger.info(f"P2O5: {coal.P2O5}")
+        logger.info(f"BaO: {coal.BaO}")
+        logger.info(f"SrO: {coal.SrO}")
+        logger.info(f"ZnO: {coal.ZnO}")
+        logger.info(f"CRI: {coal.CRI}")
+        logger.info(f"CSR: {coal.CSR}")
+        logger.info(f"N:{coal.N}")
+        logger.info(f"HGI: {coal.HGI}")
+        logger.info(f"Coal Category: {coal.coal_category}")
+
+    # ========================================
+    # Use the inference engine for complete prediction
+    # ========================================
+    logger.info("\n=== Using Inference Engine for Complete Prediction ===")
+
+    
+    # Convert blend input to the format expected by inference engine
+    blend_ratios = [{"coal_name": blend.coal_name, "percentage": blend.percentage} 
+                   for blend in prediction_input.blends]
+
+    # Rows are fully loaded; give the connection back before waiting on inference
+    db.close()
+    return coal_properties, blend_ratios
+
+def _run_inference(coal_properties: Dict[str, Any], blend_ratios: List[Dict]):
+    """Complete inference pipeline on the model set active right now."""
+    model_set = model_registry.active
+    return model_set.engine.run_inference(coal_properties, blend_ratios), model_set.version
+
+def _prediction_response(inference_results: Dict[str, Any], model_version: str) -> schemas.PredictionOutput:
+    # Extract results
+    # enhanced_blend_properties = inference_results["final_features"]
+    # predicted_targets = inference_results["predicted_targets"]
+    # emissions = inference_results["emissions"]
+    enhanced_blend_properties = inference_results["final_features"]
+    predicted_targets = inference_results["predicted_targets"]
+    emissions = inference_results["emissions"]
+    
+    # Format predictions for response
+    predicted_coal_properties = {
+        "ASH": enhanced_blend_properties.get("ASH", 0.0)/100,
+        "VM": enhanced_blend_properties.get("VM", 0.0)/100,
+        "FC": enhanced_blend_properties.get("weighted_F.C")/100,
+        "CSN": enhanced_blend_properties.get("weighted_CSN/FSI")/100  # Not predicted in current model
+    }
+    
+    predicted_coke_properties = {
+        "CRI": predicted_targets.get("CRI", 0.0),
+        "CSR": predicted_targets.get("CSR", 0.0),
+        "ASH": predicted_targets.get("ASH", 0.0),
+        "VM": predicted_targets.get("VM", 0.0),
+        "N": (enhanced_blend_properties.get("weighted_N", 0.0)*100) * 0.1,
+        "S": float(enhanced_blend_properties.get("weighted_S", 0.0)/ 100 )* 0.85,
+        "P": float(enhanced_blend_properties.get("weighted_Phosphorus", 0.0) / 100) * 0.9,
+        "C": float(enhanced_blend_properties.get("weighted_C",0.0)/100)
+    }
+    
+    # logger.info("=== Inference Engine Prediction completed successfully ===")
+    # logger.info(f"Predicted targets: {predicted_targets}")
+    # logger.info(f"Emissions: {emissions}")
+
+    # Create response using the schema
+    response = schemas.PredictionOutput(
+        blend_properties=enhanced_blend_properties,
+        predicted_coke_properties=predicted_coke_properties,
+        predicted_coal_properties=predicted_coal_properties,
+        model_version=model_version
+    )
+    
+    return response
+
+@app.get("/metrics")
+async def get_metrics(current_user: models.User = Depends(auth.get_current_user)):
+    """Prediction pool queue depth, latency histograms and cache stats for this worker."""
+    model_set = model_registry.active
+    return {
+        "pid": os.getpid(),
+        "model_version": model_set.version,
+        "prediction_pool": prediction_pool.stats(),
+        "prediction_cache": model_set.engine.cache.stats(),
+        "prediction_store": prediction_store.stats() if prediction_store is not None else None,
+        **metrics.snapshot(),
+    }
+
+@app.get("/admin/models")
+async def get_model_status(current_user: models.User = Depends(auth.get_current_admin)):
+    """Active model version, reload state and swap history (this worker)."""
+    return model_registry.status()
+
+@app.post("/admin/models/reload", status_code=status.HTTP_202_ACCEPTED)
+async def reload_models(
+    force: bool = False,
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    """
+    Load the Models directory in the background, warm it up and swap it in (ADMIN_EMAILS only).
+    In-flight requests and simulations finish on the version they started with.
+    """
+    started = model_registry.reload_in_background(force=force)
+    logger.info(f"Model reload requested by {current_user.email} (started={started})")
+    return {"started": started, **model_registry.status()}
+
 @app.get("/verify-token")
 async def verify_token(current_user: models.User = Depends(auth.get_current_user)):
     return {
@@ -612,257 +614,25 @@ async def stop_simulation(
         if db_simulation.status != "running":
             raise HTTPException(status_code=400, detail="Simulation is not running")
             
-        # Set stop flag in running_simulations
-        if simulation_id in running_simulations:
-            running_simulations[simulation_id]["stop_requested"] = True
-            logger.info(f"Stop requested for simulation {simulation_id}")
-            
-            # Update simulation status in database
-            db_simulation.status = "failed"
-            db_simulation.error_message = "Simulation stopped by user"
-            db.commit()
-            
-            # Remove from running simulations
-            running_simulations.pop(simulation_id, None)
-            
-            return {"message": "Stop request received", "status": "failed"}
-        else:
-            # If simulation is not in running_simulations but status is running,
-            # just update the status
-            db_simulation.status = "failed"
-            db_simulation.error_message = "Simulation stopped by user"
-            db.commit()
-            return {"message": "Simulation marked as failed", "status": "failed"}
-            
+        # Shared stop request: whichever worker runs the GA stops within a generation
+        signalled = jobs.request_stop(db, simulation_id)
+        logger.info(f"Stop requested for simulation {simulation_id} ({signalled} job(s) signalled)")
+        if signalled:
+            # The worker sets the final status: failed if it stopped, completed if it had already finished
+            return {"message": "Stop request received", "status": "stopping"}
+
+        # Queued or never started: no worker will report back
+        db_simulation.status = "failed"
+        db_simulation.error_message = jobs.STOPPED_BY_USER
+        db.commit()
+        return {"message": "Simulation stopped", "status": "failed"}
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error stopping simulation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def run_optimization(simulation_id: int, simulation_data: dict, db: Session):
-    try:
-        logger.info(f"Starting optimization process for simulation {simulation_id}")
-        
-        # Initialize simulation tracking
-        running_simulations[simulation_id] = {
-            "stop_requested": False,
-            "start_time": datetime.now()
-        }
-        
-        # Get simulation from database
-        db_simulation = db.query(models.Simulation).filter_by(id=simulation_id).first()
-        if not db_simulation:
-            logger.error(f"Simulation {simulation_id} not found")
-            return
-
-        # Ensure status is running
-        db_simulation.status = "running"
-        db.commit()
-        
-        # Convert constraints to the format expected by the optimizer
-        custom_constraints = {
-            'blend': {},
-            'coke': {}
-        }
-        
-        # Convert blend properties
-        for prop in simulation_data.get('blend_properties', []):
-            custom_constraints['blend'][prop['property_name']] = (
-                float(prop['min_value']),
-                float(prop['max_value'])
-            )
-            
-        # Convert coke properties
-        for prop in simulation_data.get('coke_properties', []):
-            custom_constraints['coke'][prop['property_name']] = (
-                float(prop['min_value']),
-                float(prop['max_value'])
-            )
-            
-        # Get coal data from database
-        coal_data = db.query(models.CoalProperties).all()
-        logger.info(f"Retrieved {len(coal_data)} coal entries from database")
-
-        if not coal_data:
-            raise ValueError("No coal data found in database")
-
-        # Create DataFrame from coal data
-        coal_df = pd.DataFrame([{
-            'Name_of_coal': coal.coal_name,
-            'IM': coal.IM,
-            'Ash': coal.Ash,
-            'VM_weight': coal.VM,
-            'FC': coal.FC,
-            'S': coal.S,
-            'P': coal.P,
-            'SiO2': coal.SiO2,
-            'Al2O3': coal.Al2O3,
-            'Fe2O3': coal.Fe2O3,
-            'CaO': coal.CaO,
-            'MgO': coal.MgO,
-            'Na2O': coal.Na2O,
-            'K2O': coal.K2O,
-            'TiO2': coal.TiO2,
-            'Mn3O4': coal.Mn3O4,
-            'SO3': coal.SO3,
-            'P2O5': coal.P2O5,
-            'BaO': coal.BaO,
-            'SrO': coal.SrO,
-            'ZnO': coal.ZnO,
-            'CRI_weight': coal.CRI,
-            'CSR_weight': coal.CSR,
-            'N': coal.N,
-            'Cost': coal.cost if hasattr(coal, 'cost') else 1000  # Use cost from DB if available
-        } for coal in coal_data])
-
-        logger.info(f"Created DataFrame with shape: {coal_df.shape}")
-        
-        # Initialize optimizer
-        model_path = os.path.join(os.path.dirname(__file__), "Models", "multioutput_rf_model.pkl")
-        optimizer = CoalBlendOptimizer(model_path, coal_df)
-        
-        # Define stop check function
-        def check_stop():
-            if simulation_id not in running_simulations:
-                return True
-            return running_simulations[simulation_id].get("stop_requested", False)
-        
-        # Run optimization
-        result = optimizer.optimize(custom_constraints=custom_constraints, stop_check=check_stop)
-        
-        # Check if optimization was stopped
-        if result is None:
-            logger.info(f"Optimization stopped for simulation {simulation_id}")
-            return
-            
-        # Store all unique blends in simulationCoalRecommendations
-        if isinstance(result, dict) and "all_unique_blends" in result:
-            # Store each unique blend as a separate row
-            for blend in result["all_unique_blends"]:
-                # Initialize coal percentages with zeros for all coals
-                coal_percentages = {
-                    "Metropolitan": 0.0,
-                    "Lake Vermont": 0.0,
-                    "PDN": 0.0,
-                    "Riverside": 0.0,
-                    "Poitrel": 0.0,
-                    "Illawara (PHCC)": 0.0,
-                    "Teck Venture": 0.0,
-                    "Leer": 0.0,
-                    "Daunia (SHCC)": 0.0,
-                    "Mt. Laurel": 0.0,
-                    "Moranbah North": 0.0,
-                    "R.PCI": 0.0,
-                    "Eagle crrek": 0.0,
-                    "Goonyella": 0.0,
-                    "Blue creek": 0.0,
-                    "Scratch Coal": 0.0,
-                    "Dhamra SHCC PDN": 0.0,
-                    "Elga": 0.0,
-                    "Low Ash SHCC/ SHCC-BHP": 0.0,
-                    "Leer/Russian HFCC": 0.0,
-                    "Indonasian": 0.0,
-                    "Uvalnaya": 0.0,
-                    "Caval Ridge": 0.0,
-                    "Amonate": 0.0,
-                    "Aus.SHCC": 0.0,
-                    "Indian Coal Dhanbaad": 0.0
-                }
-                
-                # Update percentages for coals in this blend
-                for coal in blend["coals"]:
-                    coal_percentages[coal["name"]] = coal["percentage"]
-                    
-                
-                
-                    
-                
-                # Create new recommendation entry with predicted values
-                recommendation = models.SimulationCoalRecommendations(
-                    simulation_id=simulation_id,
-                    coal_percentages=coal_percentages,
-                    predicted_ash=blend["predicted"]["ash"],
-                    predicted_vm=blend["predicted"]["vm"],
-                    predicted_fc=blend["predicted"]["fc"],
-                    predicted_csn=blend["predicted"]["csn"],
-                    predicted_cri=blend["predicted"]["cri"],
-                    predicted_csr=blend["predicted"]["csr"],
-                    predicted_ash_final=blend["predicted"]["ash_final"],
-                    predicted_vm_final=blend["predicted"]["vm_final"],
-                    total_cost=blend.get("cost", 0.0)
-                )
-                db.add(recommendation)
-            
-            # Also store the best blend as a separate row
-            best_blend = result["blend_combinations"][0]
-            best_coal_percentages = {
-                "Metropolitan": 0.0,
-                "Lake Vermont": 0.0,
-                "PDN": 0.0,
-                "Riverside": 0.0,
-                "Poitrel": 0.0,
-                "Illawara (PHCC)": 0.0,
-                "Teck Venture": 0.0,
-                "Leer": 0.0,
-                "Daunia (SHCC)": 0.0,
-                "Mt. Laurel": 0.0,
-                "Moranbah North": 0.0,
-                "R.PCI": 0.0,
-                "Eagle crrek": 0.0,
-                "Goonyella": 0.0,
-                "Blue creek": 0.0,
-                "Scratch Coal": 0.0,
-                "Dhamra SHCC PDN": 0.0,
-                "Elga": 0.0,
-                "Low Ash SHCC/ SHCC-BHP": 0.0,
-                "Leer/Russian HFCC": 0.0,
-                "Indonasian": 0.0,
-                "Uvalnaya": 0.0,
-                "Caval Ridge": 0.0,
-                "Amonate": 0.0,
-                "Aus.SHCC": 0.0,
-                "Indian Coal Dhanbaad": 0.0
-            }
-            
-            # Update percentages for coals in best blend
-            for coal in best_blend["coals"]:
-                best_coal_percentages[coal["name"]] = coal["percentage"]
-            
-            best_recommendation = models.SimulationCoalRecommendations(
-                simulation_id=simulation_id,
-                coal_percentages=best_coal_percentages,
-                predicted_ash=best_blend["predicted"]["ash"],
-                predicted_vm=best_blend["predicted"]["vm"],
-                predicted_fc=best_blend["predicted"]["fc"],
-                predicted_csn=best_blend["predicted"]["csn"],
-                predicted_cri=best_blend["predicted"]["cri"],
-                predicted_csr=best_blend["predicted"]["csr"],
-                predicted_ash_final=best_blend["predicted"]["ash_final"],
-                predicted_vm_final=best_blend["predicted"]["vm_final"],
-                total_cost=best_blend.get("cost", 0.0)
-            )
-            db.add(best_recommendation)
-        
-        # Update simulation status
-        db_simulation.status = "completed"
-        db.commit()
-        
-        # Remove from running simulations
-        running_simulations.pop(simulation_id, None)
-        
-    except Exception as e:
-        logger.error(f"Error in optimization process: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # Update simulation status to failed
-        db_simulation = db.query(models.Simulation).filter_by(id=simulation_id).first()
-        if db_simulation:
-            db_simulation.status = "failed"
-            db_simulation.error_message = str(e)
-            db.commit()
-            
-        # Remove from running simulations
-        running_simulations.pop(simulation_id, None)
-
 @app.post("/simulation/{simulation_id}/start")
 async def start_optimization(
     simulation_id: int,
@@ -871,9 +641,17 @@ async def start_optimization(
     current_user: models.User = Depends(auth.get_current_user)
 ):
     try:
-        # Start optimization in background
-        asyncio.create_task(run_optimization(simulation_id, simulation_data, db))
-        return {"message": "Optimization started"}
+        db_simulation = db.query(models.Simulation).filter(models.Simulation.id == simulation_id).first()
+        if not db_simulation:
+            raise HTTPException(status_code=404, detail="Simulation not found")
+        if db_simulation.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to start this simulation")
+
+        # The GA runs in worker.py processes; the API only queues the job
+        job = jobs.enqueue(db, simulation_id, simulation_data)
+        return {"message": "Optimization started", "job_id": job.id, "job_status": job.status}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting optimization: {str(e)}")
         raise HTTPException(
@@ -881,6 +659,45 @@ async def start_optimization(
             detail=f"Error starting optimization: {str(e)}"
         )
 
+@app.get("/simulation/{simulation_id}/job")
+async def get_simulation_job(
+    simulation_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Live job state from the shared jobs table: owner, heartbeat, progress, stop flag."""
+    db_simulation = db.query(models.Simulation).filter(models.Simulation.id == simulation_id).first()
+    if not db_simulation:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    if db_simulation.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this simulation")
+    job = jobs.job_status(db, simulation_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulation has not been started")
+    return job
+
+@app.get("/simulation/{simulation_id}/events")
+async def get_simulation_events(
+    simulation_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Server-sent progress events (simulation_updates rows) until the simulation finishes."""
+    db_simulation = db.query(models.Simulation).filter(models.Simulation.id == simulation_id).first()
+    if not db_simulation:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    if db_simulation.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this simulation")
+    # get_db's teardown only runs after the stream ends: give the connection back now,
+    # stream_updates opens its own session per poll
+    db.close()
+    last_id = request.headers.get("Last-Event-ID", "")
+    events = stream_updates(SessionLocal, simulation_id, int(last_id) if last_id.isdigit() else 0,
+                            request.is_disconnected, poll_s=float(os.getenv("SIM_EVENTS_POLL_S", "1.0")))
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # when user login then we have to fetch all the simulation of that user and we have to show that simulations
 @app.get("/simulations", response_model=List[schemas.SimulationResponse])
 async def get_simulations(
@@ -909,7 +726,9 @@ async def get_simulations(
             ).all()
             
             # Get recommendations
-            recommendations = db.query(models.SimulationCoalRecommendations).filter(
+            recommendations = db.query(models.SimulationCoalRecommendations).options(
+                selectinload(models.SimulationCoalRecommendations.coals)
+            ).filter(
                 models.SimulationCoalRecommendations.simulation_id == simulation.id
             ).all()
             
@@ -917,7 +736,7 @@ async def get_simulations(
             processed_recommendations = []
             for rec in recommendations:
                 # For each coal in the recommendation, create a separate recommendation entry
-                for coal_name, percentage in rec.coal_percentages.items():
+                for coal_name, percentage in rec.coal_shares.items():
                     if percentage > 0:  # Only include non-zero percentages
                         processed_rec = {
                             "id": rec.id,
@@ -994,129 +813,23 @@ async def get_simulation(
         ).all()
         
         # Get recommendations
-        recommendations = db.query(models.SimulationCoalRecommendations).filter(
+        recommendations = db.query(models.SimulationCoalRecommendations).options(
+            selectinload(models.SimulationCoalRecommendations.coals)
+        ).filter(
             models.SimulationCoalRecommendations.simulation_id == simulation.id
         ).all()
         
-        # Process recommendations to match the expected schema and calculate emissions
+        # Emissions are written with the recommendation (simulation_runner.recommendation_rows);
+        # rows stored before that are computed once here and persisted
+        backfill_emissions(db, recommendations)
+
+        # Process recommendations to match the expected schema
         processed_recommendations = []
         for rec in recommendations:
             logger.info(f"\n=== Processing recommendation id={rec.id} for simulation id={simulation.id} ===")
-            logger.info(f"Coal percentages: {rec.coal_percentages}")
-            # Calculate emissions for this recommendation blend
-            coal_properties = {}
-            
-            # Get coal properties for all coals in this recommendation
-            for coal_name, percentage in rec.coal_percentages.items():
-                if percentage > 0:  # Only get properties for coals with non-zero percentages
-                    coal = db.query(models.CoalProperties).filter(
-                        models.CoalProperties.coal_name == coal_name
-                    ).first()
-                    
-                    if coal:
-                        coal_properties[coal_name] = coal
-                        logger.info(
-                            f"Loaded properties for coal '{coal_name}' (percentage={percentage}%): "
-                            f"FC={coal.FC}, Ash={coal.Ash}, VM={coal.VM}, S={coal.S}, N={coal.N}, CRI={coal.CRI}, CSR={coal.CSR}"
-                        )
-            
-            # Calculate weighted averages for blend properties
-            weighted_blend_properties = {
-                "FC": 0.0,
-                "Ash": 0.0,
-                "VM": 0.0,
-                "S": 0.0,
-                "N": 0.0,
-                "CRI": 0.0,
-                "CSR": 0.0
-            }
-            
-            # Calculate weighted averages
-            for coal_name, percentage in rec.coal_percentages.items():
-                if percentage > 0 and coal_name in coal_properties:
-                    coal = coal_properties[coal_name]
-                    weight = percentage / 100.0  # Convert percentage to decimal
-                    
-                    logger.info(
-                        f"Contribution from '{coal_name}' (weight={weight:.4f}): "
-                        f"FC={(coal.FC or 0.0) * weight:.4f}, Ash={(coal.Ash or 0.0) * weight:.4f}, "
-                        f"VM={(coal.VM or 0.0) * weight:.4f}, S={(coal.S or 0.0) * weight:.4f}, "
-                        f"N={(coal.N or 0.0) * weight:.4f}, CRI={(coal.CRI or 0.0) * weight:.4f}, CSR={(coal.CSR or 0.0) * weight:.4f}"
-                    )
-                    # Add weighted values 
-                    weighted_blend_properties["FC"] += (coal.FC or 0.0) * weight
-                    weighted_blend_properties["Ash"] += (coal.Ash or 0.0) * weight
-                    weighted_blend_properties["VM"] += (coal.VM or 0.0) * weight
-                    weighted_blend_properties["S"] += (coal.S or 0.0) * weight
-                    weighted_blend_properties["N"] += (coal.N or 0.0) * weight
-                    weighted_blend_properties["CRI"] += (coal.CRI or 0.0) * weight
-                    weighted_blend_properties["CSR"] += (coal.CSR or 0.0) * weight
-
-            logger.info(
-                "Final weighted blend properties: "
-                f"FC={weighted_blend_properties['FC']:.4f}, "
-                f"Ash={weighted_blend_properties['Ash']:.4f}, "
-                f"VM={weighted_blend_properties['VM']:.4f}, "
-                f"S={weighted_blend_properties['S']:.4f}, "
-                f"N={weighted_blend_properties['N']:.4f}, "
-                f"CRI={weighted_blend_properties['CRI']:.4f}, "
-                f"CSR={weighted_blend_properties['CSR']:.4f}"
-            )
-            
-            # Calculate emissions for this blend
-            logger.info(
-                "Calculating emissions with inputs: "
-                f"FC={weighted_blend_properties['FC']:.4f}, "
-                f"Ash={weighted_blend_properties['Ash']:.4f}, "
-                f"VM={weighted_blend_properties['VM']:.4f}, "
-                f"S={weighted_blend_properties['S']:.4f}, "
-                f"N={weighted_blend_properties['N']:.4f}, "
-                f"CRI={weighted_blend_properties['CRI']:.4f}, "
-                f"CSR={weighted_blend_properties['CSR']:.4f}"
-            )
-            emissions = calculate_emissions(
-                fc=weighted_blend_properties["FC"],
-                ash=weighted_blend_properties["Ash"],
-                vm=weighted_blend_properties["VM"],
-                s=weighted_blend_properties["S"],
-                n=weighted_blend_properties["N"],
-                cri=weighted_blend_properties["CRI"],
-                csr=weighted_blend_properties["CSR"]
-            )
-            logger.info(
-                "Emissions calculated: "
-                f"CO2={emissions.get('CO2_Emissions', 0.0):.4f}, "
-                f"CO={emissions.get('CO_Emissions', 0.0):.4f}, "
-                f"SO2={emissions.get('SO2_Emissions', 0.0):.4f}, "
-                f"NO={emissions.get('NO_Emissions', 0.0):.4f}, "
-                f"NO2={emissions.get('NO2_Emissions', 0.0):.4f}, "
-                f"PM_Index={emissions.get('PM_Index', 0.0):.6f}, "
-                f"PM10={emissions.get('PM10_Emissions', 0.0):.6f}, "
-                f"PM25={emissions.get('PM25_Emissions', 0.0):.6f}, "
-                f"VOC_Index={emissions.get('VOC_Index', 0.0):.6f}, "
-                f"VOC={emissions.get('VOC_Emissions', 0.0):.6f}, "
-                f"PAH={emissions.get('PAH_Emissions', 0.0):.6f}"
-            )
-            
-            # Update the recommendation record with calculated emissions
-            rec.CO2_Emissions = emissions.get("CO2_Emissions", 0.0)
-            rec.CO_Emissions = emissions.get("CO_Emissions", 0.0)
-            rec.SO2_Emissions = emissions.get("SO2_Emissions", 0.0)
-            rec.NO_Emissions = emissions.get("NO_Emissions", 0.0)
-            rec.NO2_Emissions = emissions.get("NO2_Emissions", 0.0)
-            rec.PM_index = emissions.get("PM_Index", 0.0)
-            rec.PM10_Emissions = emissions.get("PM10_Emissions", 0.0)
-            rec.PM25_Emissions = emissions.get("PM25_Emissions", 0.0)
-            rec.VOC_index = emissions.get("VOC_Index", 0.0)
-            rec.VOC_Emissions = emissions.get("VOC_Emissions", 0.0)
-            rec.PAH_Emissions = emissions.get("PAH_Emissions", 0.0)
-            
-            # Commit the emission updates to database
-            logger.info("Persisting calculated emissions back to the database for this recommendation")
-            db.commit()
-            
+            logger.info(f"Coal percentages: {rec.coal_shares}")
             # For each coal in the recommendation, create a separate recommendation entry
-            for coal_name, percentage in rec.coal_percentages.items():
+            for coal_name, percentage in rec.coal_shares.items():
                 if percentage > 0:  # Only include non-zero percentages
                     processed_rec = {
                         "id": rec.id,
@@ -1172,6 +885,44 @@ async def get_simulation(
             detail=f"An error occurred while fetching simulation: {str(e)}"
         )
 
+@app.get("/simulations/by-coal")
+async def get_simulations_by_coal(
+    coal_name: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Simulations of the current user with a recommendation using coal_name (indexed child-table lookup)."""
+    Rec = models.SimulationCoalRecommendations
+    RecCoal = models.SimulationRecommendationCoal
+    rows = (
+        db.query(
+            models.Simulation.id,
+            models.Simulation.scenario_name,
+            models.Simulation.status,
+            models.Simulation.generated_date,
+            sa_func.count(RecCoal.id).label("recommendations"),
+            sa_func.max(RecCoal.percentage).label("max_percentage"),
+        )
+        .join(Rec, Rec.simulation_id == models.Simulation.id)
+        .join(RecCoal, RecCoal.recommendation_id == Rec.id)
+        .filter(models.Simulation.user_id == current_user.id, RecCoal.coal_name == coal_name)
+        .group_by(models.Simulation.id, models.Simulation.scenario_name,
+                  models.Simulation.status, models.Simulation.generated_date)
+        .order_by(models.Simulation.generated_date.desc())
+        .all()
+    )
+    return [
+        {
+            "id": row.id,
+            "scenario_name": row.scenario_name,
+            "status": row.status,
+            "generated_date": row.generated_date,
+            "recommendations": row.recommendations,
+            "max_percentage": row.max_percentage,
+        }
+        for row in rows
+    ]
+
 @app.get("/simulations/batch")
 async def get_simulations_batch(
     simulation_ids: str,  # Comma-separated list of simulation IDs
@@ -1205,7 +956,7 @@ async def get_simulations_batch(
             latest_update = (
                 db.query(models.SimulationUpdate)
                 .filter(models.SimulationUpdate.simulation_id == sim.id)
-                .order_by(models.SimulationUpdate.timestamp.desc())
+                .order_by(models.SimulationUpdate.timestamp.desc(), models.SimulationUpdate.id.desc())
                 .first()
             )
             
@@ -0,0 +1,91 @@
+# metrics.py
+"""
+In-process metrics (per uvicorn worker): counters and fixed-bucket latency histograms.
+Exposed as JSON by GET /metrics.
+"""
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+# Upper bounds in milliseconds (+inf bucket is implicit)
+DEFAULT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class Histogram:
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = list(buckets or DEFAULT_MS_BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the +inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            le = [str(b) for b in self.buckets] + ["+inf"]
+            return {
+                "count": self.count,
+                "sum": self.total,
+                "mean": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "p50": self.quantile(0.50),
+                "p95": self.quantile(0.95),
+                "p99": self.quantile(0.99),
+                "buckets": dict(zip(le, self.counts)),
+            }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, Counter] = {}
+
+
+def histogram(name: str, buckets: Optional[List[float]] = None) -> Histogram:
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram(buckets)
+        return _histograms[name]
+
+
+def counter(name: str) -> Counter:
+    with _lock:
+        if name not in _counters:
+            _counters[name] = Counter()
+        return _counters[name]
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        hists, counters = dict(_histograms), dict(_counters)
+    return {
+        "counters": {name: c.value for name, c in counters.items()},
+        "histograms": {name: h.snapshot() for name, h in hists.items()},
+    }
@@ -0,0 +1,124 @@
+# micro_batcher.py
+"""
+Dynamic micro-batching for /predict.
+
+Concurrent requests put (coal_properties, blend_ratios) on an asyncio queue. A
+collector task takes the first waiting request, keeps collecting until max_batch
+requests or max_wait_ms have passed, and scores the whole group with one
+run_inference_batch call (one scaler.transform and one predict per target) on the
+prediction pool. Each caller's future gets its own result back.
+
+Coal rows from different requests are merged by coal_name (the primary key of
+coal_properties_clean), so a batch sees one row per coal.
+
+Knobs: PREDICT_BATCH_MAX_WAIT_MS (default 2), PREDICT_BATCH_MAX_SIZE (default 64;
+1 disables batching). While a batch is scoring the next one keeps filling, so
+max_wait_ms=0 still coalesces whatever arrives in the meantime.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+from worker_pool import BoundedExecutor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+class MicroBatcher:
+    def __init__(self, get_model_set: Callable[[], Any], pool: BoundedExecutor,
+                 max_wait_ms: float = 2.0, max_batch: int = 64):
+        self.get_model_set = get_model_set  # e.g. lambda: model_registry.active
+        self.pool = pool
+        self.max_wait_ms = float(max_wait_ms)
+        self.max_batch = max(1, int(max_batch))
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._batch_size = metrics.histogram("predict_batch.size", BATCH_SIZE_BUCKETS)
+        self._queue_ms = metrics.histogram("predict_batch.queue_latency_ms")
+        self._score_ms = metrics.histogram("predict_batch.score_ms")
+
+    @classmethod
+    def from_env(cls, get_model_set: Callable[[], Any], pool: BoundedExecutor) -> "MicroBatcher":
+        return cls(
+            get_model_set,
+            pool,
+            max_wait_ms=float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "2")),
+            max_batch=int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._collector is not None and not self._collector.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        # At most one batch per pool worker scoring at a time; the rest keep coalescing
+        self._slots = asyncio.Semaphore(self.pool.workers)
+        self._collector = loop.create_task(self._collect())
+
+    async def submit(self, coal_properties: Dict[str, Any], blend_ratios: List[Dict]) -> Tuple[Dict[str, Any], str]:
+        """Score one blend as part of the next batch. Returns (run_inference result, model_version)."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((time.perf_counter(), coal_properties, blend_ratios, future))
+        return await future
+
+    # -------------------------
+    # Collector
+    # -------------------------
+    async def _collect(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+
+            await self._slots.acquire()
+            self._loop.create_task(self._score(batch))
+
+    async def _score(self, batch: List[Tuple]) -> None:
+        try:
+            started = time.perf_counter()
+            for enqueued, _, _, _ in batch:
+                self._queue_ms.observe((started - enqueued) * 1000.0)
+            self._batch_size.observe(len(batch))
+
+            merged: Dict[str, Any] = {}
+            for _, coal_properties, _, _ in batch:
+                merged.update(coal_properties)
+            model_set = self.get_model_set()
+            try:
+                results = await self.pool.run(model_set.engine.run_inference_batch,
+                                              merged, [item[2] for item in batch])
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self._score_ms.observe((time.perf_counter() - started) * 1000.0)
+            for (*_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result((result, model_set.version))
+        finally:
+            self._slots.release()
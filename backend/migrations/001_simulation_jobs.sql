@@ -0,0 +1,31 @@
+-- Durable queue for optimization runs (models.SimulationJob, jobs.py, worker.py).
+-- Workers claim rows with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+-- worker processes on any number of hosts can poll the same table.
+
+CREATE TABLE IF NOT EXISTS simulation_jobs (
+    id SERIAL PRIMARY KEY,
+    simulation_id INTEGER REFERENCES simulations(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    payload JSON,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker_id VARCHAR(255),
+    run_after TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    error_message TEXT,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_simulation_jobs_simulation_id ON simulation_jobs (simulation_id);
+
+-- At most one active job per simulation (concurrent /start calls, see jobs.enqueue)
+CREATE UNIQUE INDEX IF NOT EXISTS ux_simulation_jobs_active ON simulation_jobs (simulation_id)
+    WHERE status IN ('queued', 'running');
+
+-- Claim path: oldest claimable queued job
+CREATE INDEX IF NOT EXISTS ix_simulation_jobs_queued ON simulation_jobs (run_after, id) WHERE status = 'queued';
+
+-- Stale-heartbeat sweep
+CREATE INDEX IF NOT EXISTS ix_simulation_jobs_running ON simulation_jobs (heartbeat_at) WHERE status = 'running';
@@ -0,0 +1,5 @@
+-- Shared control plane for running simulations (job_control.py): stop requests
+-- from any API worker and live progress reported with each worker heartbeat.
+
+ALTER TABLE simulation_jobs ADD COLUMN IF NOT EXISTS stop_requested BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE simulation_jobs ADD COLUMN IF NOT EXISTS progress JSON;
@@ -0,0 +1,6 @@
+-- Live GA progress in simulation_updates (simulation_events.py): the optimizer's
+-- progress event per row, and the index the SSE endpoint polls with.
+
+ALTER TABLE simulation_updates ADD COLUMN IF NOT EXISTS details JSON;
+
+CREATE INDEX IF NOT EXISTS ix_simulation_updates_simulation_id_id ON simulation_updates (simulation_id, id);
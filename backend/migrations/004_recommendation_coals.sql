@@ -0,0 +1,32 @@
+-- Sparse, indexed storage for the coals of each recommended blend
+-- (models.SimulationRecommendationCoal). Replaces the all-coals JSON dict in
+-- "simulationCoalRecommendations".coal_percentages: one row per coal actually
+-- in the blend, named as in the live catalog, and indexed by coal_name for
+-- GET /simulations/by-coal.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS simulation_recommendation_coals (
+    id SERIAL PRIMARY KEY,
+    recommendation_id INTEGER NOT NULL REFERENCES "simulationCoalRecommendations"(id) ON DELETE CASCADE,
+    coal_name VARCHAR(100) NOT NULL,
+    percentage DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_simulation_recommendation_coals_recommendation_id
+    ON simulation_recommendation_coals (recommendation_id);
+CREATE INDEX IF NOT EXISTS ix_simulation_recommendation_coals_coal_name
+    ON simulation_recommendation_coals (coal_name, recommendation_id);
+
+-- Backfill from the JSON dicts (non-zero entries only), then drop the dicts
+INSERT INTO simulation_recommendation_coals (recommendation_id, coal_name, percentage)
+SELECT r.id, kv.key, kv.value::double precision
+FROM "simulationCoalRecommendations" r
+CROSS JOIN LATERAL json_each_text(r.coal_percentages) AS kv
+WHERE r.coal_percentages IS NOT NULL
+  AND kv.value::double precision > 0
+  AND NOT EXISTS (SELECT 1 FROM simulation_recommendation_coals c WHERE c.recommendation_id = r.id);
+
+UPDATE "simulationCoalRecommendations" SET coal_percentages = NULL WHERE coal_percentages IS NOT NULL;
+
+COMMIT;
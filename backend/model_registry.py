@@ -0,0 +1,226 @@
+# model_registry.py
+"""
+Versioned model registry with atomic hot-swap.
+
+A "version" is the artifact_hash of the Models directory. The registry keeps a
+reference to the active ModelSet (inference engine + the GA's multi-output model).
+reload() builds a complete new set off to the side, warms it up with a dummy
+inference and only then swaps the reference under a lock. Callers grab
+`registry.active` once per request/simulation and keep using that set, so
+in-flight work finishes on the version it started with; the old set is freed when
+the last reference goes away.
+
+Reloads are triggered by the admin endpoint (POST /admin/models/reload) or by the
+optional watcher thread (MODEL_WATCH_INTERVAL_S > 0), which polls the directory and
+reloads once the files have stopped changing. Each uvicorn worker has its own
+registry, so multi-worker deployments should enable the watcher.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from artifact_store import ArtifactStore, MULTIOUTPUT_MODEL
+from coal_catalog import CoalCatalog, CATALOG_PROPERTIES, CATEGORY_FLAGS
+from inference_engine import CoalBlendInferenceEngine, TARGETS
+from prediction_cache import artifact_hash
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSet:
+    """Everything loaded from one version of the Models directory."""
+
+    def __init__(self, version: str, engine: CoalBlendInferenceEngine, ga_model: Optional[Any]):
+        self.version = version
+        self.engine = engine
+        self.ga_model = ga_model  # multioutput_rf_model.pkl (None if absent)
+        self.loaded_at = datetime.utcnow()
+
+
+def load_ga_model(models_dir: str, store: Optional[ArtifactStore] = None) -> Optional[Any]:
+    """The GA's multi-output model: compiled from the artifact store if current, else the pickle."""
+    model = store.load_multioutput() if store is not None else None
+    if model is not None:
+        return model
+    path = os.path.join(models_dir, MULTIOUTPUT_MODEL)
+    if not os.path.exists(path):
+        logger.warning("%s missing in %s", MULTIOUTPUT_MODEL, models_dir)
+        return None
+    with open(path, "rb") as f:
+        return joblib.load(f)
+
+
+def warm_up(engine: CoalBlendInferenceEngine) -> Dict[str, float]:
+    """One dummy inference through every stage; raises if any target is missing or non-finite."""
+    values = np.ones((1, len(CATALOG_PROPERTIES)), dtype=np.float64)
+    category = np.zeros((1, len(CATEGORY_FLAGS)), dtype=np.float64)
+    category[0, CATEGORY_FLAGS.index("HCC")] = 1.0
+    catalog = CoalCatalog(["__warmup__"], values, category)
+    predicted = engine.run_inference_batch(catalog, [[{"coal_name": "__warmup__", "percentage": 100.0}]])[0]
+    predicted = predicted["predicted_targets"]
+    missing = [t for t in TARGETS if t not in engine._target_plans]
+    if missing:
+        raise RuntimeError(f"Model set has no assets for {', '.join(missing)}")
+    if not all(np.isfinite(v) for v in predicted.values()):
+        raise RuntimeError(f"Warm-up produced non-finite predictions: {predicted}")
+    return predicted
+
+
+def _dir_signature(models_dir: str) -> Tuple:
+    """Cheap change detector: (name, size, mtime) of every file in the directory."""
+    try:
+        entries = []
+        for name in sorted(os.listdir(models_dir)):
+            st = os.stat(os.path.join(models_dir, name))
+            entries.append((name, st.st_size, st.st_mtime_ns))
+        return tuple(entries)
+    except OSError:
+        return ()
+
+
+class ModelRegistry:
+    def __init__(self, models_dir: str,
+                 engine_factory: Callable[[str], CoalBlendInferenceEngine] = CoalBlendInferenceEngine,
+                 history_size: int = 10):
+        self.models_dir = models_dir
+        self.engine_factory = engine_factory
+        self.history_size = history_size
+
+        self._lock = threading.Lock()          # guards the active reference
+        self._reload_lock = threading.Lock()   # one reload at a time
+        self._active: Optional[ModelSet] = None
+        self.reloading = False
+        self.last_error: Optional[str] = None
+        self.history: List[Dict[str, Any]] = []
+
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+        # Initial load is synchronous: the API can't serve without a model set
+        self._swap(self._load())
+
+    # -------------------------
+    # Active set
+    # -------------------------
+    @property
+    def active(self) -> ModelSet:
+        with self._lock:
+            return self._active
+
+    @property
+    def engine(self) -> CoalBlendInferenceEngine:
+        return self.active.engine
+
+    @property
+    def version(self) -> str:
+        return self.active.version
+
+    def status(self) -> Dict[str, Any]:
+        active = self.active
+        return {
+            "version": active.version,
+            "loaded_at": active.loaded_at.isoformat(),
+            "ga_model_loaded": active.ga_model is not None,
+            "reloading": self.reloading,
+            "last_error": self.last_error,
+            "watching": self._watch_thread is not None and self._watch_thread.is_alive(),
+            "history": list(self.history),
+        }
+
+    # -------------------------
+    # Load / swap
+    # -------------------------
+    def _load(self) -> ModelSet:
+        """Build and warm a complete model set without touching the active one."""
+        started = time.perf_counter()
+        engine = self.engine_factory(self.models_dir)
+        store = ArtifactStore.open(engine.artifact_store_dir, self.models_dir, engine.model_version)
+        ga_model = load_ga_model(self.models_dir, store)
+        warm_up(engine)
+
+        # Files changed while loading -> the hash may not describe what was loaded
+        if artifact_hash(self.models_dir) != engine.model_version:
+            raise RuntimeError("Models directory changed during load; retry once the copy is complete")
+
+        logger.info("Model set %s loaded and warmed in %.2fs",
+                    engine.model_version[:12], time.perf_counter() - started)
+        return ModelSet(engine.model_version, engine, ga_model)
+
+    def _swap(self, model_set: ModelSet) -> None:
+        with self._lock:
+            previous = self._active
+            self._active = model_set
+        self.history.append({
+            "version": model_set.version,
+            "previous": previous.version if previous is not None else None,
+            "activated_at": model_set.loaded_at.isoformat(),
+        })
+        del self.history[:-self.history_size]
+        if previous is not None:
+            logger.info("Swapped model set %s -> %s", previous.version[:12], model_set.version[:12])
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Load the current Models directory and swap it in. No-op when the hash is
+        unchanged (unless force). The active set keeps serving if anything fails.
+        """
+        with self._reload_lock:
+            current = self.active.version
+            if not force and artifact_hash(self.models_dir) == current:
+                return {"swapped": False, "version": current, "reason": "unchanged"}
+
+            self.reloading = True
+            try:
+                model_set = self._load()
+            except Exception as e:
+                self.last_error = f"{datetime.utcnow().isoformat()}: {e}"
+                logger.exception("Model reload failed; keeping version %s", current[:12])
+                return {"swapped": False, "version": current, "reason": str(e)}
+            finally:
+                self.reloading = False
+
+            self.last_error = None
+            self._swap(model_set)
+            return {"swapped": True, "version": model_set.version, "previous": current}
+
+    def reload_in_background(self, force: bool = False) -> bool:
+        """Start reload() on a daemon thread. False if a reload is already running."""
+        if self.reloading or self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, kwargs={"force": force},
+                         name="model-reload", daemon=True).start()
+        return True
+
+    # -------------------------
+    # Watcher
+    # -------------------------
+    def start_watcher(self, interval_s: float) -> None:
+        """Poll the Models directory every interval_s; reload once a change has settled for one interval."""
+        if interval_s <= 0 or (self._watch_thread is not None and self._watch_thread.is_alive()):
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=self._watch, args=(interval_s,),
+                                              name="model-watcher", daemon=True)
+        self._watch_thread.start()
+        logger.info("Watching %s for model changes every %.1fs", self.models_dir, interval_s)
+
+    def stop_watcher(self) -> None:
+        self._watch_stop.set()
+
+    def _watch(self, interval_s: float) -> None:
+        seen = _dir_signature(self.models_dir)
+        pending = False
+        while not self._watch_stop.wait(interval_s):
+            sig = _dir_signature(self.models_dir)
+            if sig != seen:
+                seen, pending = sig, True  # still changing; wait for it to settle
+                continue
+            if pending:
+                pending = False
+                self.reload()
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, ForeignKey, Text, JSON
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, ForeignKey, Text, JSON, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -135,35 +135,8 @@ class SimulationCoalRecommendations(Base):
     id = Column(Integer, primary_key=True, index=True)
     simulation_id = Column(Integer, ForeignKey("simulations.id"))
     
-    # Store coal percentages in a JSON column
-    coal_percentages = Column(JSON, default={
-        "Metropolitan": 0.0,
-        "Lake Vermont": 0.0,
-        "PDN": 0.0,
-        "Riverside": 0.0,
-        "Poitrel": 0.0,
-        "Illawara (PHCC)": 0.0,
-        "Teck Venture": 0.0,
-        "Leer": 0.0,
-        "Daunia (SHCC)": 0.0,
-        "Mt. Laurel": 0.0,
-        "Moranbah North": 0.0,
-        "R.PCI": 0.0,
-        "Eagle crrek": 0.0,
-        "Goonyella": 0.0,
-        "Blue creek": 0.0,
-        "Scratch Coal": 0.0,
-        "Dhamra SHCC PDN": 0.0,
-        "Elga": 0.0,
-        "Low Ash SHCC/ SHCC-BHP": 0.0,
-        "Leer/Russian HFCC": 0.0,
-        "Indonasian": 0.0,
-        "Uvalnaya": 0.0,
-        "Caval Ridge": 0.0,
-        "Amonate": 0.0,
-        "Aus.SHCC": 0.0,
-        "Indian Coal Dhanbaad": 0.0
-    })
+    # Legacy: every catalog coal as a JSON dict. New rows use the coals child table
+    coal_percentages = Column(JSON)
 
     # Predicted values
     predicted_ash = Column(Float)
@@ -194,6 +167,31 @@ class SimulationCoalRecommendations(Base):
 
     # Relationship
     simulation = relationship("Simulation", back_populates="coal_recommendations") 
+    coals = relationship("SimulationRecommendationCoal", back_populates="recommendation",
+                         cascade="all, delete-orphan", passive_deletes=True)
+
+    @property
+    def coal_shares(self):
+        """{coal_name: percentage} of the coals in the blend (child rows, else the legacy JSON)."""
+        if self.coals:
+            return {coal.coal_name: coal.percentage for coal in self.coals}
+        return {name: pct for name, pct in (self.coal_percentages or {}).items() if pct and pct > 0}
+
+class SimulationRecommendationCoal(Base):
+    """One coal of a recommended blend; indexed by coal_name for "simulations that used X"."""
+    __tablename__ = "simulation_recommendation_coals"
+    __table_args__ = (
+        # Same composite index as migrations/004_recommendation_coals.sql
+        Index("ix_simulation_recommendation_coals_coal_name", "coal_name", "recommendation_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recommendation_id = Column(Integer, ForeignKey("simulationCoalRecommendations.id", ondelete="CASCADE"),
+                               nullable=False, index=True)
+    coal_name = Column(String(100), nullable=False)
+    percentage = Column(Float, nullable=False)
+
+    recommendation = relationship("SimulationCoalRecommendations", back_populates="coals")
 
 class SimulationUpdate(Base):
     __tablename__ = "simulation_updates"
@@ -203,8 +201,35 @@ class SimulationUpdate(Base):
     status = Column(String(50))  # running, completed, failed
     progress = Column(Float, default=0.0)  # 0 to 100
     message = Column(Text)  # Optional status message
+    details = Column(JSON)  # optimizer progress event (see simulation_events.py)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+class SimulationJob(Base):
+    """Queued optimization run, claimed by worker.py with SELECT ... FOR UPDATE SKIP LOCKED (see jobs.py)."""
+    __tablename__ = "simulation_jobs"
+    __table_args__ = (
+        # At most one active job per simulation, whatever races the API has
+        Index("ux_simulation_jobs_active", "simulation_id", unique=True,
+              postgresql_where=text("status IN ('queued', 'running')"),
+              sqlite_where=text("status IN ('queued', 'running')")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    simulation_id = Column(Integer, ForeignKey("simulations.id", ondelete="CASCADE"), index=True)
+    status = Column(String(20), default="queued", index=True)  # queued, running, completed, failed, cancelled
+    payload = Column(JSON)  # blend/coke constraints posted to /simulation/{id}/start
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    worker_id = Column(String(255))  # host:pid of the claiming worker
+    run_after = Column(DateTime(timezone=True))  # not claimable before this (retry backoff)
+    heartbeat_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    error_message = Column(Text)
+    stop_requested = Column(Boolean, default=False)  # set by /stop on any API worker (see job_control.py)
+    progress = Column(JSON)  # generation, n_gen, best_fitness, elapsed_s; written with each heartbeat
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class VendorCoalData(Base):
     """Stores coal data uploaded by vendors"""
     __tablename__ = "vendor_coal_data"
@@ -0,0 +1,123 @@
+# prediction_cache.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# Cache keys
+# -------------------------
+def canonical_blend(blend_ratios: List[Dict]) -> Tuple[Tuple[str, float], ...]:
+    """
+    Order-independent key for a blend: sorted (coal_name, percentage) pairs.
+
+    Percentages are normalized only in representation (float, rounded to 6 dp) - not
+    rescaled to sum to 100 - because the engine works on raw weights, so 40/35/25 and
+    80/70/50 give different features. Repeated coal names are kept as separate pairs
+    since they also change the unweighted sums.
+    """
+    pairs = []
+    for b in blend_ratios:
+        try:
+            pct = float(b.get("percentage", 0.0))
+        except Exception:
+            pct = 0.0
+        pairs.append((str(b.get("coal_name")), round(pct, 6)))
+    return tuple(sorted(pairs))
+
+
+def artifact_hash(models_dir: str) -> str:
+    """sha256 over the names and contents of every file in the Models directory."""
+    h = hashlib.sha256()
+    if not os.path.isdir(models_dir):
+        return h.hexdigest()
+    for name in sorted(os.listdir(models_dir)):
+        path = os.path.join(models_dir, name)
+        if not os.path.isfile(path):
+            continue
+        h.update(name.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+# -------------------------
+# LRU + TTL cache
+# -------------------------
+class PredictionCache:
+    """
+    Bounded, thread-safe LRU cache with a per-entry TTL.
+    max_entries <= 0 disables it (get always misses, put is a no-op).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "PredictionCache":
+        return cls(
+            max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL_S", "300")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (self.ttl_seconds <= 0 or now - entry[0] < self.ttl_seconds):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]  # expired
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
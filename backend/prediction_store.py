@@ -0,0 +1,194 @@
+# prediction_store.py
+"""
+Persistent, cross-process store of raw GA model outputs.
+
+A blend's 8 predictions depend only on the coal rows it mixes, the ratios and the
+model, never on the simulation's constraints. The optimizer therefore caches the raw
+outputs and applies cost and penalties afterwards, so a second simulation over the
+same catalog and model re-uses every blend the first one predicted.
+
+Entries live in a SQLite file in WAL mode, so uvicorn workers, GA island processes
+and background simulations can read it concurrently while one of them writes.
+Keys are (namespace, blend):
+    namespace = "<catalog version>:<model version>"
+    blend     = canonical "index:ratio" pairs, sorted by coal index
+The store keeps at most max_entries rows. Once that many new rows have been
+written since the last check, it deletes the least recently used ones.
+
+Knobs: PREDICTION_STORE_PATH (empty disables) and PREDICTION_STORE_MAX_ENTRIES
+(default 200000).
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+N_OUTPUTS = 8
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    namespace TEXT NOT NULL,
+    blend TEXT NOT NULL,
+    preds BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, blend)
+);
+CREATE INDEX IF NOT EXISTS ix_predictions_last_used ON predictions (last_used);
+"""
+
+
+# -------------------------
+# Keys
+# -------------------------
+def catalog_version(coal_df) -> str:
+    """sha256 of the coal names, column names and numeric values the optimizer reads (order included)."""
+    h = hashlib.sha256()
+    h.update("\0".join(map(str, coal_df.columns)).encode("utf-8") + b"\1")
+    h.update("\0".join(map(str, coal_df.iloc[:, 0])).encode("utf-8") + b"\1")
+    h.update(np.ascontiguousarray(coal_df.iloc[:, 1:].values.astype(np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def blend_key(indices, ratios) -> str:
+    """Canonical key for one blend: "i:r,j:r,k:r" sorted by coal index."""
+    return ",".join(f"{int(i)}:{int(r)}" for i, r in sorted(zip(indices, ratios)))
+
+
+# -------------------------
+# Store
+# -------------------------
+class PredictionStore:
+    def __init__(self, path: str, max_entries: int = 200_000, timeout_s: float = 5.0):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._written_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["PredictionStore"]:
+        path = os.getenv("PREDICTION_STORE_PATH", "")
+        if not path:
+            return None
+        return cls(path, max_entries=int(os.getenv("PREDICTION_STORE_MAX_ENTRIES", "200000")))
+
+    # Connections don't survive pickling or fork; each process opens its own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_lock=None, _conn=None, _pid=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout_s, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, namespace: str, blends: List[str]) -> Dict[str, np.ndarray]:
+        """Stored predictions for the given blend keys (missing keys are absent). Marks hits as used."""
+        found: Dict[str, np.ndarray] = {}
+        if not blends:
+            return found
+        try:
+            with self._lock:
+                conn = self._connection()
+                for start in range(0, len(blends), _CHUNK):
+                    chunk = blends[start:start + _CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT blend, preds FROM predictions WHERE namespace = ? AND blend IN ({marks})",
+                        [namespace, *chunk]).fetchall()
+                    for blend, blob in rows:
+                        found[blend] = np.frombuffer(blob, dtype=np.float64).copy()
+                if found:
+                    now = time.time()
+                    keys = list(found)
+                    for start in range(0, len(keys), _CHUNK):
+                        chunk = keys[start:start + _CHUNK]
+                        conn.execute(
+                            f"UPDATE predictions SET last_used = ? WHERE namespace = ? "
+                            f"AND blend IN ({','.join('?' * len(chunk))})",
+                            [now, namespace, *chunk])
+                self.hits += len(found)
+                self.misses += len(blends) - len(found)
+        except sqlite3.Error as e:
+            logger.warning("Prediction store read failed (%s); predicting instead.", e)
+            self.misses += len(blends) - len(found)
+        return found
+
+    def put_many(self, namespace: str, items: Dict[str, np.ndarray]) -> None:
+        """Insert or replace predictions, then evict least recently used rows if over max_entries."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(namespace, blend, np.asarray(preds, dtype=np.float64).tobytes(), now)
+                for blend, preds in items.items()]
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", rows)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                self.writes += len(rows)
+                self._written_since_check += len(rows)
+                if self._written_since_check >= max(1, self.max_entries // 10):
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning("Prediction store write failed (%s); continuing without it.", e)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        self._written_since_check = 0
+        excess = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM predictions WHERE rowid IN "
+                         "(SELECT rowid FROM predictions ORDER BY last_used LIMIT ?)", (excess,))
+            self.evictions += excess
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM predictions")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            try:
+                entries = self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
@@ -105,6 +105,7 @@ class PredictionOutput(BaseModel):
     blend_properties: Dict[str, float]
     predicted_coal_properties: Dict[str, float]
     predicted_coke_properties: Dict[str, float]
+    model_version: Optional[str] = None  # artifact hash of the models that produced it
 
 class SimulationPropertiesBase(BaseModel):
     property_type: str  # 'coke' or 'blend'
@@ -0,0 +1,160 @@
+# simulation_events.py
+"""
+Live simulation progress in simulation_updates.
+
+ProgressRecorder is the optimizer's progress_callback in the worker. It keeps at
+most one row per SIM_UPDATE_MIN_INTERVAL_S (the latest event wins) and writes the
+buffered rows in one INSERT every SIM_UPDATE_FLUSH_S, so a fast GA costs a few
+small inserts per minute. finish() always writes the last event and a terminal row
+(completed / failed) so readers of the latest update see the final state.
+
+stream_updates() feeds GET /simulation/{id}/events: it polls for rows newer than
+the last one sent and yields them as server-sent events until a terminal row.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+import models
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def _message(event: Dict[str, Any]) -> str:
+    parts = [f"Generation {event['generation']}/{event['n_gen']}" if event.get("generation")
+             else f"{event['progress']:.0f}% of the blends scored",
+             f"best fitness {event['best_fitness']:.2f}"]
+    if event.get("evals_per_s") is not None:
+        parts.append(f"{event['evals_per_s']:.0f} blends/s")
+    if event.get("cache_hit_rate") is not None:
+        parts.append(f"cache hit rate {100 * event['cache_hit_rate']:.0f}%")
+    return ", ".join(parts)
+
+
+class ProgressRecorder:
+    def __init__(self, session_factory, simulation_id: int, min_interval_s: float = 1.0,
+                 flush_interval_s: float = 2.0):
+        self.session_factory = session_factory
+        self.simulation_id = simulation_id
+        self.min_interval_s = min_interval_s
+        self.flush_interval_s = flush_interval_s
+        self._rows: List[Dict[str, Any]] = []
+        self._pending: Optional[Dict[str, Any]] = None  # latest event not yet turned into a row
+        self._last_row = float("-inf")
+        self._last_flush = time.monotonic()
+        self.written = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_env(cls, session_factory, simulation_id: int) -> "ProgressRecorder":
+        return cls(session_factory, simulation_id,
+                   min_interval_s=float(os.getenv("SIM_UPDATE_MIN_INTERVAL_S", "1.0")),
+                   flush_interval_s=float(os.getenv("SIM_UPDATE_FLUSH_S", "2.0")))
+
+    def _add(self, status: str, progress: float, message: str, details: Optional[Dict[str, Any]]) -> None:
+        self._rows.append({
+            "simulation_id": self.simulation_id,
+            "status": status,
+            "progress": progress,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now(timezone.utc),
+        })
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if now - self._last_row < self.min_interval_s:
+            self._pending = event
+        else:
+            self._pending = None
+            self._last_row = now
+            self._add("running", event["progress"], _message(event), event)
+        if self._rows and now - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        db = self.session_factory()
+        try:
+            db.execute(insert(models.SimulationUpdate), rows)
+            db.commit()
+            self.written += len(rows)
+        except Exception as e:
+            # Progress is best effort: never fail the simulation over it
+            db.rollback()
+            self.dropped += len(rows)
+            logger.warning(f"Could not write {len(rows)} progress rows for simulation {self.simulation_id}: {e}")
+        finally:
+            db.close()
+
+    def finish(self, status: str, message: str, progress: Optional[float] = None) -> None:
+        """Write the last buffered event and a final row, then flush."""
+        last_progress = 0.0
+        if self._pending is not None:
+            self._add("running", self._pending["progress"], _message(self._pending), self._pending)
+            self._pending = None
+        if self._rows:
+            last_progress = self._rows[-1]["progress"]
+        self._add(status, last_progress if progress is None else progress, message, None)
+        self.flush()
+
+
+def _format_event(row: Dict[str, Any]) -> str:
+    return f"id: {row['id']}\nevent: progress\ndata: {json.dumps(row, default=str)}\n\n"
+
+
+def _fetch(session_factory, simulation_id: int, after_id: int, limit: int = 200):
+    db = session_factory()
+    try:
+        updates = (db.query(models.SimulationUpdate)
+                   .filter(models.SimulationUpdate.simulation_id == simulation_id,
+                           models.SimulationUpdate.id > after_id)
+                   .order_by(models.SimulationUpdate.id)
+                   .limit(limit)
+                   .all())
+        rows = [{
+            "id": u.id,
+            "status": u.status,
+            "progress": u.progress,
+            "message": u.message,
+            "details": u.details,
+            "timestamp": u.timestamp,
+        } for u in updates]
+        simulation = db.query(models.Simulation.status).filter(models.Simulation.id == simulation_id).first()
+        return rows, simulation.status if simulation else None
+    finally:
+        db.close()
+
+
+async def stream_updates(session_factory, simulation_id: int, last_id: int,
+                         is_disconnected: Callable[[], Awaitable[bool]],
+                         poll_s: float = 1.0, keepalive_s: float = 15.0) -> AsyncIterator[str]:
+    """Server-sent events for simulation_updates rows after last_id (Last-Event-ID on reconnect)."""
+    last_sent = time.monotonic()
+    while not await is_disconnected():
+        rows, simulation_status = await asyncio.to_thread(_fetch, session_factory, simulation_id, last_id)
+        for row in rows:
+            last_id = row["id"]
+            yield _format_event(row)
+            last_sent = time.monotonic()
+        if rows and rows[-1]["status"] in TERMINAL_STATUSES:
+            return
+        if not rows and simulation_status in TERMINAL_STATUSES:
+            # Finished without (further) progress rows, e.g. stopped before a worker picked it up
+            yield f"event: end\ndata: {json.dumps({'status': simulation_status})}\n\n"
+            return
+        if time.monotonic() - last_sent >= keepalive_s:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(poll_s)
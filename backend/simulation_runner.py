@@ -0,0 +1,249 @@
+# simulation_runner.py
+"""
+The optimization core of a simulation, moved out of the API so it runs in
+worker.py processes: build the constraints and the coal catalog frame, run
+CoalBlendOptimizer and store its recommendations.
+"""
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models
+from emissions import calculate_emissions
+from genetic_algorithm import CoalBlendOptimizer
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "Models", "multioutput_rf_model.pkl")
+
+# calculate_emissions argument -> coal_df column it is weighted from
+EMISSION_INPUTS = {"fc": "FC", "ash": "Ash", "vm": "VM_weight", "s": "S", "n": "N",
+                   "cri": "CRI_weight", "csr": "CSR_weight"}
+# calculate_emissions key -> SimulationCoalRecommendations column
+EMISSION_COLUMNS = {
+    "CO2_Emissions": "CO2_Emissions", "CO_Emissions": "CO_Emissions", "SO2_Emissions": "SO2_Emissions",
+    "NO_Emissions": "NO_Emissions", "NO2_Emissions": "NO2_Emissions", "PM_Index": "PM_index",
+    "PM10_Emissions": "PM10_Emissions", "PM25_Emissions": "PM25_Emissions", "VOC_Index": "VOC_index",
+    "VOC_Emissions": "VOC_Emissions", "PAH_Emissions": "PAH_Emissions",
+}
+PREDICTED_COLUMNS = ["ash", "vm", "fc", "csn", "cri", "csr", "ash_final", "vm_final"]
+
+
+def build_constraints(simulation_data: Dict[str, Any]) -> Dict[str, Dict[str, tuple]]:
+    """Convert the posted blend/coke properties to the format expected by the optimizer."""
+    custom_constraints = {
+        'blend': {},
+        'coke': {}
+    }
+    for prop in simulation_data.get('blend_properties', []):
+        custom_constraints['blend'][prop['property_name']] = (
+            float(prop['min_value']),
+            float(prop['max_value'])
+        )
+    for prop in simulation_data.get('coke_properties', []):
+        custom_constraints['coke'][prop['property_name']] = (
+            float(prop['min_value']),
+            float(prop['max_value'])
+        )
+    return custom_constraints
+
+
+def load_coal_frame(db: Session) -> pd.DataFrame:
+    coal_data = db.query(models.CoalProperties).all()
+    logger.info(f"Retrieved {len(coal_data)} coal entries from database")
+
+    if not coal_data:
+        raise ValueError("No coal data found in database")
+
+    coal_df = pd.DataFrame([{
+        'Name_of_coal': coal.coal_name,
+        'IM': coal.IM,
+        'Ash': coal.Ash,
+        'VM_weight': coal.VM,
+        'FC': coal.FC,
+        'S': coal.S,
+        'P': coal.P,
+        'SiO2': coal.SiO2,
+        'Al2O3': coal.Al2O3,
+        'Fe2O3': coal.Fe2O3,
+        'CaO': coal.CaO,
+        'MgO': coal.MgO,
+        'Na2O': coal.Na2O,
+        'K2O': coal.K2O,
+        'TiO2': coal.TiO2,
+        'Mn3O4': coal.Mn3O4,
+        'SO3': coal.SO3,
+        'P2O5': coal.P2O5,
+        'BaO': coal.BaO,
+        'SrO': coal.SrO,
+        'ZnO': coal.ZnO,
+        'CRI_weight': coal.CRI,
+        'CSR_weight': coal.CSR,
+        'N': coal.N,
+        'Cost': coal.cost if hasattr(coal, 'cost') else 1000  # Use cost from DB if available
+    } for coal in coal_data])
+
+    logger.info(f"Created DataFrame with shape: {coal_df.shape}")
+    return coal_df
+
+
+def configure_optimizer(optimizer: CoalBlendOptimizer) -> None:
+    """GA settings from the environment (see env.example)."""
+    optimizer.ARRAY_POPULATION = os.getenv("GA_ARRAY_POPULATION", "0") == "1"
+    optimizer.LINEAR_PREFILTER = os.getenv("GA_LINEAR_PREFILTER", "0") == "1"
+    optimizer.PREFILTER_TOLERANCE = float(os.getenv("GA_PREFILTER_TOLERANCE", "2.0"))
+    optimizer.ISLANDS = int(os.getenv("GA_ISLANDS", "0"))
+    optimizer.MIGRATION_INTERVAL = int(os.getenv("GA_MIGRATION_INTERVAL", "5"))
+    optimizer.MIGRANTS = int(os.getenv("GA_MIGRANTS", "2"))
+    optimizer.MIGRATION_TOPOLOGY = os.getenv("GA_MIGRATION_TOPOLOGY", "ring")
+    optimizer.SURROGATE = os.getenv("GA_SURROGATE", "0") == "1"
+    optimizer.SURROGATE_KEEP = float(os.getenv("GA_SURROGATE_KEEP", "0.3"))
+    optimizer.SURROGATE_MAX_ERROR = float(os.getenv("GA_SURROGATE_MAX_ERROR", "0.1"))
+
+
+def blend_emissions(blends: List[Dict[str, Any]], coal_df: pd.DataFrame) -> Dict[str, List[float]]:
+    """
+    Emission columns for all blends at once: (blends x coals) percentage matrix @ coal
+    properties. Coals missing from coal_df contribute nothing.
+    """
+    names = coal_df['Name_of_coal'].tolist()
+    position = {name: i for i, name in enumerate(names)}
+    weights = np.zeros((len(blends), len(names)))
+    for row, blend in enumerate(blends):
+        for coal in blend["coals"]:
+            column = position.get(coal["name"])
+            if column is not None:
+                weights[row, column] = coal["percentage"] / 100.0
+    properties = coal_df[list(EMISSION_INPUTS.values())].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    weighted = weights @ properties.to_numpy(dtype=float)
+    emissions = calculate_emissions(**{arg: weighted[:, i] for i, arg in enumerate(EMISSION_INPUTS)})
+    return {column: np.asarray(emissions[key], dtype=float).tolist() for key, column in EMISSION_COLUMNS.items()}
+
+
+def recommendation_rows(simulation_id: int, blends: List[Dict[str, Any]],
+                        coal_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Column dicts for SimulationCoalRecommendations, one per blend, with their emissions
+    (blend_emissions). The blend's coals go to the child table (coal_rows), not to
+    coal_percentages.
+    """
+    emission_values = blend_emissions(blends, coal_df)
+    rows = []
+    for row, blend in enumerate(blends):
+        record = {"simulation_id": simulation_id,
+                  # Unique blends carry "total_cost", the best blend "cost"
+                  "total_cost": blend.get("cost", blend.get("total_cost", 0.0))}
+        for name in PREDICTED_COLUMNS:
+            record[f"predicted_{name}"] = blend["predicted"][name]
+        for column, values in emission_values.items():
+            record[column] = values[row]
+        rows.append(record)
+    return rows
+
+
+def coal_rows(recommendation_ids: List[int], blends: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """SimulationRecommendationCoal dicts: only the coals in each blend, named as in the live catalog."""
+    return [{"recommendation_id": rec_id, "coal_name": coal["name"], "percentage": float(coal["percentage"])}
+            for rec_id, blend in zip(recommendation_ids, blends)
+            for coal in blend["coals"] if coal["percentage"] > 0]
+
+
+def backfill_emissions(db: Session, recommendations: List[models.SimulationCoalRecommendations]) -> int:
+    """
+    Compute and persist the emissions of recommendations stored before they were
+    written with the row: one catalog query and one commit. Returns the rows updated.
+    """
+    legacy = [rec for rec in recommendations if rec.CO2_Emissions is None]
+    if not legacy:
+        return 0
+    blends = [{"coals": [{"name": name, "percentage": percentage}
+                         for name, percentage in rec.coal_shares.items()]} for rec in legacy]
+    emission_values = blend_emissions(blends, load_coal_frame(db))
+    for row, rec in enumerate(legacy):
+        for column, values in emission_values.items():
+            setattr(rec, column, values[row])
+    db.commit()
+    logger.info(f"Persisted emissions for {len(legacy)} legacy recommendations")
+    return len(legacy)
+
+
+def store_recommendations(db: Session, simulation_id: int, result: Dict[str, Any],
+                          coal_df: pd.DataFrame) -> int:
+    """
+    All unique blends as separate rows, plus the best blend once more, in one
+    executemany INSERT ... RETURNING id (batched VALUES on Postgres), then their
+    coals in a second one. Returns the recommendations written.
+    """
+    if not (isinstance(result, dict) and "all_unique_blends" in result):
+        return 0
+    blends = result["all_unique_blends"] + [result["blend_combinations"][0]]
+    rows = recommendation_rows(simulation_id, blends, coal_df)
+    table = models.SimulationCoalRecommendations
+    ids = db.execute(insert(table).returning(table.id, sort_by_parameter_order=True), rows).scalars().all()
+    db.execute(insert(models.SimulationRecommendationCoal), coal_rows(ids, blends))
+    return len(rows)
+
+
+def run_simulation(db: Session, simulation_id: int, simulation_data: Dict[str, Any],
+                   ga_model: Any, model_version: str, prediction_store: Any,
+                   stop_check: Callable[[], bool],
+                   on_start: Optional[Callable[[CoalBlendOptimizer], None]] = None,
+                   progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Run one simulation to completion and mark it completed. Returns None if it was
+    stopped (stop_check) or no longer exists; raises on errors so the caller can retry.
+    on_start receives the configured optimizer before the search (progress reporting);
+    progress_callback gets the optimizer's per-generation events.
+    """
+    db_simulation = db.query(models.Simulation).filter_by(id=simulation_id).first()
+    if not db_simulation:
+        logger.error(f"Simulation {simulation_id} not found")
+        return None
+
+    # Ensure status is running
+    db_simulation.status = "running"
+    db.commit()
+
+    custom_constraints = build_constraints(simulation_data)
+    coal_df = load_coal_frame(db)
+
+    logger.info(f"Simulation {simulation_id} uses model version {model_version[:12]}")
+    optimizer = CoalBlendOptimizer(MODEL_PATH, coal_df, model=ga_model)
+    optimizer.prediction_store = prediction_store
+    optimizer.model_version = model_version
+    configure_optimizer(optimizer)
+    if on_start is not None:
+        on_start(optimizer)
+
+    # Optional anytime limits (unset = run all N_GEN generations)
+    time_budget_s = os.getenv("GA_TIME_BUDGET_S")
+    target_fitness = os.getenv("GA_TARGET_FITNESS")
+    patience = os.getenv("GA_PATIENCE")
+    result = optimizer.optimize(custom_constraints=custom_constraints, stop_check=stop_check,
+                                mode=os.getenv("OPTIMIZER_MODE", "ga"),
+                                time_budget_s=float(time_budget_s) if time_budget_s else None,
+                                target_fitness=float(target_fitness) if target_fitness else None,
+                                patience=int(patience) if patience else None,
+                                progress_callback=progress_callback)
+
+    # Check if optimization was stopped
+    if result is None:
+        logger.info(f"Optimization stopped for simulation {simulation_id}")
+        return None
+    logger.info(f"Simulation {simulation_id} optimizer stopped: {result['search']['stop_reason']} "
+                f"after {result['search']['generations_run']} generations")
+    # A stop that arrived after the last generation still wins over writing results
+    if stop_check():
+        logger.info(f"Simulation {simulation_id} stopped before storing results")
+        return None
+
+    store_recommendations(db, simulation_id, result, coal_df)
+
+    db_simulation.status = "completed"
+    db.commit()
+    return result
@@ -0,0 +1,77 @@
+# surrogate.py
+"""
+Cheap online surrogate for the GA's multi-output model.
+
+Ridge regression on [x, x**2] of the 23 blend features, predicting the same 8
+outputs as predict_properties_batch. The optimizer applies its exact cost and
+penalty to these outputs, so only the model part is approximated. Samples are the
+blends the forest has already scored, newest first, capped at max_samples.
+"""
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QuadraticSurrogate:
+    def __init__(self, alpha: float = 1e-3, max_samples: int = 5000, error_decay: float = 0.7):
+        self.alpha = alpha
+        self.max_samples = max_samples
+        self.error_decay = error_decay  # EWMA weight of the previous error
+        self._X = np.empty((0, 0))
+        self._Y = np.empty((0, 0))
+        self._coef: Optional[np.ndarray] = None
+        self._mean: Optional[np.ndarray] = None
+        self._scale: Optional[np.ndarray] = None
+        self.new_samples = 0  # added since the last fit
+        self.refits = 0
+        self.error: Optional[float] = None  # EWMA of the relative fitness error
+
+    @property
+    def fitted(self) -> bool:
+        return self._coef is not None
+
+    @property
+    def n_samples(self) -> int:
+        return len(self._X)
+
+    @staticmethod
+    def _expand(X: np.ndarray) -> np.ndarray:
+        return np.hstack([X, X ** 2])
+
+    def add(self, X: np.ndarray, Y: np.ndarray) -> None:
+        """Record (blend features, model outputs) rows scored by the real model."""
+        if not len(X):
+            return
+        if not self.n_samples:
+            self._X, self._Y = X.copy(), Y.copy()
+        else:
+            self._X = np.vstack([X, self._X])[:self.max_samples]
+            self._Y = np.vstack([Y, self._Y])[:self.max_samples]
+        self.new_samples += len(X)
+
+    def fit(self) -> None:
+        A = self._expand(self._X)
+        self._mean = A.mean(axis=0)
+        self._scale = A.std(axis=0)
+        self._scale[self._scale == 0] = 1.0
+        A = np.hstack([(A - self._mean) / self._scale, np.ones((len(A), 1))])
+        gram = A.T @ A + self.alpha * len(A) * np.eye(A.shape[1])
+        self._coef = np.linalg.solve(gram, A.T @ self._Y)
+        self.new_samples = 0
+        self.refits += 1
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        A = (self._expand(X) - self._mean) / self._scale
+        return np.hstack([A, np.ones((len(A), 1))]) @ self._coef
+
+    def observe_error(self, predicted_fitness: np.ndarray, true_fitness: np.ndarray) -> float:
+        """Update the EWMA of mean |predicted - true| / max(|true|, 1) and return it."""
+        error = float(np.mean(np.abs(predicted_fitness - true_fitness) / np.maximum(np.abs(true_fitness), 1.0)))
+        self.error = error if self.error is None else self.error_decay * self.error + (1 - self.error_decay) * error
+        return self.error
+
+    def stats(self) -> Dict[str, object]:
+        return {"samples": self.n_samples, "refits": self.refits, "error": self.error}
@@ -0,0 +1,268 @@
+# worker.py
+"""
+Simulation worker: runs queued optimization jobs (jobs.py) outside the API.
+
+    python worker.py
+
+starts WORKER_CONCURRENCY job processes on this host (default 1) and restarts any
+that die. Each process loads the GA model, then loops: claim a job with
+FOR UPDATE SKIP LOCKED, reload the GA model if the Models directory changed
+(the API's model reloads don't reach this process), run the job with
+simulation_runner.run_simulation while a heartbeat thread refreshes the job and its progress every WORKER_HEARTBEAT_S,
+and record the outcome. check_stop asks the process's job_control.StopListener,
+so a stop request from any API worker ends the GA within one generation; a job
+reclaimed by another worker stops at the next heartbeat. An error is retried by
+jobs.fail until the job runs out of attempts. Idle processes also requeue jobs
+whose heartbeat is older than WORKER_STALE_AFTER_S.
+
+SIGTERM/SIGINT stop the GA at the next generation and hand the job back to the
+queue without spending an attempt, so redeploys don't lose work.
+"""
+import logging
+import multiprocessing as mp
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "Models")
+
+
+# -------------------------
+# Job process
+# -------------------------
+def _progress(optimizer) -> Optional[Dict[str, Any]]:
+    """Live progress of a running optimizer, read from the heartbeat thread."""
+    if optimizer is None:
+        return None
+    trace = optimizer.search_trace
+    last = trace[-1] if trace else None
+    return {
+        "generation": optimizer.generations_run,
+        "n_gen": optimizer.N_GEN,
+        "best_fitness": last[1] if last else None,
+        "elapsed_s": round(last[0], 3) if last else None,
+    }
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes the claimed job and its progress; sets `lost` when the job was reclaimed."""
+
+    def __init__(self, session_factory, job_id: int, worker_id: str, interval_s: float):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval_s = interval_s
+        self.optimizer = None  # set by run_simulation's on_start
+        self.lost = threading.Event()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        import jobs
+
+        while not self._done.wait(self.interval_s):
+            db = self.session_factory()
+            try:
+                if not jobs.heartbeat(db, self.job_id, self.worker_id, _progress(self.optimizer)):
+                    logger.info(f"Job {self.job_id} no longer owned by {self.worker_id}; stopping")
+                    self.lost.set()
+                    return
+            except Exception as e:
+                # Transient DB trouble: keep running, the stale timeout is the backstop
+                logger.warning(f"Heartbeat for job {self.job_id} failed: {e}")
+            finally:
+                db.close()
+
+    def stop(self) -> None:
+        self._done.set()
+
+
+class _GAModel:
+    """
+    The GA model of this job process, reloaded between jobs when Models/ changes
+    (the API's POST /admin/models/reload and watcher only swap their own copy).
+    """
+
+    def __init__(self, models_dir: str):
+        self.models_dir = models_dir
+        self.model = None
+        self.version = ""
+        self._signature = None
+
+    def current(self):
+        from model_registry import _dir_signature
+
+        signature = _dir_signature(self.models_dir)
+        if signature != self._signature:
+            try:
+                self._load()
+                self._signature = signature
+            except Exception as e:
+                if self.model is None:
+                    raise
+                # Files still being copied: keep the loaded version, retry at the next job
+                logger.warning(f"Could not reload the GA model, keeping {self.version[:12]}: {e}")
+        return self.model, self.version
+
+    def _load(self) -> None:
+        from artifact_store import ArtifactStore
+        from model_registry import load_ga_model
+        from prediction_cache import artifact_hash
+
+        version = artifact_hash(self.models_dir)
+        if version == self.version:
+            return
+        store = ArtifactStore.open(os.getenv("ARTIFACT_STORE_DIR", ""), self.models_dir, version)
+        model = load_ga_model(self.models_dir, store)
+        if self.version:
+            logger.info(f"GA model changed: {self.version[:12]} -> {version[:12]}")
+        self.model, self.version = model, version
+
+
+def _run_job(session_factory, job, worker_id: str, ga_model, model_version: str,
+             prediction_store, control, shutdown: threading.Event, heartbeat_s: float) -> None:
+    import jobs
+    from simulation_events import ProgressRecorder
+    from simulation_runner import run_simulation
+
+    def check_stop() -> bool:
+        return shutdown.is_set() or heartbeat.lost.is_set() or control.stop_requested(job.simulation_id)
+
+    def on_start(optimizer) -> None:
+        heartbeat.optimizer = optimizer
+
+    control.watch(job.simulation_id)
+    recorder = ProgressRecorder.from_env(session_factory, job.simulation_id)
+    heartbeat = _Heartbeat(session_factory, job.id, worker_id, heartbeat_s)
+    heartbeat.start()
+    db = session_factory()
+    started = time.perf_counter()
+    try:
+        logger.info(f"{worker_id} running job {job.id} (simulation {job.simulation_id}, "
+                    f"attempt {job.attempts}/{job.max_attempts})")
+        result = run_simulation(db, job.simulation_id, job.payload or {}, ga_model, model_version,
+                                prediction_store, stop_check=check_stop, on_start=on_start,
+                                progress_callback=recorder)
+        heartbeat.stop()
+        if heartbeat.lost.is_set():
+            recorder.flush()
+            return
+        if result is None and control.stop_requested(job.simulation_id):
+            jobs.finish_stopped(db, job, worker_id)
+            recorder.finish("failed", jobs.STOPPED_BY_USER)
+            logger.info(f"Job {job.id} stopped on request after {time.perf_counter() - started:.1f}s")
+            return
+        if shutdown.is_set():
+            jobs.release(db, job, worker_id)
+            recorder.finish("running", "Worker shutting down; simulation requeued")
+            logger.info(f"Job {job.id} released for another worker (shutdown)")
+            return
+        jobs.complete(db, job.id, worker_id)
+        recorder.finish("completed", "Optimization completed", progress=100.0)
+        logger.info(f"Job {job.id} completed in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        heartbeat.stop()
+        logger.error(f"Job {job.id} failed: {e}\n{traceback.format_exc()}")
+        db.rollback()
+        requeued = jobs.fail(db, job.id, worker_id, str(e))
+        if requeued:
+            recorder.finish("running", f"Attempt {job.attempts} failed, retrying: {e}")
+            logger.info(f"Job {job.id} requeued for retry")
+        elif requeued is False:
+            recorder.finish("failed", str(e))
+    finally:
+        control.forget(job.simulation_id)
+        db.close()
+
+
+def _job_process(slot: int, poll_s: float, heartbeat_s: float, stale_after_s: float) -> None:
+    logging.basicConfig(level=logging.INFO)
+    import jobs
+    from database import SessionLocal, engine
+    from job_control import StopListener
+    from prediction_store import PredictionStore
+
+    shutdown = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: shutdown.set())
+    signal.signal(signal.SIGINT, lambda *_: shutdown.set())
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    ga_model = _GAModel(MODELS_DIR)
+    _, model_version = ga_model.current()
+    prediction_store = PredictionStore.from_env()
+    control = StopListener.from_env(engine, SessionLocal)
+    logger.info(f"Job process {slot} ({worker_id}) ready, model version {model_version[:12]}")
+
+    while not shutdown.is_set():
+        db = SessionLocal()
+        try:
+            job = jobs.claim(db, worker_id)
+            if job is None:
+                jobs.requeue_stale(db, stale_after_s)
+        except Exception as e:
+            logger.warning(f"{worker_id} could not poll the job queue: {e}")
+            job = None
+        finally:
+            db.close()
+        if job is None:
+            shutdown.wait(poll_s)
+            continue
+        model, model_version = ga_model.current()
+        _run_job(SessionLocal, job, worker_id, model, model_version,
+                 prediction_store, control, shutdown, heartbeat_s)
+    control.close()
+
+
+# -------------------------
+# Supervisor
+# -------------------------
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    concurrency = max(1, int(os.getenv("WORKER_CONCURRENCY", "1")))
+    poll_s = float(os.getenv("WORKER_POLL_S", "2"))
+    heartbeat_s = float(os.getenv("WORKER_HEARTBEAT_S", "5"))
+    stale_after_s = float(os.getenv("WORKER_STALE_AFTER_S", "60"))
+    grace_s = float(os.getenv("WORKER_SHUTDOWN_GRACE_S", "30"))
+
+    ctx = mp.get_context("spawn")
+    args = (poll_s, heartbeat_s, stale_after_s)
+    processes: List = [None] * concurrency
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    logger.info(f"Starting {concurrency} job process(es)")
+    while not stopping.is_set():
+        for slot, process in enumerate(processes):
+            if process is None or not process.is_alive():
+                if process is not None:
+                    logger.warning(f"Job process {slot} exited with code {process.exitcode}; restarting")
+                processes[slot] = ctx.Process(target=_job_process, args=(slot,) + args,
+                                              name=f"simulation-worker-{slot}", daemon=False)
+                processes[slot].start()
+        stopping.wait(1.0)
+
+    logger.info("Stopping job processes")
+    for process in processes:
+        if process is not None and process.is_alive():
+            process.terminate()  # SIGTERM: finish the current generation, release the job
+    deadline = time.monotonic() + grace_s
+    for process in processes:
+        if process is not None:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
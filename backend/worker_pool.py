@@ -0,0 +1,103 @@
+# worker_pool.py
+"""
+Bounded thread pool for blocking request work (DB queries + inference) so it never
+runs on the event loop. Submissions beyond workers + max_queue are rejected with
+PoolFull instead of queueing without limit; the endpoint turns that into a 503.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolFull(Exception):
+    """Raised when the pool already has workers + max_queue tasks in flight."""
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.in_flight = 0   # queued + running
+        self.running = 0
+        self.max_depth_seen = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_ms = metrics.histogram(f"{name}.queue_wait_ms")
+        self._run_ms = metrics.histogram(f"{name}.run_ms")
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str) -> "BoundedExecutor":
+        """Sized by {prefix}_WORKERS (default: host CPUs) and {prefix}_MAX_QUEUE (default 32)."""
+        return cls(
+            name,
+            workers=int(os.getenv(f"{prefix}_WORKERS", str(os.cpu_count() or 1))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", "32")),
+        )
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.running)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolFull(f"{self.name} pool is full ({self.in_flight} in flight)")
+            self.in_flight += 1
+            self.submitted += 1
+            self.max_depth_seen = max(self.max_depth_seen, self.queued)
+        enqueued = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self._wait_ms.observe((started - enqueued) * 1000.0)
+            with self._lock:
+                self.running += 1
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                self._run_ms.observe((time.perf_counter() - started) * 1000.0)
+                with self._lock:
+                    self.running -= 1
+                    self.in_flight -= 1
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        return self._executor.submit(task)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) on the pool. Raises PoolFull immediately when saturated."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "queued": self.queued,
+                "max_queue_depth_seen": self.max_depth_seen,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
@@ -297,6 +297,12 @@ const SimulationManager = () => {
 
       console.log(`Stop simulation response:`, response.data); // Debug log
 
+      // A running job stops on its worker; keep polling for its final status
+      if (response.data.status === "stopping") {
+        alert("Stop requested; the simulation will stop shortly");
+        return;
+      }
+
       // Update simulation status locally
       setSimulations((prev) =>
         prev.map((sim) =>